@@ -1,6 +1,8 @@
 from typing import Dict, Any, Callable, Optional
 from pydantic import BaseModel, Field
-import os, requests
+import os
+
+from services.http_client import get_http_client
 
 # Free intel providers (no paid TI)
 GETIPINTEL_CONTACT = os.getenv("GETIPINTEL_CONTACT")   # free, needs contact email
@@ -88,7 +90,7 @@ def check_ip(payload: Dict[str, Any], context: Dict[str, Any]) -> Dict[str, Any]
     # 1) GetIPIntel (free)
     if GETIPINTEL_CONTACT:
         try:
-            r = requests.get("https://check.getipintel.net/check.php",
+            r = get_http_client().get("https://check.getipintel.net/check.php",
                              params={"ip": ip, "contact": GETIPINTEL_CONTACT, "format": "json"}, timeout=12)
             if r.ok:
                 j = r.json(); out["sources"]["getipintel"] = j
@@ -103,7 +105,7 @@ def check_ip(payload: Dict[str, Any], context: Dict[str, Any]) -> Dict[str, Any]
             out["sources"]["getipintel_error"] = str(e)
     # 2) ip-api (free)
     try:
-        r = requests.get(f"https://ip-api.com/json/{ip}",
+        r = get_http_client().get(f"https://ip-api.com/json/{ip}",
                          params={"fields":"status,message,country,regionName,city,isp,org,as,query"}, timeout=10)
         if r.ok: out["sources"]["ip_api"] = r.json()
     except Exception as e:
@@ -111,7 +113,7 @@ def check_ip(payload: Dict[str, Any], context: Dict[str, Any]) -> Dict[str, Any]
     # 3) OTX (optional)
     if OTX_API_KEY:
         try:
-            r = requests.get(f"https://otx.alienvault.com/api/v1/indicators/IPv4/{ip}/general",
+            r = get_http_client().get(f"https://otx.alienvault.com/api/v1/indicators/IPv4/{ip}/general",
                              headers={"X-OTX-API-KEY": OTX_API_KEY}, timeout=12)
             if r.ok:
                 j = r.json()
@@ -129,7 +131,7 @@ def check_url(payload: Dict[str, Any], context: Dict[str, Any]) -> Dict[str, Any
     p = UrlReputationIn(**payload); url = p.url
     out = {"url": url, "sources": {}}
     try:
-        r = requests.post("https://urlhaus-api.abuse.ch/v1/url/", data={"url": url}, timeout=12)
+        r = get_http_client().post("https://urlhaus-api.abuse.ch/v1/url/", data={"url": url}, timeout=12)
         if r.ok:
             j = r.json(); out["sources"]["urlhaus"] = j
             q = j.get("query_status"); status = j.get("url_status")
@@ -7,7 +7,57 @@ class Config:
     GOOGLE_SHEETS_API_KEY = os.getenv('GOOGLE_SHEETS_API_KEY')
     GOOGLE_SHEETS_ID = os.getenv('GOOGLE_SHEETS_ID', '1PflvP_NfmoVc5b5wBsAIUnM6f6wngqQCt02-uYxEuDk')
     GOOGLE_SHEETS_TAB = os.getenv('GOOGLE_SHEETS_TAB', 'Sheet1')
+
+    # Google Sheets CSV exports are cached for SHEETS_CACHE_TTL seconds (0 disables), then
+    # served for up to SHEETS_CACHE_STALE_TTL more while being revalidated in the background
+    SHEETS_CACHE_TTL = float(os.getenv('SHEETS_CACHE_TTL', '30'))
+    SHEETS_CACHE_STALE_TTL = float(os.getenv('SHEETS_CACHE_STALE_TTL', '300'))
+
+    # Rows added to a sheet within SHEETS_APPEND_WINDOW_MS of each other are sent
+    # as one append request (0 sends each add on its own)
+    SHEETS_APPEND_WINDOW_MS = int(os.getenv('SHEETS_APPEND_WINDOW_MS', '50'))
+
+    # Outbound HTTP (Google Sheets, n8n, threat intel): keep-alive connections pooled per
+    # host, at most HTTP_MAX_PER_HOST requests to one host at a time, HTTP_TIMEOUT seconds
+    # for calls that do not set their own
+    HTTP_POOL_SIZE = int(os.getenv('HTTP_POOL_SIZE', '10'))
+    HTTP_POOL_HOSTS = int(os.getenv('HTTP_POOL_HOSTS', '20'))
+    HTTP_MAX_PER_HOST = int(os.getenv('HTTP_MAX_PER_HOST', '10'))
+    HTTP_TIMEOUT = float(os.getenv('HTTP_TIMEOUT', '30'))
+
+    # Local incident store (SQLite) is the system of record; Google Sheets is a replica.
+    # Pending writes are sent to Sheets every INCIDENT_SYNC_INTERVAL seconds, up to
+    # INCIDENT_SYNC_BATCH_SIZE per round trip; rows added to the sheet elsewhere are
+    # imported every INCIDENT_PULL_INTERVAL seconds (0 disables)
+    INCIDENT_STORE_FILE = os.getenv('INCIDENT_STORE_FILE',
+                                    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'incidents.db'))
+    INCIDENT_SYNC_INTERVAL = float(os.getenv('INCIDENT_SYNC_INTERVAL', '5'))
+    INCIDENT_SYNC_BATCH_SIZE = int(os.getenv('INCIDENT_SYNC_BATCH_SIZE', '100'))
+    INCIDENT_PULL_INTERVAL = float(os.getenv('INCIDENT_PULL_INTERVAL', '300'))
+
     GROQ_API_KEY = os.getenv('GROQ_API_KEY')
+
+    # Groq calls share one scheduler: GROQ_CONCURRENCY requests in flight, 429/5xx
+    # retried up to GROQ_MAX_RETRIES times with jittered backoff
+    GROQ_CONCURRENCY = int(os.getenv('GROQ_CONCURRENCY', '4'))
+    GROQ_MAX_RETRIES = int(os.getenv('GROQ_MAX_RETRIES', '3'))
+
+    # Groq response cache: GROQ_CACHE_SIZE completions in memory, also kept in the
+    # GROQ_CACHE_FILE SQLite file when set. TTLs are per method, in seconds (0 disables).
+    # GROQ_CACHE_SIMILARITY reuses answers to near-identical prompts (simhash)
+    GROQ_CACHE_SIZE = int(os.getenv('GROQ_CACHE_SIZE', '256'))
+    GROQ_CACHE_FILE = os.getenv('GROQ_CACHE_FILE', '')
+    GROQ_CACHE_TTL_ANALYSIS = float(os.getenv('GROQ_CACHE_TTL_ANALYSIS', '3600'))
+    GROQ_CACHE_TTL_INTEL = float(os.getenv('GROQ_CACHE_TTL_INTEL', '86400'))
+    GROQ_CACHE_TTL_REPORT = float(os.getenv('GROQ_CACHE_TTL_REPORT', '1800'))
+    GROQ_CACHE_SIMILARITY = os.getenv('GROQ_CACHE_SIMILARITY', 'false').lower() == 'true'
+
+    # Bulk triage packs up to TRIAGE_BATCH_SIZE small events into one analysis prompt
+    # (fewer if the model's completion limit does not fit them); the last
+    # TRIAGE_MAX_JOBS jobs are kept for progress queries
+    TRIAGE_BATCH_SIZE = int(os.getenv('TRIAGE_BATCH_SIZE', '5'))
+    TRIAGE_MAX_JOBS = int(os.getenv('TRIAGE_MAX_JOBS', '100'))
+
     N8N_BASE_WEBHOOK_URL = os.getenv('N8N_BASE_WEBHOOK_URL', 'https://shubhammm.app.n8n.cloud/webhook')
    
     N8N_AGENT_URL = os.getenv('N8N_AGENT_URL', 'https://shubhammm.app.n8n.cloud/webhook/soc_assistant')
@@ -22,6 +72,61 @@ class Config:
     IDS_MODEL_PATH = os.getenv('IDS_MODEL_PATH', os.path.join(os.path.dirname(__file__), 'services', 'nids_model_balanced.joblib'))
     IDS_LOG_FILE = os.getenv('IDS_LOG_FILE', os.path.join(os.path.dirname(__file__), 'ids_logs.json'))
 
+    # IDS batched inference: packets are queued and scored in batches of up to
+    # IDS_BATCH_SIZE, or whatever has arrived after IDS_BATCH_MAX_LATENCY_MS
+    IDS_BATCH_SIZE = int(os.getenv('IDS_BATCH_SIZE', '256'))
+    IDS_BATCH_MAX_LATENCY_MS = int(os.getenv('IDS_BATCH_MAX_LATENCY_MS', '50'))
+    IDS_QUEUE_SIZE = int(os.getenv('IDS_QUEUE_SIZE', '10000'))
+    # Scoring worker processes for IDS monitoring; 0 keeps capture and scoring in-process
+    IDS_WORKERS = int(os.getenv('IDS_WORKERS', '0'))
+    # Packet parsing: 'fast' reads raw frames and parses headers with struct (AF_PACKET
+    # capture on Linux); 'scapy' fully dissects every packet. Unsupported link types use scapy.
+    IDS_PARSER = os.getenv('IDS_PARSER', 'fast')  # fast | scapy
+    # IDS status: host/pipeline metrics are sampled every IDS_STATUS_SAMPLE_INTERVAL seconds
+    # and the last IDS_STATUS_HISTORY_SIZE samples are kept for /ids/status/history
+    IDS_STATUS_SAMPLE_INTERVAL = float(os.getenv('IDS_STATUS_SAMPLE_INTERVAL', '5'))
+    IDS_STATUS_HISTORY_SIZE = int(os.getenv('IDS_STATUS_HISTORY_SIZE', '720'))
+
+    # IDS 'frequency' feature: packets per (src_ip, dst_port) over a sliding window of
+    # IDS_FREQ_WINDOW_SECONDS, tracking at most IDS_FREQ_MAX_KEYS keys (LRU evicted)
+    IDS_FREQ_WINDOW_SECONDS = int(os.getenv('IDS_FREQ_WINDOW_SECONDS', '60'))
+    IDS_FREQ_BUCKET_SECONDS = int(os.getenv('IDS_FREQ_BUCKET_SECONDS', '5'))
+    IDS_FREQ_MAX_KEYS = int(os.getenv('IDS_FREQ_MAX_KEYS', '100000'))
+
+    # IDS flow aggregation: packets are folded into bidirectional flows and each flow is
+    # scored once it ends (FIN/RST, IDS_FLOW_IDLE_TIMEOUT idle, or IDS_FLOW_ACTIVE_TIMEOUT long)
+    IDS_FLOW_AGGREGATION = os.getenv('IDS_FLOW_AGGREGATION', 'true').lower() == 'true'
+    IDS_FLOW_IDLE_TIMEOUT = float(os.getenv('IDS_FLOW_IDLE_TIMEOUT', '15'))
+    IDS_FLOW_ACTIVE_TIMEOUT = float(os.getenv('IDS_FLOW_ACTIVE_TIMEOUT', '120'))
+    IDS_FLOW_MAX_FLOWS = int(os.getenv('IDS_FLOW_MAX_FLOWS', '100000'))
+
+    # IDS log writer: records are buffered and flushed every IDS_LOG_FLUSH_INTERVAL
+    # seconds or once IDS_LOG_BUFFER_RECORDS are pending. The active file is rotated
+    # (and gzipped) past IDS_LOG_MAX_BYTES or IDS_LOG_ROTATE_INTERVAL seconds; 0 disables either.
+    IDS_LOG_FLUSH_INTERVAL = float(os.getenv('IDS_LOG_FLUSH_INTERVAL', '1.0'))
+    IDS_LOG_BUFFER_RECORDS = int(os.getenv('IDS_LOG_BUFFER_RECORDS', '1000'))
+    IDS_LOG_FSYNC = os.getenv('IDS_LOG_FSYNC', 'none')  # none | flush | rotate
+    IDS_LOG_MAX_BYTES = int(os.getenv('IDS_LOG_MAX_BYTES', str(100 * 1024 * 1024)))
+    IDS_LOG_ROTATE_INTERVAL = int(os.getenv('IDS_LOG_ROTATE_INTERVAL', '86400'))
+    IDS_LOG_BACKUP_COUNT = int(os.getenv('IDS_LOG_BACKUP_COUNT', '14'))
+    # 'json' (NDJSON, services/ids_logs.json) or 'binary' (packed columnar blocks, services/ids_logs.bin)
+    IDS_LOG_FORMAT = os.getenv('IDS_LOG_FORMAT', 'json')
+    # Per-IP log index (SQLite); defaults to ids_logs.index.db next to the log file
+    IDS_LOG_INDEX_FILE = os.getenv('IDS_LOG_INDEX_FILE')
+    # Saved alert aggregates (JSON); defaults to ids_logs.aggregates.json next to the log file
+    IDS_ALERT_AGGREGATES_FILE = os.getenv('IDS_ALERT_AGGREGATES_FILE')
+    # Seconds between saves of the alert aggregates while records are being written
+    IDS_ALERT_AGGREGATES_SAVE_INTERVAL = float(os.getenv('IDS_ALERT_AGGREGATES_SAVE_INTERVAL', '10'))
+    # Source IPs listed in the alerts summary
+    IDS_ALERT_TOP_SOURCES = int(os.getenv('IDS_ALERT_TOP_SOURCES', '10'))
+    # Newest IDS incidents kept in memory for /incidents/ids
+    IDS_INCIDENT_VIEW_MAX = int(os.getenv('IDS_INCIDENT_VIEW_MAX', '100000'))
+    # Live alert stream (/ids/alerts/stream): records buffered per client before the oldest are dropped,
+    # concurrent clients, and seconds between heartbeats on an idle stream
+    IDS_STREAM_BUFFER_SIZE = int(os.getenv('IDS_STREAM_BUFFER_SIZE', '1000'))
+    IDS_STREAM_MAX_SUBSCRIBERS = int(os.getenv('IDS_STREAM_MAX_SUBSCRIBERS', '100'))
+    IDS_STREAM_HEARTBEAT_INTERVAL = float(os.getenv('IDS_STREAM_HEARTBEAT_INTERVAL', '15'))
+
     # N8n timeout and retry configuration
     N8N_TIMEOUT_SECONDS = int(os.getenv('N8N_TIMEOUT_SECONDS', '25'))
     N8N_MAX_RETRIES = int(os.getenv('N8N_MAX_RETRIES', '3'))
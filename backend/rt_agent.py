@@ -1,20 +1,103 @@
-import os, json
-from typing import Dict, Any, Optional
-from groq import Groq
+import os, re, json
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+from services.groq_scheduler import INTERACTIVE, get_groq_scheduler
 
-GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 GROQ_MODEL   = os.getenv("GROQ_MODEL", "openai/gpt-oss-120b")
 
+_ESCAPES = {"n": "\n", "t": "\t", "r": "\r", "b": "\b", "f": "\f"}
+
+class ReplyStream:
+    """Pulls the "reply" string out of a JSON object while it is still streaming in"""
+    START = re.compile(r'"reply"\s*:\s*"')
+
+    def __init__(self):
+        self.buffer = ""
+        self.pos    = None   # next unread character of the reply value
+        self.done   = False
+
+    def feed(self, piece: str) -> str:
+        """Add streamed text; returns the reply text it completed"""
+        self.buffer += piece
+        if self.done:
+            return ""
+        if self.pos is None:
+            m = self.START.search(self.buffer)
+            if not m:
+                return ""
+            self.pos = m.end()
+        out, i, buf = [], self.pos, self.buffer
+        while i < len(buf):
+            c = buf[i]
+            if c == '"':
+                self.done = True
+                break
+            if c != "\\":
+                out.append(c)
+                i += 1
+                continue
+            # Escapes may be split across pieces; wait for the rest
+            if i + 1 >= len(buf) or (buf[i + 1] == "u" and i + 6 > len(buf)):
+                break
+            if buf[i + 1] == "u":
+                try:
+                    out.append(chr(int(buf[i + 2:i + 6], 16)))
+                except ValueError:
+                    pass
+                i += 6
+            else:
+                out.append(_ESCAPES.get(buf[i + 1], buf[i + 1]))
+                i += 2
+        self.pos = i
+        return "".join(out)
+
 class GroqAgent:
-    def __init__(self, api_key: Optional[str] = None, model: str = GROQ_MODEL):
-        self.client = Groq(api_key=api_key or GROQ_API_KEY)
-        self.model  = model
+    def __init__(self, model: str = GROQ_MODEL, priority: int = INTERACTIVE):
+        # Shares the Groq queue and rate-limit budget with GroqService
+        self.scheduler = get_groq_scheduler()
+        self.model     = model
+        self.priority  = priority
 
     def propose(self, user_message: str, capabilities: Dict[str, Dict], context: Optional[Dict]=None) -> Dict[str, Any]:
         """
         Return ONLY JSON:
           { success, reply, data, actions:[{type,label,data?}] }
         """
+        resp = self.scheduler.complete_sync(
+            self.priority,
+            model=self.model,
+            temperature=0.2,
+            response_format={"type":"json_object"},
+            messages=self._propose_messages(user_message, capabilities, context),
+        )
+        return self._parse(resp.choices[0].message.content, "Parse error")
+
+    def propose_stream(self, user_message: str, capabilities: Dict[str, Dict], context: Optional[Dict]=None) -> Iterator[Tuple[str, Dict]]:
+        """
+        propose, streamed: yields ('token', {content}) with the reply text as it arrives,
+        then ('done', <what propose returns>) or ('error', {success, error}).
+        JSON mode cannot be streamed, so the schema is enforced by the prompt alone.
+        """
+        reply, pieces = ReplyStream(), []
+        try:
+            for piece in self.scheduler.stream_sync(
+                self.priority,
+                model=self.model,
+                temperature=0.2,
+                messages=self._propose_messages(user_message, capabilities, context),
+            ):
+                pieces.append(piece)
+                text = reply.feed(piece)
+                if text:
+                    yield "token", {"content": text}
+        except Exception as e:
+            yield "error", {"success": False, "error": str(e)}
+            return
+        content = "".join(pieces)
+        # Models sometimes wrap the object in prose or a code fence without JSON mode
+        start, end = content.find("{"), content.rfind("}")
+        yield "done", self._parse(content[start:end + 1] if 0 <= start < end else content, "Parse error")
+
+    def _propose_messages(self, user_message: str, capabilities: Dict[str, Dict], context: Optional[Dict]) -> List[Dict]:
         sys = (
             "You are a SOAR/SOC assistant. Respond BRIEFLY and return VALID JSON only.\n"
             "Schema: { 'success': true, 'reply': str, 'data': object|null, "
@@ -26,13 +109,10 @@ class GroqAgent:
             f"CONTEXT:\n{json.dumps(context or {}, ensure_ascii=False)}\n\n"
             f"CAPABILITIES:\n{json.dumps(capabilities, ensure_ascii=False)}"
         )
-        resp = self.client.chat.completions.create(
-            model=self.model,
-            temperature=0.2,
-            response_format={"type":"json_object"},
-            messages=[{"role":"system","content":sys},{"role":"user","content":usr}],
-        )
-        content = resp.choices[0].message.content
+        return [{"role":"system","content":sys},{"role":"user","content":usr}]
+
+    @staticmethod
+    def _parse(content: str, label: str) -> Dict[str, Any]:
         try:
             out = json.loads(content)
             out.setdefault("success", True)
@@ -41,7 +121,7 @@ class GroqAgent:
             out.setdefault("actions", [])
             return out
         except Exception as e:
-            return {"success": False, "reply": f"Parse error: {e}", "data": None, "actions": []}
+            return {"success": False, "reply": f"{label}: {e}", "data": None, "actions": []}
 
     def execute_unknown(self, action: str, payload: Dict, context: Optional[Dict]=None) -> Dict[str, Any]:
         """
@@ -52,19 +132,11 @@ class GroqAgent:
             "Return VALID JSON only: { 'success': true|false, 'reply': str, 'data': object|null, 'actions': [] }"
         )
         usr = f"ACTION: {action}\nPAYLOAD:\n{json.dumps(payload)}\nCONTEXT:\n{json.dumps(context or {})}"
-        resp = self.client.chat.completions.create(
+        resp = self.scheduler.complete_sync(
+            self.priority,
             model=self.model,
             temperature=0.1,
             response_format={"type":"json_object"},
             messages=[{"role":"system","content":sys},{"role":"user","content":usr}],
         )
-        content = resp.choices[0].message.content
-        try:
-            out = json.loads(content)
-            out.setdefault("success", True)
-            out.setdefault("reply", "")
-            out.setdefault("data", None)
-            out.setdefault("actions", [])
-            return out
-        except Exception as e:
-            return {"success": False, "reply": f"Execution parse error: {e}", "data": None, "actions": []}
+        return self._parse(resp.choices[0].message.content, "Execution parse error")
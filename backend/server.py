@@ -6,19 +6,25 @@ import uuid
 from datetime import datetime, timedelta
 import firebase_admin
 from firebase_admin import auth
-from flask import Flask, request, jsonify, send_file
+from flask import Flask, Response, request, jsonify, send_file
 from flask_cors import CORS
 from functools import wraps
 from config import Config
 from services.google_sheets import GoogleSheetsService
+from services.incident_store import get_incident_store
 from services.groq import GroqService
+from services.groq_scheduler import get_groq_scheduler
+from services.http_client import get_http_client
 from services.n8n import N8nService
 from services.self_learning import SelfLearningService
 from services.self_enhancement import SelfEnhancementService
 from services.pdf_generator import PDFReportGenerator
 from services.integration_checker import IntegrationChecker
-from services.ids_monitor import IDSMonitor
+from services.ids_monitor import IDSMonitor, LOG_FILE as ids_log_file
+from services.ids_log_writer import list_segments
+from services.json_stream import iter_json_array, json_array_chunks, ndjson_chunks, sse_chunks
 from services.scheduler_service import SchedulerService
+from services.triage import enrich_incident, get_triage_jobs
 from firebase_init import firebase_initialized
 from chat_history import (
     create_conversation, add_message_to_conversation,
@@ -37,14 +43,22 @@ app = Flask(__name__)
 CORS(app)  
 agent = GroqAgent()
 
-def verify_firebase_token(f):
+def verify_firebase_token(f=None, allow_query_token=False):
+    if f is None:
+        # Used as @verify_firebase_token(allow_query_token=True)
+        return lambda func: verify_firebase_token(func, allow_query_token)
+
     @wraps(f)
     def decorated_function(*args, **kwargs):
         auth_header = request.headers.get('Authorization')
-        if not auth_header or not auth_header.startswith('Bearer '):
+        if auth_header and auth_header.startswith('Bearer '):
+            token = auth_header.split(' ')[1]
+        elif allow_query_token and request.args.get('token'):
+            # Browsers' EventSource cannot set headers
+            token = request.args.get('token')
+        else:
             return jsonify({'success': False, 'error': 'Authorization token required'}), 401
 
-        token = auth_header.split(' ')[1]
         try:
             decoded_token = auth.verify_id_token(token)
             email = decoded_token['email']
@@ -58,8 +72,47 @@ def verify_firebase_token(f):
         return f(*args, **kwargs)
     return decorated_function
 
+# ?stream= values for endpoints that can stream their results
+STREAM_FORMATS = ('ndjson', 'json')
+
+def paginate(pairs, limit, follow_from=None):
+    """Take up to `limit` items from (item, cursor) pairs; returns (items, next_cursor callable).
+
+    next_cursor() resumes after the last item taken, or is None once the
+    pairs are exhausted. With `follow_from` (the request's cursor, or '' for
+    none) exhausted pairs still give a cursor, so a client can poll for
+    records appended later. Nothing is read until the items are consumed.
+    """
+    state = {'next_cursor': None}
+
+    def items():
+        last_cursor = follow_from or None
+        for count, (item, cursor) in enumerate(pairs):
+            if limit and count >= limit:
+                state['next_cursor'] = last_cursor
+                return
+            last_cursor = cursor
+            yield item
+        if follow_from is not None:
+            state['next_cursor'] = last_cursor
+
+    return items(), lambda: state['next_cursor']
+
+def paged_response(pairs, limit, stream=None, follow_from=None):
+    """Respond with a page of (item, cursor) pairs; streamed in constant memory for ?stream=ndjson|json"""
+    if limit is not None and limit <= 0:
+        return jsonify({'success': False, 'error': 'limit must be a positive integer'}), 400
+    items, next_cursor = paginate(pairs, limit, follow_from)
+    if stream == 'ndjson':
+        return Response(ndjson_chunks(items, next_cursor), mimetype='application/x-ndjson')
+    if stream == 'json':
+        return Response(json_array_chunks(items, next_cursor), mimetype='application/json')
+    data = list(items)
+    return jsonify({'success': True, 'data': data, 'next_cursor': next_cursor()}), 200
+
 # Initialize services
 google_sheets = GoogleSheetsService()
+incident_store = get_incident_store()
 groq_service = GroqService()
 n8n_service = N8nService()
 self_learning_service = SelfLearningService()
@@ -85,7 +138,7 @@ def health_check():
 def get_incidents():
     """Get all security incidents"""
     try:
-        result = google_sheets.get_security_incidents()
+        result = incident_store.get_security_incidents()
         return jsonify(result), 200 if result['success'] else 500
     except Exception as e:
         logger.error(f"Error fetching incidents: {str(e)}")
@@ -101,17 +154,10 @@ def add_incident():
 
         # Analyze with AI first
         ai_analysis = groq_service.analyze_security_event(data)
-        enriched_data = data.copy()
-
-        if ai_analysis['success']:
-            enriched_data.update({
-                'severity': ai_analysis['data'].get('severity', data.get('severity', 'Medium')),
-                'attackType': ai_analysis['data'].get('attackType', data.get('attackType', 'Unknown')),
-                'actionTaken': ai_analysis['data'].get('actions', data.get('actionTaken', 'Alert Sent'))
-            })
+        enriched_data = enrich_incident(data, ai_analysis['data'] if ai_analysis['success'] else None)
 
         # Add to Google Sheets
-        result = google_sheets.add_security_incident(enriched_data)
+        result = incident_store.add_security_incident(enriched_data)
         if result['success']:
             result['aiAnalysis'] = ai_analysis['data'] if ai_analysis['success'] else None
 
@@ -134,12 +180,29 @@ def update_incident_status(event_id):
         new_status = data['status']
         action_taken = data.get('actionTaken', 'Updated')
 
-        result = google_sheets.update_incident_status(event_id, new_status, action_taken)
+        result = incident_store.update_incident_status(event_id, new_status, action_taken)
         return jsonify(result), 200 if result['success'] else 500
     except Exception as e:
         logger.error(f"Error updating incident: {str(e)}")
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@app.route('/incidents/status/bulk', methods=['POST'])
+def bulk_update_incident_status():
+    """Update the status of many incidents at once"""
+    try:
+        data = request.get_json()
+        updates = data.get('updates') if data else None
+        if not isinstance(updates, list) or not updates:
+            return jsonify({'success': False, 'error': 'Updates array required'}), 400
+        if not all(isinstance(update, dict) and update.get('eventId') and 'status' in update for update in updates):
+            return jsonify({'success': False, 'error': 'Each update requires eventId and status'}), 400
+
+        result = incident_store.bulk_update_incident_status(updates)
+        return jsonify(result), 200 if result['success'] else 500
+    except Exception as e:
+        logger.error(f"Error bulk updating incidents: {str(e)}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
 @app.route('/incidents/bulk', methods=['POST'])
 def bulk_add_incidents():
     """Bulk add incidents"""
@@ -148,12 +211,41 @@ def bulk_add_incidents():
         if not data or 'incidents' not in data:
             return jsonify({'success': False, 'error': 'Incidents array required'}), 400
 
-        result = google_sheets.bulk_add_incidents(data['incidents'])
+        result = incident_store.bulk_add_incidents(data['incidents'])
         return jsonify(result), 201 if result['success'] else 500
     except Exception as e:
         logger.error(f"Error bulk adding incidents: {str(e)}")
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@app.route('/incidents/triage', methods=['POST'])
+def triage_incidents():
+    """Bulk add incidents with AI analysis, as a background job; poll its progress by job ID"""
+    try:
+        data = request.get_json()
+        incidents = data.get('incidents') if data else None
+        if not isinstance(incidents, list) or not incidents:
+            return jsonify({'success': False, 'error': 'Incidents array required'}), 400
+        if not all(isinstance(incident, dict) for incident in incidents):
+            return jsonify({'success': False, 'error': 'Each incident must be an object'}), 400
+
+        job = get_triage_jobs().start(incidents)
+        return jsonify({'success': True, 'data': job}), 202
+    except Exception as e:
+        logger.error(f"Error starting triage job: {str(e)}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/incidents/triage/<job_id>', methods=['GET'])
+def get_triage_job(job_id):
+    """Progress of a bulk triage job"""
+    try:
+        job = get_triage_jobs().get(job_id)
+        if job is None:
+            return jsonify({'success': False, 'error': 'Triage job not found'}), 404
+        return jsonify({'success': True, 'data': job}), 200
+    except Exception as e:
+        logger.error(f"Error getting triage job {job_id}: {str(e)}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
 @app.route('/ai/analyze', methods=['POST'])
 @verify_firebase_token
 def analyze_event():
@@ -197,6 +289,26 @@ def get_threat_intelligence():
         logger.error(f"Error getting threat intelligence: {str(e)}")
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@app.route('/ai/cache', methods=['GET'])
+@verify_firebase_token
+def get_ai_cache_stats():
+    """Groq response cache statistics"""
+    try:
+        return jsonify({'success': True, 'data': groq_service.get_cache_stats()}), 200
+    except Exception as e:
+        logger.error(f"Error getting AI cache stats: {str(e)}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/ai/scheduler', methods=['GET'])
+@verify_firebase_token
+def get_ai_scheduler_stats():
+    """Groq request scheduler statistics"""
+    try:
+        return jsonify({'success': True, 'data': get_groq_scheduler().get_stats()}), 200
+    except Exception as e:
+        logger.error(f"Error getting AI scheduler stats: {str(e)}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
 @app.route('/n8n/trigger', methods=['POST'])
 def trigger_n8n():
     """Trigger n8n webhook"""
@@ -431,59 +543,91 @@ def download_chatbot_report(report_id):
         logger.error(f"Error downloading chatbot report {report_id}: {str(e)}")
         return jsonify({'success': False, 'error': str(e)}), 500
 
+def wants_event_stream(data):
+    """Whether the caller asked for Server-Sent Events, via the Accept header or "stream": true"""
+    return 'text/event-stream' in request.headers.get('Accept', '') or data.get('stream') is True
+
+def event_stream_response(events):
+    """Send (event, data) pairs to the browser as Server-Sent Events"""
+    response = Response(sse_chunks(events), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    # Stop nginx-style proxies from buffering the stream
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+def build_chat_messages(message, conversation_history, context):
+    """Groq messages for a security chat turn; returns (messages, recent incidents used as context)"""
+    # Get recent incidents for context
+    incidents_result = incident_store.get_security_incidents()
+    recent_incidents = []
+    if incidents_result['success']:
+        # Get last 5 incidents for context
+        incidents_data = incidents_result['data']
+        recent_incidents = incidents_data[-5:] if len(incidents_data) > 5 else incidents_data
+
+    # Build conversation context for AI
+    system_prompt = """You are a cybersecurity expert and SOC analyst. Use the recent security incidents provided to inform your responses. Provide clear, concise, and actionable advice on security matters."""
+
+    messages = [
+        {"role": "system", "content": system_prompt}
+    ]
+
+    # Add recent incidents context if available
+    if recent_incidents:
+        incidents_context = f"\n\nRecent Security Incidents (last {len(recent_incidents)}):\n"
+        for i, incident in enumerate(recent_incidents, 1):
+            status = incident.get('status', 'Unknown').strip()
+            event_type = incident.get('eventType', incident.get('eventtype', 'Unknown')).strip()
+            severity = incident.get('severity', 'Unknown').strip()
+            incidents_context += f"{i}. {event_type} - {severity} severity - Status: {status}\n"
+        incidents_context += "\nUse this information to provide context-aware responses when discussing security events or incidents."
+        messages[0]["content"] += incidents_context
+
+    # Add conversation history (limit to last 10 messages for context)
+    for hist_msg in conversation_history[-10:]:
+        messages.append({
+            "role": hist_msg.get('sender', 'user'),
+            "content": hist_msg.get('content', '')
+        })
+
+    # Add current message
+    messages.append({"role": "user", "content": message})
+
+    # Add context if provided
+    if context:
+        context_str = f"\n\nAdditional context: {json.dumps(context)}"
+        messages[-1]["content"] += context_str
+
+    return messages, recent_incidents
+
 @app.route('/ai/chat', methods=['POST'])
 # @verify_firebase_token
 def security_chat():
-    """Security chatbot using Groq AI"""
+    """Security chatbot using Groq AI; streams the reply as Server-Sent Events when asked to"""
     try:
         data = request.get_json()
         if not data or 'message' not in data:
             return jsonify({'success': False, 'error': 'Message required'}), 400
 
-        message = data['message']
-        conversation_history = data.get('conversationHistory', [])
-        context = data.get('context', {})
-
-        # Get recent incidents from Google Sheets for context
-        incidents_result = google_sheets.get_security_incidents()
-        recent_incidents = []
-        if incidents_result['success']:
-            # Get last 5 incidents for context
-            incidents_data = incidents_result['data']
-            recent_incidents = incidents_data[-5:] if len(incidents_data) > 5 else incidents_data
-
-        # Build conversation context for AI
-        system_prompt = """You are a cybersecurity expert and SOC analyst. Use the recent security incidents provided to inform your responses. Provide clear, concise, and actionable advice on security matters."""
-
-        messages = [
-            {"role": "system", "content": system_prompt}
-        ]
-
-        # Add recent incidents context if available
-        if recent_incidents:
-            incidents_context = f"\n\nRecent Security Incidents (last {len(recent_incidents)}):\n"
-            for i, incident in enumerate(recent_incidents, 1):
-                status = incident.get('status', 'Unknown').strip()
-                event_type = incident.get('eventType', incident.get('eventtype', 'Unknown')).strip()
-                severity = incident.get('severity', 'Unknown').strip()
-                incidents_context += f"{i}. {event_type} - {severity} severity - Status: {status}\n"
-            incidents_context += "\nUse this information to provide context-aware responses when discussing security events or incidents."
-            messages[0]["content"] += incidents_context
-
-        # Add conversation history (limit to last 10 messages for context)
-        for hist_msg in conversation_history[-10:]:
-            messages.append({
-                "role": hist_msg.get('sender', 'user'),
-                "content": hist_msg.get('content', '')
-            })
-
-        # Add current message
-        messages.append({"role": "user", "content": message})
+        messages, recent_incidents = build_chat_messages(
+            data['message'],
+            data.get('conversationHistory', []),
+            data.get('context', {})
+        )
 
-        # Add context if provided
-        if context:
-            context_str = f"\n\nAdditional context: {json.dumps(context)}"
-            messages[-1]["content"] += context_str
+        if wants_event_stream(data):
+            def events():
+                for event, payload in groq_service.stream_chat_completion(messages):
+                    if event == 'done':
+                        payload = {
+                            'success': True,
+                            'reply': payload['data']['content'],
+                            'data': payload['data'],
+                            'actions': payload['actions'],
+                            'incidentsContext': len(recent_incidents)
+                        }
+                    yield event, payload
+            return event_stream_response(events())
 
         result = groq_service.chat_completion(messages)
 
@@ -570,7 +714,7 @@ Please provide:
 
         elif action_type == 'generate_report':
             # Generate security incident report
-            incidents_result = google_sheets.get_security_incidents()
+            incidents_result = incident_store.get_security_incidents()
             if not incidents_result['success']:
                 return jsonify({'success': False, 'error': 'Failed to fetch incidents for report'}), 500
 
@@ -640,10 +784,17 @@ Please provide:
 @app.route("/chat/agent", methods=["POST"])
 def chat_agent():
     """
-    Input:  { message: string, context?: object }
+    Input:  { message: string, context?: object, stream?: bool }
     Output: { success, reply, data?, actions:[{type,label,data?}] }
+            or, when streaming, SSE "token" events with the reply text then a "done" event with the above
     """
     body = request.get_json(silent=True) or {}
+    if wants_event_stream(body):
+        return event_stream_response(agent.propose_stream(
+            user_message = body.get("message",""),
+            capabilities = CAPABILITIES,
+            context      = body.get("context") or {}
+        ))
     res = agent.propose(
         user_message = body.get("message",""),
         capabilities = CAPABILITIES,
@@ -676,7 +827,7 @@ def chat_execute():
 def get_metrics():
     """Get dashboard metrics"""
     try:
-        incidents_result = google_sheets.get_security_incidents()
+        incidents_result = incident_store.get_security_incidents()
         if not incidents_result['success']:
             return jsonify({'success': False, 'error': 'Failed to fetch incidents for metrics'}), 500
 
@@ -966,6 +1117,16 @@ def get_integrations_status():
         logger.error(f"Error getting integrations status: {str(e)}")
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@app.route('/integrations/http', methods=['GET'])
+@verify_firebase_token
+def get_http_pool_stats():
+    """Outbound HTTP connection pool statistics"""
+    try:
+        return jsonify({'success': True, 'data': get_http_client().get_stats()}), 200
+    except Exception as e:
+        logger.error(f"Error getting HTTP pool stats: {str(e)}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
 @app.route('/ids/start', methods=['POST'])
 @verify_firebase_token
 def start_ids_monitoring():
@@ -1005,11 +1166,36 @@ def get_ids_status():
         logger.error(f"Error getting IDS status: {str(e)}")
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@app.route('/ids/status/history', methods=['GET'])
+@verify_firebase_token
+def get_ids_status_history():
+    """Get recent IDS resource samples for dashboard sparklines"""
+    try:
+        limit = request.args.get('limit', type=int)
+        history = ids_monitor.get_status_history(limit=limit)
+        return jsonify({'success': True, 'data': history}), 200
+    except Exception as e:
+        logger.error(f"Error getting IDS status history: {str(e)}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
 @app.route('/ids/logs', methods=['GET'])
 @verify_firebase_token
 def get_ids_logs():
     """Get IDS logs for chatbot"""
     try:
+        stream = request.args.get('stream')
+        cursor = request.args.get('cursor')
+        if stream and stream not in STREAM_FORMATS:
+            return jsonify({'success': False, 'error': f"stream must be one of {', '.join(STREAM_FORMATS)}"}), 400
+        if stream or cursor:
+            # Oldest first from the cursor across rotated segments; a stream without a limit exports
+            # everything. next_cursor is always set so clients can poll for newer records.
+            limit = request.args.get('limit', None if stream else 50, type=int)
+            try:
+                return paged_response(ids_monitor.iter_logs_from(cursor), limit, stream, follow_from=cursor or '')
+            except ValueError as e:
+                return jsonify({'success': False, 'error': str(e)}), 400
+
         limit = request.args.get('limit', 50, type=int)
         logs = ids_monitor.get_recent_logs(limit=limit)
         return jsonify({'success': True, 'data': logs}), 200
@@ -1034,12 +1220,38 @@ def get_ids_logs_by_ip(ip_address):
 def get_ids_alerts():
     """Get IDS alerts summary"""
     try:
-        alerts = ids_monitor.get_alerts_summary()
+        minutes = min(request.args.get('minutes', 60, type=int), 24 * 60)
+        alerts = ids_monitor.get_alerts_summary(minutes=minutes)
         return jsonify({'success': True, 'data': alerts}), 200
     except Exception as e:
         logger.error(f"Error getting IDS alerts: {str(e)}")
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@app.route('/ids/alerts/stream', methods=['GET'])
+@verify_firebase_token(allow_query_token=True)
+def stream_ids_alerts():
+    """Push IDS records to the client as they are logged (Server-Sent Events)"""
+    try:
+        def split(name):
+            value = request.args.get(name)
+            return [item.strip() for item in value.split(',') if item.strip()] if value else None
+
+        subscription = ids_monitor.subscribe_alerts(
+            alert_levels=split('alert_level'),
+            ip=request.args.get('ip'),
+            protocols=split('protocol')
+        )
+        if subscription is None:
+            return jsonify({'success': False, 'error': 'Too many alert stream subscribers'}), 503
+        response = Response(ids_monitor.alert_events(subscription), mimetype='text/event-stream')
+        response.headers['Cache-Control'] = 'no-cache'
+        # Stop nginx-style proxies from buffering the stream
+        response.headers['X-Accel-Buffering'] = 'no'
+        return response
+    except Exception as e:
+        logger.error(f"Error opening IDS alert stream: {str(e)}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
 @app.route('/integrations/auto-detect', methods=['GET'])
 @verify_firebase_token
 def auto_detect_integrations():
@@ -1165,6 +1377,18 @@ def get_incidents_from_json():
         if not os.path.exists(json_file_path):
             return jsonify({'success': False, 'error': 'Incident data file not found'}), 404
 
+        stream = request.args.get('stream')
+        if stream and stream not in STREAM_FORMATS:
+            return jsonify({'success': False, 'error': f"stream must be one of {', '.join(STREAM_FORMATS)}"}), 400
+        if stream or 'limit' in request.args or 'cursor' in request.args:
+            # Parsed element by element; the cursor is the byte offset after the last element sent
+            limit = request.args.get('limit', type=int)
+            start = request.args.get('cursor', '0')
+            if not start.isdigit():
+                return jsonify({'success': False, 'error': f"Invalid cursor: {start}"}), 400
+            pairs = ((incident, str(offset)) for offset, incident in iter_json_array(json_file_path, int(start)))
+            return paged_response(pairs, limit, stream)
+
         with open(json_file_path, 'r') as f:
             incidents = json.load(f)
 
@@ -1178,40 +1402,25 @@ def get_incidents_from_json():
 def get_incidents_from_ids():
     """Get security incidents from IDS logs (only actual incidents, not normal traffic)"""
     try:
-        ids_file_path = os.path.join(os.path.dirname(__file__), 'services', 'ids_logs.json')
-
-        if not os.path.exists(ids_file_path):
+        # Right after a rotation the active file is gone until the next flush, but its segments are not
+        if not os.path.exists(ids_log_file) and not list_segments(ids_log_file):
             return jsonify({'success': False, 'error': 'IDS logs file not found'}), 404
 
-        with open(ids_file_path, 'r') as f:
-            ids_logs = [json.loads(line.strip()) for line in f if line.strip()]
-
-        # Filter to only actual incidents (not normal traffic)
-        incidents = []
-        for log in ids_logs:
-            # Only include logs that are actual security incidents
-            if (log.get('alert_level') != 'normal' and log.get('ml_prediction') == 1):
-                # Transform IDS log to incident format
-                incident = {
-                    'timestamp': log.get('timestamp'),
-                    'eventid': f"IDS-{log.get('timestamp', '').replace(' ', '-').replace(':', '-')}",
-                    'severity': 'Critical' if log.get('alert_level') == 'alert' else 'High',
-                    'sourceip': log.get('source_ip'),
-                    'destinationip': log.get('destination_ip'),
-                    'attacktype': log.get('detection', 'Unknown'),
-                    'status': 'open' if log.get('status') == 'blocked' else 'investigating',
-                    'actiontaken': 'Blocked' if log.get('status') == 'blocked' else 'Alert Sent',
-                    'protocol': log.get('protocol'),
-                    'packet_size': log.get('packet_size'),
-                    'frequency': log.get('frequency'),
-                    'http_traffic': log.get('http_traffic', False)
-                }
-                incidents.append(incident)
-
-        # Sort by timestamp (most recent first)
-        incidents.sort(key=lambda x: x.get('timestamp', ''), reverse=True)
-
-        return jsonify({'success': True, 'data': incidents}), 200
+        limit = request.args.get('limit', type=int)
+        if limit is not None and limit <= 0:
+            return jsonify({'success': False, 'error': 'limit must be a positive integer'}), 400
+        stream = request.args.get('stream')
+        if stream and stream not in STREAM_FORMATS:
+            return jsonify({'success': False, 'error': f"stream must be one of {', '.join(STREAM_FORMATS)}"}), 400
+        try:
+            # Served from a view that only reads what was logged since the last request
+            if stream:
+                return paged_response(ids_monitor.iter_incidents(request.args.get('cursor')), limit, stream)
+            incidents, next_cursor = ids_monitor.get_incidents(limit=limit, cursor=request.args.get('cursor'))
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+
+        return jsonify({'success': True, 'data': incidents, 'next_cursor': next_cursor}), 200
     except Exception as e:
         logger.error(f"Error reading incidents from IDS logs: {str(e)}")
         return jsonify({'success': False, 'error': str(e)}), 500
@@ -1,10 +1,272 @@
-import requests
+import codecs
+import csv
 import logging
+import re
+import threading
+import time
 from datetime import datetime
 from config import Config
+from services.http_client import get_http_client
 
 logger = logging.getLogger(__name__)
 
+# Cache keys for the two CSV exports
+INCIDENTS = 'incidents'
+USERS = 'users'
+
+# Bytes read from a streamed export at a time
+CHUNK_SIZE = 64 * 1024
+
+# Canonical spellings; sheet values are matched case-insensitively and rewritten to these
+SEVERITIES = ('Critical', 'High', 'Medium', 'Low', 'Info')
+STATUSES = ('Open', 'Investigating', 'Contained', 'Mitigated', 'Resolved', 'Closed', 'Blocked')
+_SEVERITY_NAMES = {severity.lower(): severity for severity in SEVERITIES}
+_STATUS_NAMES = {status.lower(): status for status in STATUSES}
+
+# Timestamps are rewritten to the first format; the others are what the sheet may hold
+TIMESTAMP_FORMATS = ('%Y-%m-%d %H:%M:%S', '%Y-%m-%dT%H:%M:%S', '%Y-%m-%d %H:%M', '%m/%d/%Y %H:%M:%S',
+                     '%m/%d/%Y %H:%M', '%Y-%m-%d')
+
+
+def iter_lines(response):
+    """Lines of a streamed response as they arrive, newlines kept so csv can handle quoted ones"""
+    decoder = codecs.getincrementaldecoder('utf-8-sig')('replace')
+    pending = ''
+    for chunk in response.iter_content(CHUNK_SIZE):
+        pending += decoder.decode(chunk)
+        start = 0
+        end = pending.find('\n')
+        while end != -1:
+            yield pending[start:end + 1]
+            start = end + 1
+            end = pending.find('\n', start)
+        pending = pending[start:]
+    pending += decoder.decode(b'', final=True)
+    if pending:
+        yield pending
+
+
+def iter_rows(lines):
+    """(sheet row number, record) for each non-empty CSV row; records are keyed by the
+    normalized header ('Event ID' -> 'eventid')"""
+    reader = csv.reader(lines)
+    header = next(reader, None)
+    if not header:
+        return
+    keys = [name.lower().replace(' ', '') for name in header]
+    width = len(keys)
+    for row_number, values in enumerate(reader, start=2):
+        if not any(values):
+            continue
+        if len(values) < width:
+            values += [''] * (width - len(values))
+        yield row_number, dict(zip(keys, values))
+
+
+def normalize_timestamp(value):
+    value = value.strip()
+    if len(value) == 19 and value[4] == '-' and value[10] == ' ':
+        return value  # Already canonical, the common case
+    for timestamp_format in TIMESTAMP_FORMATS[1:]:
+        try:
+            return datetime.strptime(value, timestamp_format).strftime(TIMESTAMP_FORMATS[0])
+        except ValueError:
+            continue
+    return value
+
+
+def iter_incidents(lines):
+    """(row number, incident) from export lines, with canonical timestamp, severity and status"""
+    for row_number, incident in iter_rows(lines):
+        if 'timestamp' in incident:
+            incident['timestamp'] = normalize_timestamp(incident['timestamp'])
+        if 'severity' in incident:
+            severity = incident['severity'].strip()
+            incident['severity'] = _SEVERITY_NAMES.get(severity.lower(), severity)
+        if 'status' in incident:
+            status = incident['status'].strip()
+            incident['status'] = _STATUS_NAMES.get(status.lower(), status)
+        yield row_number, incident
+
+
+class RowIndex:
+    """Sheet row of each incident's event ID, so status updates can write straight to it.
+
+    Rebuilt whenever the incidents export is downloaded and extended on every
+    append, so it outlives the cache invalidation that follows a write.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.rows = {}
+
+    def replace(self, rows):
+        with self.lock:
+            self.rows = rows
+
+    def add(self, event_ids, first_row):
+        with self.lock:
+            for offset, event_id in enumerate(event_ids):
+                self.rows.setdefault(event_id, first_row + offset)
+
+    def get(self, event_id):
+        with self.lock:
+            return self.rows.get(event_id)
+
+
+class ExportCache:
+    """Parsed CSV exports shared by every GoogleSheetsService instance.
+
+    An entry is fresh for `ttl` seconds. For `stale_ttl` seconds after that
+    it is still served while one background request revalidates it, sent
+    with the ETag/Last-Modified the export came with so an unchanged sheet
+    costs a 304 and no download. Older entries are fetched synchronously.
+    """
+
+    def __init__(self, ttl=None, stale_ttl=None):
+        self.ttl = Config.SHEETS_CACHE_TTL if ttl is None else ttl
+        self.stale_ttl = Config.SHEETS_CACHE_STALE_TTL if stale_ttl is None else stale_ttl
+        self.lock = threading.Lock()
+        self.entries = {}
+        # Bumped by invalidate so a refresh that started before a write cannot store pre-write data
+        self.generations = {}
+        self.refreshing = set()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self.invalidations = 0
+
+    def get(self, key, fetch):
+        """Cached value for `key`; fetch(entry) returns a new entry, the given one if unchanged, or None"""
+        if not self.ttl:
+            entry = fetch(None)
+            return entry['value'] if entry else None
+        with self.lock:
+            entry = self.entries.get(key)
+            age = time.monotonic() - entry['fetched_at'] if entry else None
+            if entry and age < self.ttl:
+                self.hits += 1
+                return entry['value']
+            if entry and age < self.ttl + self.stale_ttl:
+                self.stale_hits += 1
+                if key not in self.refreshing:
+                    self.refreshing.add(key)
+                    threading.Thread(target=self._refresh, args=(key, fetch, entry), daemon=True).start()
+                return entry['value']
+            self.misses += 1
+        entry = self._fetch(key, fetch, entry)
+        return entry['value'] if entry else None
+
+    def invalidate(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+            self.generations[key] = self.generations.get(key, 0) + 1
+            self.invalidations += 1
+
+    def get_stats(self):
+        with self.lock:
+            lookups = self.hits + self.stale_hits + self.misses
+            return {
+                'ttl': self.ttl,
+                'stale_ttl': self.stale_ttl,
+                'hits': self.hits,
+                'stale_hits': self.stale_hits,
+                'misses': self.misses,
+                'not_modified': self.not_modified,
+                'invalidations': self.invalidations,
+                'hit_ratio': round((self.hits + self.stale_hits) / lookups, 3) if lookups else None
+            }
+
+    def _fetch(self, key, fetch, entry):
+        with self.lock:
+            generation = self.generations.get(key, 0)
+        new_entry = fetch(entry)
+        if new_entry is None:
+            return None
+        with self.lock:
+            if new_entry is entry:
+                self.not_modified += 1
+            new_entry['fetched_at'] = time.monotonic()
+            if self.generations.get(key, 0) == generation:
+                self.entries[key] = new_entry
+        return new_entry
+
+    def _refresh(self, key, fetch, entry):
+        try:
+            self._fetch(key, fetch, entry)
+        except Exception as e:
+            logger.warning(f"Background refresh of the {key} export failed: {e}")
+        finally:
+            with self.lock:
+                self.refreshing.discard(key)
+
+
+_cache = ExportCache()
+_row_index = RowIndex()
+
+# First row number in a values:append reply's updatedRange ("Sheet1!A12:H14" -> 12)
+_UPDATED_RANGE_ROW = re.compile(r'![A-Z]+(\d+)')
+
+
+class AppendCoalescer:
+    """Sends rows appended to one sheet within `window` seconds as a single values:append call.
+
+    The first caller of a batch waits out the window, sends everything that
+    arrived meanwhile, and hands each caller the result for its own rows.
+    """
+
+    def __init__(self, append, window=None):
+        self.append = append
+        self.window = Config.SHEETS_APPEND_WINDOW_MS / 1000 if window is None else window
+        self.lock = threading.Lock()
+        self.pending = None
+        self.calls = 0
+        self.submitted = 0
+
+    def submit(self, rows):
+        """Append `rows`; returns {'success', 'first_row', 'row_count'} or {'success', 'error'} for them"""
+        waiter = {'rows': rows, 'done': threading.Event(), 'result': None}
+        with self.lock:
+            self.submitted += 1
+            leader = self.pending is None
+            if leader:
+                self.pending = []
+            self.pending.append(waiter)
+        if leader:
+            if self.window:
+                time.sleep(self.window)
+            with self.lock:
+                batch, self.pending = self.pending, None
+            self._flush(batch)
+        waiter['done'].wait()
+        return waiter['result']
+
+    def get_stats(self):
+        with self.lock:
+            return {'window': self.window, 'submitted': self.submitted, 'append_calls': self.calls}
+
+    def _flush(self, batch):
+        self.calls += 1
+        try:
+            result = self.append([row for waiter in batch for row in waiter['rows']])
+        except Exception as e:
+            result = {'success': False, 'error': str(e)}
+        first_row = result.get('first_row')
+        for waiter in batch:
+            if result['success']:
+                waiter['result'] = {'success': True, 'first_row': first_row, 'row_count': len(waiter['rows'])}
+                if first_row:
+                    first_row += len(waiter['rows'])
+            else:
+                waiter['result'] = result
+            waiter['done'].set()
+
+
+_appenders = {}
+_appenders_lock = threading.Lock()
+
+
 class GoogleSheetsService:
     def __init__(self):
         self.api_key = Config.GOOGLE_SHEETS_API_KEY
@@ -12,6 +274,54 @@ class GoogleSheetsService:
         self.sheet_name = Config.GOOGLE_SHEETS_TAB
         self.users_sheet_name = 'Users'
         self.base_url = 'https://sheets.googleapis.com/v4/spreadsheets'
+        self.cache = _cache
+        self.row_index = _row_index
+        self.http = get_http_client()
+
+    def get_cache_stats(self):
+        """Hit/miss counters of the shared export cache"""
+        return self.cache.get_stats()
+
+    def _appender(self, sheet_name, last_column):
+        """The AppendCoalescer for a sheet, shared by every instance so concurrent adds coalesce"""
+        key = (self.spreadsheet_id, sheet_name)
+        with _appenders_lock:
+            if key not in _appenders:
+                _appenders[key] = AppendCoalescer(lambda rows: self._append_rows(sheet_name, last_column, rows))
+            return _appenders[key]
+
+    def _append_rows(self, sheet_name, last_column, rows):
+        """Insert rows after the sheet's last row in one call, without reading it first"""
+        url = f"{self.base_url}/{self.spreadsheet_id}/values/{sheet_name}!A:{last_column}:append"
+        params = {'key': self.api_key, 'valueInputOption': 'RAW', 'insertDataOption': 'INSERT_ROWS'}
+        response = self.http.post(url, json={'values': rows}, params=params)
+        if response.status_code != 200:
+            logger.error(f"Failed to append {len(rows)} rows to {sheet_name}: {response.text}")
+            return {'success': False, 'status_code': response.status_code,
+                    'error': response.json().get('error', {}).get('message', 'Failed to append rows')}
+        match = _UPDATED_RANGE_ROW.search(response.json().get('updates', {}).get('updatedRange', ''))
+        return {'success': True, 'first_row': int(match.group(1)) if match else None}
+
+    def _fetch_export(self, url, parse, entry):
+        """Stream a CSV export into parse(lines), conditionally when `entry` has validators.
+
+        Returns a cache entry, `entry` itself if the export is unchanged, or None.
+        """
+        headers = {}
+        if entry and entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry and entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        with self.http.get(url, headers=headers, stream=True) as response:
+            if response.status_code == 304 and entry:
+                return entry
+            if response.status_code != 200:
+                return None
+            return {
+                'value': parse(iter_lines(response)),
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified')
+            }
 
     def initialize_sheet(self):
         """Initialize the spreadsheet with headers"""
@@ -30,8 +340,9 @@ class GoogleSheetsService:
         params = {'key': self.api_key, 'valueInputOption': 'RAW'}
         data = {'values': [headers]}
 
-        response = requests.put(url, json=data, params=params)
+        response = self.http.put(url, json=data, params=params)
         if response.status_code == 200:
+            self.cache.invalidate(INCIDENTS)
             return {'success': True, 'data': response.json()}
         else:
             logger.error(f"Failed to initialize sheet: {response.text}")
@@ -53,21 +364,9 @@ class GoogleSheetsService:
             incident.get('actiontaken', 'Alert Sent')
         ]
 
-        # Get current row count
-        range_url = f"{self.base_url}/{self.spreadsheet_id}/values/{self.sheet_name}"
-        response = requests.get(range_url, params={'key': self.api_key})
-        if response.status_code != 200:
-            return {'success': False, 'error': 'Failed to get sheet data'}
-
-        current_rows = len(response.json().get('values', []))
-        next_row = current_rows + 1
-
-        url = f"{self.base_url}/{self.spreadsheet_id}/values/{self.sheet_name}!A{next_row}:H{next_row}"
-        params = {'key': self.api_key, 'valueInputOption': 'RAW'}
-        data = {'values': [row_data]}
-
-        response = requests.put(url, json=data, params=params)
-        if response.status_code == 200:
+        result = self._appender(self.sheet_name, 'H').submit([row_data])
+        if result['success']:
+            self._index_appended([event_id], result)
             return {
                 'success': True,
                 'data': {
@@ -84,66 +383,159 @@ class GoogleSheetsService:
                 }
             }
         else:
-            logger.error(f"Failed to add incident: {response.text}")
-            return {'success': False, 'error': response.json().get('error', {}).get('message', 'Failed to add incident')}
+            return {'success': False, 'error': result.get('error', 'Failed to add incident')}
 
     def get_security_incidents(self):
         """Get all security incidents"""
-        csv_url = f"https://docs.google.com/spreadsheets/d/{self.spreadsheet_id}/export?format=csv"
-        response = requests.get(csv_url)
-        if response.status_code != 200:
+        incidents = self.cache.get(INCIDENTS, lambda entry: self._fetch_export(
+            self._incidents_export_url(), self._parse_incidents, entry))
+        if incidents is None:
             return {'success': False, 'error': 'Failed to fetch CSV data'}
+        return {'success': True, 'data': list(incidents)}
 
-        lines = response.text.strip().split('\n')
-        if len(lines) <= 1:
-            return {'success': True, 'data': []}
+    def iter_security_incidents(self):
+        """Incidents straight from the export as it downloads, bypassing the cache; stop whenever.
 
-        header_row = lines[0].split(',')
+        Raises requests.HTTPError if the export cannot be fetched.
+        """
+        with self.http.get(self._incidents_export_url(), stream=True) as response:
+            response.raise_for_status()
+            for _, incident in iter_incidents(iter_lines(response)):
+                yield incident
+
+    def _incidents_export_url(self):
+        return f"https://docs.google.com/spreadsheets/d/{self.spreadsheet_id}/export?format=csv"
+
+    def _parse_incidents(self, lines):
+        """Incidents from a fresh export; rebuilds the row index as a side effect"""
         incidents = []
-        for line in lines[1:]:
-            values = line.split(',')
-            incident = {}
-            for i, header in enumerate(header_row):
-                incident[header.lower().replace(' ', '')] = values[i] if i < len(values) else ''
+        rows = {}
+        for row_number, incident in iter_incidents(lines):
             incidents.append(incident)
-
-        return {'success': True, 'data': incidents}
+            rows.setdefault(incident.get('eventid'), row_number)
+        self.row_index.replace(rows)
+        return incidents
+
+    def _index_appended(self, event_ids, result):
+        """Record where appended incidents landed and drop the cached export"""
+        if result.get('first_row'):
+            self.row_index.add(event_ids, result['first_row'])
+        self.cache.invalidate(INCIDENTS)
+
+    def _find_rows(self, event_ids):
+        """Sheet row for each event ID (None if not in the sheet); downloads the export only
+        when the index does not know an ID, e.g. one added by another client"""
+        rows = {event_id: self.row_index.get(event_id) for event_id in event_ids}
+        if None in rows.values():
+            self.cache.invalidate(INCIDENTS)
+            if not self.get_security_incidents()['success']:
+                return None
+            rows = {event_id: self.row_index.get(event_id) for event_id in event_ids}
+        return rows
+
+    def _verified_rows(self, event_ids):
+        """_find_rows, with the cached rows checked against the sheet's event ID column first.
+
+        Rows move when someone sorts the sheet or deletes rows above them, so a
+        write to a cached row could land on another incident. If any row no
+        longer holds its event ID, the index is rebuilt from a fresh export.
+        """
+        rows = self._find_rows(event_ids)
+        if rows is None:
+            return None
+        found = {event_id: row_number for event_id, row_number in rows.items() if row_number is not None}
+        if not found:
+            return rows
+        actual = self._read_event_ids(list(found.values()))
+        if actual is None:
+            return None
+        if all(actual.get(row_number) == event_id for event_id, row_number in found.items()):
+            return rows
+        logger.warning("Incident rows moved in the sheet; rebuilding the row index")
+        self.cache.invalidate(INCIDENTS)
+        if not self.get_security_incidents()['success']:
+            return None
+        return {event_id: self.row_index.get(event_id) for event_id in event_ids}
+
+    def _read_event_ids(self, row_numbers):
+        """{row number: event ID cell} for the given sheet rows, in one batchGet call; None on failure"""
+        url = f"{self.base_url}/{self.spreadsheet_id}/values:batchGet"
+        params = {'key': self.api_key, 'ranges': [f"{self.sheet_name}!B{row_number}" for row_number in row_numbers]}
+        response = self.http.get(url, params=params)
+        if response.status_code != 200:
+            logger.error(f"Failed to read incident event IDs: {response.text}")
+            return None
+        value_ranges = response.json().get('valueRanges', [])
+        return {
+            row_number: str(((value_range.get('values') or [[]])[0] or [''])[0]).strip()
+            for row_number, value_range in zip(row_numbers, value_ranges)
+        }
 
     def update_incident_status(self, event_id, new_status, action_taken):
         """Update incident status"""
-        incidents = self.get_security_incidents()
-        if not incidents['success']:
-            return incidents
-
-        incident_index = None
-        for i, inc in enumerate(incidents['data']):
-            if inc.get('eventid') == event_id:
-                incident_index = i
-                break
-
-        if incident_index is None:
+        rows = self._verified_rows([event_id])
+        if rows is None:
+            return {'success': False, 'error': 'Failed to fetch CSV data'}
+        row_number = rows[event_id]
+        if row_number is None:
             return {'success': False, 'error': 'Incident not found'}
 
-        row_number = incident_index + 2  # +1 for header, +1 for 1-based
-
         url = f"{self.base_url}/{self.spreadsheet_id}/values/{self.sheet_name}!G{row_number}:H{row_number}"
         params = {'key': self.api_key, 'valueInputOption': 'RAW'}
         data = {'values': [[new_status, action_taken]]}
 
-        response = requests.put(url, json=data, params=params)
+        response = self.http.put(url, json=data, params=params)
         if response.status_code == 200:
+            self.cache.invalidate(INCIDENTS)
             return {'success': True, 'data': response.json()}
         else:
             logger.error(f"Failed to update incident: {response.text}")
             return {'success': False, 'error': response.json().get('error', {}).get('message', 'Failed to update incident')}
 
+    def bulk_update_incident_status(self, updates):
+        """Update the status of many incidents in one batchUpdate call.
+
+        `updates` holds {'eventId', 'status', 'actionTaken'} dicts; IDs not in the
+        sheet are reported in notFound and the rest are still updated.
+        """
+        rows = self._verified_rows([update['eventId'] for update in updates])
+        if rows is None:
+            return {'success': False, 'error': 'Failed to fetch CSV data'}
+
+        data = []
+        updated = []
+        not_found = []
+        for update in updates:
+            row_number = rows[update['eventId']]
+            if row_number is None:
+                not_found.append(update['eventId'])
+                continue
+            data.append({
+                'range': f"{self.sheet_name}!G{row_number}:H{row_number}",
+                'values': [[update['status'], update.get('actionTaken', 'Updated')]]
+            })
+            updated.append(update['eventId'])
+
+        if data:
+            url = f"{self.base_url}/{self.spreadsheet_id}/values:batchUpdate"
+            params = {'key': self.api_key}
+            response = self.http.post(url, json={'valueInputOption': 'RAW', 'data': data}, params=params)
+            if response.status_code != 200:
+                logger.error(f"Failed to bulk update incidents: {response.text}")
+                return {'success': False, 'status_code': response.status_code,
+                        'error': response.json().get('error', {}).get('message', 'Failed to bulk update incidents')}
+            self.cache.invalidate(INCIDENTS)
+        return {'success': True, 'data': {'updated': updated, 'notFound': not_found}}
+
     def bulk_add_incidents(self, incidents_list):
         """Bulk add multiple incidents"""
         rows = []
+        event_ids = []
         for incident in incidents_list:
             timestamp = incident.get('timestamp') or datetime.now().strftime('%Y-%m-%d %H:%M:%S')
             event_id = incident.get('eventId') or f"INC-{datetime.now().strftime('%Y%m%d')}-{str(hash(str(incident)) % 1000).zfill(3)}"
 
+            event_ids.append(event_id)
             rows.append([
                 timestamp,
                 event_id,
@@ -155,26 +547,13 @@ class GoogleSheetsService:
                 incident.get('actionTaken', 'Alert Sent')
             ])
 
-        # Get current row count
-        range_url = f"{self.base_url}/{self.spreadsheet_id}/values/{self.sheet_name}"
-        response = requests.get(range_url, params={'key': self.api_key})
-        if response.status_code != 200:
-            return {'success': False, 'error': 'Failed to get sheet data'}
-
-        current_rows = len(response.json().get('values', []))
-        start_row = current_rows + 1
-        end_row = start_row + len(rows) - 1
-
-        url = f"{self.base_url}/{self.spreadsheet_id}/values/{self.sheet_name}!A{start_row}:H{end_row}"
-        params = {'key': self.api_key, 'valueInputOption': 'RAW'}
-        data = {'values': rows}
-
-        response = requests.put(url, json=data, params=params)
-        if response.status_code == 200:
+        result = self._appender(self.sheet_name, 'H').submit(rows)
+        if result['success']:
+            self._index_appended(event_ids, result)
             return {'success': True, 'data': {'addedCount': len(rows)}}
         else:
-            logger.error(f"Failed to bulk add incidents: {response.text}")
-            return {'success': False, 'error': response.json().get('error', {}).get('message', 'Failed to bulk add incidents')}
+            return {'success': False, 'status_code': result.get('status_code'),
+                    'error': result.get('error', 'Failed to bulk add incidents')}
 
     def initialize_users_sheet(self):
         """Initialize the users sheet with headers"""
@@ -184,8 +563,9 @@ class GoogleSheetsService:
         params = {'key': self.api_key, 'valueInputOption': 'RAW'}
         data = {'values': [headers]}
 
-        response = requests.put(url, json=data, params=params)
+        response = self.http.put(url, json=data, params=params)
         if response.status_code == 200:
+            self.cache.invalidate(USERS)
             return {'success': True, 'data': response.json()}
         else:
             logger.error(f"Failed to initialize users sheet: {response.text}")
@@ -197,51 +577,36 @@ class GoogleSheetsService:
 
         row_data = [email, role, created_at]
 
-        # Get current row count
-        range_url = f"{self.base_url}/{self.spreadsheet_id}/values/{self.users_sheet_name}"
-        response = requests.get(range_url, params={'key': self.api_key})
-        if response.status_code != 200:
+        appender = self._appender(self.users_sheet_name, 'C')
+        result = appender.submit([row_data])
+        if not result['success']:
             # Try to initialize the sheet
             init_result = self.initialize_users_sheet()
             if not init_result['success']:
                 return {'success': False, 'error': 'Failed to initialize users sheet'}
-            # Retry get
-            response = requests.get(range_url, params={'key': self.api_key})
-            if response.status_code != 200:
-                return {'success': False, 'error': 'Failed to get users sheet data after initialization'}
-
-        current_rows = len(response.json().get('values', []))
-        next_row = current_rows + 1
-
-        url = f"{self.base_url}/{self.spreadsheet_id}/values/{self.users_sheet_name}!A{next_row}:C{next_row}"
-        params = {'key': self.api_key, 'valueInputOption': 'RAW'}
-        data = {'values': [row_data]}
+            result = appender.submit([row_data])
 
-        response = requests.put(url, json=data, params=params)
-        if response.status_code == 200:
+        if result['success']:
+            self.cache.invalidate(USERS)
             return {'success': True, 'data': {'email': email, 'role': role, 'createdAt': created_at}}
         else:
-            logger.error(f"Failed to add user: {response.text}")
-            return {'success': False, 'error': response.json().get('error', {}).get('message', 'Failed to add user')}
+            return {'success': False, 'error': result.get('error', 'Failed to add user')}
 
     def get_user_by_email(self, email):
         """Get user by email"""
         csv_url = f"https://docs.google.com/spreadsheets/d/{self.spreadsheet_id}/export?format=csv&sheet={self.users_sheet_name}"
-        response = requests.get(csv_url)
-        if response.status_code != 200:
+        users = self.cache.get(USERS, lambda entry: self._fetch_export(csv_url, self._parse_users, entry))
+        if users is None:
             return {'success': False, 'error': 'Failed to fetch users CSV data'}
-
-        lines = response.text.strip().split('\n')
-        if len(lines) <= 1:
-            return {'success': True, 'data': None}
-
-        header_row = lines[0].split(',')
-        for line in lines[1:]:
-            values = line.split(',')
-            if len(values) >= 2 and values[0] == email:
-                user = {}
-                for i, header in enumerate(header_row):
-                    user[header.lower().replace(' ', '')] = values[i] if i < len(values) else ''
-                return {'success': True, 'data': user}
-
-        return {'success': True, 'data': None}
+        user = users.get(email)
+        return {'success': True, 'data': dict(user) if user else None}
+
+    @staticmethod
+    def _parse_users(lines):
+        """Users keyed by email; the first row for an email wins"""
+        users = {}
+        for _, user in iter_rows(lines):
+            email = next(iter(user.values()))
+            if email not in users:
+                users[email] = user
+        return users
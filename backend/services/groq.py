@@ -1,70 +1,263 @@
+import concurrent.futures
 import json
 import logging
-from groq import Groq
 from config import Config
+from services.groq_scheduler import INTERACTIVE, get_groq_scheduler
+from services.llm_cache import get_response_cache
 
 logger = logging.getLogger(__name__)
 
+ANALYSIS_MODEL = 'meta-llama/llama-guard-4-12b'
+# Completion tokens per analysis call, just under the model's completion limit; caps how many events fit one prompt
+ANALYSIS_MAX_TOKENS = 1000
+# Completion tokens set aside for each event packed into a batch prompt
+BATCH_TOKENS_PER_EVENT = 200
+# Events whose analyzed fields serialize to more than this are sent on their own
+PACK_MAX_CHARS = 1000
+
 class GroqService:
-    def __init__(self):
-        self.client = Groq(api_key=Config.GROQ_API_KEY)
+    def __init__(self, priority=INTERACTIVE):
+        # Calls queue behind higher-priority ones in the shared scheduler
+        self.scheduler = get_groq_scheduler()
+        self.priority = priority
+        self.cache = get_response_cache()
+        # Seconds a method's completions are reused for identical input; 0 disables
+        self.cache_ttls = {
+            'analyze_security_event': Config.GROQ_CACHE_TTL_ANALYSIS,
+            'get_threat_intelligence': Config.GROQ_CACHE_TTL_INTEL,
+            'generate_incident_report': Config.GROQ_CACHE_TTL_REPORT
+        }
+
+    def get_cache_stats(self):
+        return self.cache.get_stats()
+
+    def _cached_completion(self, method, messages, model, temperature, max_tokens):
+        """Completion content, from the response cache when `method` caches and has seen this input"""
+        ttl = self.cache_ttls.get(method)
+        if ttl:
+            content = self.cache.get(model, messages, temperature, max_tokens)
+            if content is not None:
+                return content
+        response = self.scheduler.complete_sync(
+            self.priority,
+            messages=messages,
+            model=model,
+            temperature=temperature,
+            max_tokens=max_tokens
+        )
+        content = response.choices[0].message.content
+        if ttl and content:
+            usage = getattr(response, 'usage', None)
+            self.cache.put(model, messages, temperature, max_tokens, content,
+                           getattr(usage, 'total_tokens', 0), ttl)
+        return content
 
     def analyze_security_event(self, event_data):
         """Analyze security events using Groq AI"""
         try:
-            prompt = f"""
-            Analyze this security event and provide insights:
-
-            Source IP: {event_data.get('sourceIp')}
-            Destination IP: {event_data.get('destinationIp')}
-            Event Type: {event_data.get('eventType')}
-            Timestamp: {event_data.get('timestamp')}
-            Additional Info: {json.dumps(event_data.get('additionalInfo', {}))}
+            content = self._cached_completion(
+                'analyze_security_event', self._analysis_messages(event_data),
+                ANALYSIS_MODEL, 0.1, ANALYSIS_MAX_TOKENS
+            )
+            return {'success': True, 'data': self._parse_analysis(content)}
+        except Exception as e:
+            logger.error(f"Groq analysis error: {str(e)}")
+            return {'success': False, 'error': str(e)}
 
-            Please provide:
-            1. Threat severity assessment (High, Medium, Low)
-            2. Attack type classification
-            3. Recommended actions
-            4. Brief explanation of the threat
+    def analyze_security_events(self, events, batch_size=None, on_progress=None):
+        """analyze_security_event for many events; returns its results in the same order.
+
+        Cached analyses are reused, small events are packed up to batch_size
+        to a prompt (as many as the model's completion limit allows), and the
+        prompts run concurrently through the scheduler. Events a batch answer
+        leaves out are retried on their own. on_progress(analyzed) is called
+        as results come in.
+        """
+        batch_size = max(1, min(batch_size or Config.TRIAGE_BATCH_SIZE, ANALYSIS_MAX_TOKENS // BATCH_TOKENS_PER_EVENT))
+        results = [None] * len(events)
+        analyzed = [0]
+        ttl = self.cache_ttls.get('analyze_security_event')
+
+        def finish(index, result):
+            results[index] = result
+            analyzed[0] += 1
+            if on_progress:
+                on_progress(analyzed[0])
+
+        small, large = [], []
+        for index, event in enumerate(events):
+            content = self.cache.get(ANALYSIS_MODEL, self._analysis_messages(event), 0.1, ANALYSIS_MAX_TOKENS) \
+                if ttl else None
+            if content is not None:
+                finish(index, {'success': True, 'data': self._parse_analysis(content)})
+            elif len(json.dumps(self._analysis_fields(event), default=str)) <= PACK_MAX_CHARS:
+                small.append(index)
+            else:
+                large.append(index)
 
-            Format your response as a JSON object with keys: severity, attackType, actions, explanation
-            """
+        pending = {}
 
-            response = self.client.chat.completions.create(
-                messages=[
-                    {
-                        'role': 'system',
-                        'content': 'You are a cybersecurity expert analyzing security events. Always respond with valid JSON.'
-                    },
-                    {
-                        'role': 'user',
-                        'content': prompt
-                    }
-                ],
-                model='meta-llama/llama-guard-4-12b',
+        def submit_single(index):
+            future = self.scheduler.submit(
+                self.priority,
+                messages=self._analysis_messages(events[index]),
+                model=ANALYSIS_MODEL,
                 temperature=0.1,
-                max_tokens=1000
+                max_tokens=ANALYSIS_MAX_TOKENS
             )
-
-            content = response.choices[0].message.content
-            # Clean up response - more robust cleaning
-            cleaned_content = content.replace('```json', '').replace('```', '').strip()
-            # Remove any leading/trailing non-JSON text
-            start_idx = cleaned_content.find('{')
-            end_idx = cleaned_content.rfind('}') + 1
-            if start_idx != -1 and end_idx > start_idx:
-                json_content = cleaned_content[start_idx:end_idx]
+            pending[future] = [index]
+
+        for start in range(0, len(small), batch_size):
+            batch = small[start:start + batch_size]
+            if len(batch) == 1:
+                submit_single(batch[0])
+                continue
+            future = self.scheduler.submit(
+                self.priority,
+                messages=self._batch_analysis_messages([events[index] for index in batch]),
+                model=ANALYSIS_MODEL,
+                temperature=0.1,
+                max_tokens=min(ANALYSIS_MAX_TOKENS, BATCH_TOKENS_PER_EVENT * len(batch))
+            )
+            pending[future] = batch
+        for index in large:
+            submit_single(index)
+
+        while pending:
+            done, _ = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                indices = pending.pop(future)
                 try:
-                    ai_analysis = json.loads(json_content)
-                except json.JSONDecodeError:
-                    ai_analysis = {'severity': 'Medium', 'attackType': 'Unknown', 'actions': 'Investigate', 'explanation': content}
-            else:
-                ai_analysis = {'severity': 'Medium', 'attackType': 'Unknown', 'actions': 'Investigate', 'explanation': content}
-
-            return {'success': True, 'data': ai_analysis}
-        except Exception as e:
-            logger.error(f"Groq analysis error: {str(e)}")
-            return {'success': False, 'error': str(e)}
+                    response = future.result()
+                except Exception as e:
+                    logger.error(f"Groq analysis error: {str(e)}")
+                    if len(indices) == 1:
+                        finish(indices[0], {'success': False, 'error': str(e)})
+                    else:
+                        for index in indices:
+                            submit_single(index)
+                    continue
+                content = response.choices[0].message.content or ''
+                usage = getattr(getattr(response, 'usage', None), 'total_tokens', 0) or 0
+                if len(indices) == 1:
+                    analyses = {indices[0]: self._parse_analysis(content)}
+                else:
+                    analyses = self._parse_batch_analysis(content, indices)
+                for index in indices:
+                    analysis = analyses.get(index)
+                    if analysis is None:
+                        submit_single(index)
+                        continue
+                    if ttl:
+                        # Cached under the single-event prompt, so analyze_security_event reuses it
+                        self.cache.put(ANALYSIS_MODEL, self._analysis_messages(events[index]), 0.1,
+                                       ANALYSIS_MAX_TOKENS, json.dumps(analysis), usage // len(indices), ttl)
+                    finish(index, {'success': True, 'data': analysis})
+        return results
+
+    @staticmethod
+    def _analysis_fields(event_data):
+        return {
+            'sourceIp': event_data.get('sourceIp'),
+            'destinationIp': event_data.get('destinationIp'),
+            'eventType': event_data.get('eventType'),
+            'timestamp': event_data.get('timestamp'),
+            'additionalInfo': event_data.get('additionalInfo', {})
+        }
+
+    @staticmethod
+    def _analysis_messages(event_data):
+        prompt = f"""
+        Analyze this security event and provide insights:
+
+        Source IP: {event_data.get('sourceIp')}
+        Destination IP: {event_data.get('destinationIp')}
+        Event Type: {event_data.get('eventType')}
+        Timestamp: {event_data.get('timestamp')}
+        Additional Info: {json.dumps(event_data.get('additionalInfo', {}))}
+
+        Please provide:
+        1. Threat severity assessment (High, Medium, Low)
+        2. Attack type classification
+        3. Recommended actions
+        4. Brief explanation of the threat
+
+        Format your response as a JSON object with keys: severity, attackType, actions, explanation
+        """
+        return [
+            {
+                'role': 'system',
+                'content': 'You are a cybersecurity expert analyzing security events. Always respond with valid JSON.'
+            },
+            {
+                'role': 'user',
+                'content': prompt
+            }
+        ]
+
+    def _batch_analysis_messages(self, events):
+        numbered = [dict(self._analysis_fields(event), index=index) for index, event in enumerate(events)]
+        prompt = f"""
+        Analyze each of these security events and provide insights:
+
+        {json.dumps(numbered, indent=2, default=str)}
+
+        For every event, please provide:
+        1. Threat severity assessment (High, Medium, Low)
+        2. Attack type classification
+        3. Recommended actions
+        4. Brief explanation of the threat
+
+        Format your response as a JSON object with key "results": an array with one object per event,
+        with keys: index, severity, attackType, actions, explanation
+        """
+        return [
+            {
+                'role': 'system',
+                'content': 'You are a cybersecurity expert analyzing security events. Always respond with valid JSON.'
+            },
+            {
+                'role': 'user',
+                'content': prompt
+            }
+        ]
+
+    @staticmethod
+    def _parse_analysis(content):
+        # Clean up response - more robust cleaning
+        cleaned_content = content.replace('```json', '').replace('```', '').strip()
+        # Remove any leading/trailing non-JSON text
+        start_idx = cleaned_content.find('{')
+        end_idx = cleaned_content.rfind('}') + 1
+        if start_idx != -1 and end_idx > start_idx:
+            json_content = cleaned_content[start_idx:end_idx]
+            try:
+                return json.loads(json_content)
+            except json.JSONDecodeError:
+                pass
+        return {'severity': 'Medium', 'attackType': 'Unknown', 'actions': 'Investigate', 'explanation': content}
+
+    @staticmethod
+    def _parse_batch_analysis(content, indices):
+        """{event index: analysis} for the batch entries the answer covers; missing or malformed ones are left out"""
+        cleaned_content = content.replace('```json', '').replace('```', '').strip()
+        start_idx = cleaned_content.find('{')
+        end_idx = cleaned_content.rfind('}') + 1
+        try:
+            answers = json.loads(cleaned_content[start_idx:end_idx]).get('results')
+        except (ValueError, AttributeError):
+            return {}
+        analyses = {}
+        for answer in answers if isinstance(answers, list) else []:
+            if not isinstance(answer, dict):
+                continue
+            try:
+                position = int(answer.pop('index'))
+            except (KeyError, TypeError, ValueError):
+                continue
+            if 0 <= position < len(indices):
+                analyses[indices[position]] = answer
+        return analyses
 
     def generate_incident_report(self, incidents):
         """Generate security incident report"""
@@ -98,8 +291,9 @@ class GroqService:
             Format as JSON with keys: executiveSummary, statistics, topThreats, recommendations, riskAssessment
             """
 
-            response = self.client.chat.completions.create(
-                messages=[
+            content = self._cached_completion(
+                'generate_incident_report',
+                [
                     {
                         'role': 'system',
                         'content': 'You are a cybersecurity analyst creating incident reports. Always respond with valid JSON.'
@@ -109,12 +303,8 @@ class GroqService:
                         'content': prompt
                     }
                 ],
-                model='llama-3.1-8b-instant',
-                temperature=0.2,
-                max_tokens=2000
+                'llama-3.1-8b-instant', 0.2, 2000
             )
-
-            content = response.choices[0].message.content
             cleaned_content = content.replace('```json', '').replace('```', '').strip()
             # Remove any leading/trailing non-JSON text
             start_idx = cleaned_content.find('{')
@@ -157,8 +347,9 @@ class GroqService:
             Format as JSON with keys: incidentOverview, timeline, attackAnalysis, impactAssessment, responseActions, containment, recovery, lessonsLearned, evidence
             """
 
-            response = self.client.chat.completions.create(
-                messages=[
+            content = self._cached_completion(
+                'generate_incident_report',
+                [
                     {
                         'role': 'system',
                         'content': 'You are a senior cybersecurity incident response analyst. Provide detailed, technical incident reports with specific timelines, actions taken, and forensic details. Always respond with valid JSON.'
@@ -168,12 +359,8 @@ class GroqService:
                         'content': prompt
                     }
                 ],
-                model='llama-3.1-8b-instant',
-                temperature=0.1,
-                max_tokens=3000
+                'llama-3.1-8b-instant', 0.1, 3000
             )
-
-            content = response.choices[0].message.content
             cleaned_content = content.replace('```json', '').replace('```', '').strip()
             # Remove any leading/trailing non-JSON text
             start_idx = cleaned_content.find('{')
@@ -208,8 +395,9 @@ class GroqService:
             Format as JSON with keys: attackPatterns, iocs, prevention, threatLandscape, riskLevel
             """
 
-            response = self.client.chat.completions.create(
-                messages=[
+            content = self._cached_completion(
+                'get_threat_intelligence',
+                [
                     {
                         'role': 'system',
                         'content': 'You are a threat intelligence expert. Provide accurate and actionable security information. Always respond with valid JSON.'
@@ -219,12 +407,8 @@ class GroqService:
                         'content': prompt
                     }
                 ],
-                model='llama-3.1-8b-instant',
-                temperature=0.1,
-                max_tokens=1500
+                'llama-3.1-8b-instant', 0.1, 1500
             )
-
-            content = response.choices[0].message.content
             cleaned_content = content.replace('```json', '').replace('```', '').strip()
             # Remove any leading/trailing non-JSON text
             start_idx = cleaned_content.find('{')
@@ -246,7 +430,8 @@ class GroqService:
     def chat_completion(self, messages):
         """Generate chat completion using Groq AI"""
         try:
-            response = self.client.chat.completions.create(
+            response = self.scheduler.complete_sync(
+                self.priority,
                 messages=messages,
                 model='llama-3.1-8b-instant',
                 temperature=0.7,
@@ -263,6 +448,28 @@ class GroqService:
             logger.error(f"Groq chat completion error: {str(e)}")
             return {'success': False, 'error': str(e)}
 
+    def stream_chat_completion(self, messages):
+        """chat_completion streamed: yields ('token', {'content'}) as Groq produces the reply, then
+        ('done', <what chat_completion returns>) with the contextual actions, or ('error', {...})"""
+        pieces = []
+        try:
+            for piece in self.scheduler.stream_sync(
+                self.priority,
+                messages=messages,
+                model='llama-3.1-8b-instant',
+                temperature=0.7,
+                max_tokens=1000
+            ):
+                pieces.append(piece)
+                yield 'token', {'content': piece}
+        except Exception as e:
+            logger.error(f"Groq chat completion stream error: {str(e)}")
+            yield 'error', {'success': False, 'error': str(e)}
+            return
+        content = ''.join(pieces)
+        actions = self._generate_contextual_actions(messages, content)
+        yield 'done', {'success': True, 'data': {'content': content}, 'actions': actions}
+
     def _generate_contextual_actions(self, messages, content):
         """Generate contextual action buttons based on conversation and response content"""
         try:
@@ -471,7 +678,8 @@ class GroqService:
     def json_completion(self, messages, max_tokens=2000):
         """Generate JSON completion using Groq AI"""
         try:
-            response = self.client.chat.completions.create(
+            response = self.scheduler.complete_sync(
+                self.priority,
                 messages=messages,
                 model='llama-3.1-8b-instant',
                 temperature=0.1,
@@ -544,7 +752,8 @@ class GroqService:
                     'content': hist_msg.get('content', '')
                 })
 
-            response = self.client.chat.completions.create(
+            response = self.scheduler.complete_sync(
+                self.priority,
                 messages=messages,
                 model='llama-3.1-8b-instant',
                 temperature=0.3,
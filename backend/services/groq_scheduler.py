@@ -0,0 +1,313 @@
+"""Shared, rate-limit-aware scheduler for every Groq API call.
+
+Completions run on one asyncio loop in a background thread. Requests wait in
+a priority queue (interactive chat ahead of scheduled reports) and are sent
+by GROQ_CONCURRENCY workers, which first check the model's request and token
+budget as last reported in Groq's x-ratelimit-* response headers. 429s, 5xx
+responses and connection errors are retried with jittered exponential
+backoff. Flask routes call complete_sync (or stream_sync for tokens as
+they arrive); async code awaits complete, and several completions can be
+fanned out at once with complete_many_sync.
+"""
+import asyncio
+import concurrent.futures
+import inspect
+import itertools
+import logging
+import queue
+import random
+import re
+import threading
+import time
+
+from groq import APIConnectionError, APIStatusError, AsyncGroq
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# Marks the end of a streamed completion in a TokenSink
+_END = object()
+
+# Queue priorities, lower first
+INTERACTIVE = 0
+BACKGROUND = 10
+
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 20.0
+
+_DURATION = re.compile(r'([\d.]+)(ms|s|m|h)')
+_UNITS = {'ms': 0.001, 's': 1, 'm': 60, 'h': 3600}
+
+
+def parse_duration(value):
+    """Seconds in a Groq reset header ('2m59.56s', '120ms') or a plain number; None if absent"""
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return sum(float(amount) * _UNITS[unit] for amount, unit in _DURATION.findall(value))
+
+
+def estimate_tokens(params):
+    """Rough token cost of a request: ~4 characters per prompt token plus the completion allowance"""
+    characters = sum(len(message.get('content') or '') for message in params.get('messages', []))
+    return characters // 4 + (params.get('max_tokens') or 1000)
+
+
+class ModelBudget:
+    """What Groq last reported is left of a model's request and token allowances"""
+
+    def __init__(self):
+        self.remaining_requests = None
+        self.requests_reset_at = 0.0
+        self.remaining_tokens = None
+        self.tokens_reset_at = 0.0
+        self.blocked_until = 0.0
+
+    def update(self, headers, now):
+        remaining = headers.get('x-ratelimit-remaining-requests')
+        if remaining is not None:
+            self.remaining_requests = int(float(remaining))
+            self.requests_reset_at = now + (parse_duration(headers.get('x-ratelimit-reset-requests')) or 0)
+        remaining = headers.get('x-ratelimit-remaining-tokens')
+        if remaining is not None:
+            self.remaining_tokens = int(float(remaining))
+            self.tokens_reset_at = now + (parse_duration(headers.get('x-ratelimit-reset-tokens')) or 0)
+
+    def delay(self, tokens, now):
+        """Seconds until a request costing about `tokens` fits the budget"""
+        if now >= self.requests_reset_at:
+            self.remaining_requests = None
+        if now >= self.tokens_reset_at:
+            self.remaining_tokens = None
+        wait = self.blocked_until - now
+        if self.remaining_requests is not None and self.remaining_requests <= 0:
+            wait = max(wait, self.requests_reset_at - now)
+        if self.remaining_tokens is not None and self.remaining_tokens < tokens:
+            wait = max(wait, self.tokens_reset_at - now)
+        return max(0.0, wait)
+
+    def reserve(self, tokens):
+        """Count a request against the budget before Groq reports on it, so parallel workers do not overspend"""
+        if self.remaining_requests is not None:
+            self.remaining_requests -= 1
+        if self.remaining_tokens is not None:
+            self.remaining_tokens -= tokens
+
+    def get_stats(self, now):
+        return {
+            'remaining_requests': self.remaining_requests,
+            'remaining_tokens': self.remaining_tokens,
+            'blocked_for': round(max(0.0, self.blocked_until - now), 2)
+        }
+
+
+class TokenSink:
+    """Hands streamed content from the scheduler loop to the thread reading it"""
+
+    def __init__(self):
+        self.queue = queue.Queue()
+        # Once content has been handed over the request can no longer be retried
+        self.started = False
+        # Set when the reader goes away, so the loop stops pulling tokens nobody will read
+        self.closed = threading.Event()
+
+
+class GroqScheduler:
+    """Priority queue and worker pool in front of an AsyncGroq client"""
+
+    def __init__(self, api_key=None, concurrency=None, max_retries=None):
+        self.api_key = api_key or Config.GROQ_API_KEY
+        self.concurrency = concurrency or Config.GROQ_CONCURRENCY
+        self.max_retries = Config.GROQ_MAX_RETRIES if max_retries is None else max_retries
+        self.lock = threading.Lock()
+        self.loop = None
+        self.client = None
+        self.queue = None
+        self.sequence = itertools.count()
+        # Only touched on the loop thread
+        self.budgets = {}
+        self.completed = 0
+        self.failed = 0
+        self.retries = 0
+        self.throttled = 0
+        self.throttled_seconds = 0.0
+
+    def submit(self, priority=INTERACTIVE, **params):
+        """Queue a chat completion (chat.completions.create arguments); returns a concurrent.futures.Future"""
+        return self._enqueue(priority, params, None)
+
+    async def complete(self, priority=INTERACTIVE, **params):
+        """Chat completion, awaitable from any event loop"""
+        return await asyncio.wrap_future(self.submit(priority, **params))
+
+    def complete_sync(self, priority=INTERACTIVE, **params):
+        """Chat completion for synchronous callers such as Flask routes; raises what the API raised"""
+        return self.submit(priority, **params).result()
+
+    def stream_sync(self, priority=INTERACTIVE, **params):
+        """Yield a chat completion's content pieces as Groq streams them; raises what the API raised.
+
+        Queued and rate limited like any other request. Retries only happen
+        before the first piece arrives.
+        """
+        sink = TokenSink()
+        future = self._enqueue(priority, params, sink)
+        future.add_done_callback(lambda _: sink.queue.put(_END))
+        started = time.monotonic()
+        first = True
+        try:
+            while True:
+                piece = sink.queue.get()
+                if piece is _END:
+                    break
+                if first:
+                    first = False
+                    logger.info(f"Groq {params.get('model')} first token after {(time.monotonic() - started) * 1000:.0f} ms")
+                yield piece
+            future.result()
+        finally:
+            sink.closed.set()
+
+    def complete_many_sync(self, requests, priority=INTERACTIVE):
+        """Run several completions concurrently; returns each completion or the exception it raised, in order"""
+        futures = [self.submit(priority, **params) for params in requests]
+        results = []
+        for future in futures:
+            try:
+                results.append(future.result())
+            except Exception as e:
+                results.append(e)
+        return results
+
+    def get_stats(self):
+        now = time.monotonic()
+        return {
+            'concurrency': self.concurrency,
+            'queued': self.queue.qsize() if self.queue else 0,
+            'completed': self.completed,
+            'failed': self.failed,
+            'retries': self.retries,
+            'throttled': self.throttled,
+            'throttled_seconds': round(self.throttled_seconds, 2),
+            'models': {model: budget.get_stats(now) for model, budget in list(self.budgets.items())}
+        }
+
+    def _enqueue(self, priority, params, sink):
+        self._ensure_started()
+        future = concurrent.futures.Future()
+        self.loop.call_soon_threadsafe(self.queue.put_nowait, (priority, next(self.sequence), params, sink, future))
+        return future
+
+    def _ensure_started(self):
+        if self.loop is None:
+            with self.lock:
+                if self.loop is None:
+                    ready = threading.Event()
+                    loop = asyncio.new_event_loop()
+                    threading.Thread(target=self._run, args=(loop, ready), daemon=True).start()
+                    ready.wait()
+                    self.loop = loop
+
+    def _run(self, loop, ready):
+        asyncio.set_event_loop(loop)
+        # Retries are ours, so they can respect the shared budget
+        self.client = AsyncGroq(api_key=self.api_key, max_retries=0)
+        self.queue = asyncio.PriorityQueue()
+        for _ in range(self.concurrency):
+            loop.create_task(self._worker())
+        ready.set()
+        loop.run_forever()
+
+    async def _worker(self):
+        while True:
+            _, _, params, sink, future = await self.queue.get()
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                result = await self._send(params, sink)
+            except Exception as e:
+                self.failed += 1
+                future.set_exception(e)
+            else:
+                self.completed += 1
+                future.set_result(result)
+
+    async def _send(self, params, sink=None):
+        budget = self.budgets.setdefault(params.get('model'), ModelBudget())
+        tokens = estimate_tokens(params)
+        attempt = 0
+        while True:
+            delay = budget.delay(tokens, time.monotonic())
+            if delay > 0:
+                self.throttled += 1
+                self.throttled_seconds += delay
+                await asyncio.sleep(delay)
+                continue
+            budget.reserve(tokens)
+            try:
+                if sink:
+                    params = dict(params, stream=True)
+                raw = await self.client.chat.completions.with_raw_response.create(**params)
+                budget.update(raw.headers, time.monotonic())
+                parsed = raw.parse()
+                # parse() is a coroutine on the async client in some SDK versions
+                parsed = await parsed if inspect.isawaitable(parsed) else parsed
+                if not sink:
+                    return parsed
+                await self._drain(parsed, sink)
+                return None
+            except APIStatusError as e:
+                budget.update(e.response.headers, time.monotonic())
+                if (e.status_code != 429 and e.status_code < 500) or attempt >= self.max_retries \
+                        or (sink and sink.started):
+                    raise
+                delay = parse_duration(e.response.headers.get('retry-after')) or self._backoff(attempt)
+                logger.warning(f"Groq {params.get('model')} returned {e.status_code}, retrying in {delay:.1f}s")
+                if e.status_code == 429:
+                    # Hold every request for this model, not just this one; the budget check does the waiting
+                    budget.blocked_until = time.monotonic() + delay
+                    delay = 0
+            except APIConnectionError as e:
+                if attempt >= self.max_retries or (sink and sink.started):
+                    raise
+                delay = self._backoff(attempt)
+                logger.warning(f"Groq connection error ({e}), retrying in {delay:.1f}s")
+            attempt += 1
+            self.retries += 1
+            if delay:
+                await asyncio.sleep(delay)
+
+    @staticmethod
+    async def _drain(stream, sink):
+        """Forward a streamed completion's content to the sink until it ends or the reader leaves"""
+        try:
+            async for chunk in stream:
+                if sink.closed.is_set():
+                    break
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if delta:
+                    sink.started = True
+                    sink.queue.put(delta)
+        finally:
+            await stream.response.aclose()
+
+    @staticmethod
+    def _backoff(attempt):
+        return min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt) * random.uniform(0.5, 1.5)
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_groq_scheduler():
+    """The process-wide GroqScheduler, so every caller shares one queue and one budget"""
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                _scheduler = GroqScheduler()
+    return _scheduler
@@ -0,0 +1,128 @@
+"""Shared outbound HTTP client for every integration (Google Sheets, n8n, threat intel).
+
+One requests.Session with a keep-alive connection pool per host, so repeated
+calls to the same API reuse a TCP+TLS connection instead of opening a new
+one each time. A per-host semaphore caps how many requests run against one
+host at once, and the time callers spend waiting for it is recorded along
+with how often pooled connections are reused.
+"""
+import logging
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class HttpClient:
+    """Pooled, per-host limited wrapper around requests.Session"""
+
+    def __init__(self, pool_size=None, max_hosts=None, max_per_host=None, timeout=None):
+        self.pool_size = pool_size or Config.HTTP_POOL_SIZE
+        # More concurrent requests than pooled connections would just open throwaway ones
+        self.max_per_host = min(max_per_host or Config.HTTP_MAX_PER_HOST, self.pool_size)
+        self.timeout = timeout or Config.HTTP_TIMEOUT
+        self.session = requests.Session()
+        self.adapter = HTTPAdapter(pool_connections=max_hosts or Config.HTTP_POOL_HOSTS, pool_maxsize=self.pool_size)
+        self.session.mount('http://', self.adapter)
+        self.session.mount('https://', self.adapter)
+        self.lock = threading.Lock()
+        self.hosts = {}
+
+    def request(self, method, url, **kwargs):
+        """requests.request through the shared pool; a default timeout applies if none is given.
+
+        The host's slot is released once the response headers are in, so a
+        streamed body does not count against the limit while it is read.
+        """
+        kwargs.setdefault('timeout', self.timeout)
+        host = self._host(urlsplit(url).hostname or '')
+        started = time.monotonic()
+        host['semaphore'].acquire()
+        waited = time.monotonic() - started
+        with self.lock:
+            host['requests'] += 1
+            host['in_flight'] += 1
+            host['wait_total'] += waited
+            host['wait_max'] = max(host['wait_max'], waited)
+        try:
+            return self.session.request(method, url, **kwargs)
+        except requests.RequestException:
+            with self.lock:
+                host['errors'] += 1
+            raise
+        finally:
+            with self.lock:
+                host['in_flight'] -= 1
+            host['semaphore'].release()
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    def put(self, url, **kwargs):
+        return self.request('PUT', url, **kwargs)
+
+    def head(self, url, **kwargs):
+        return self.request('HEAD', url, **kwargs)
+
+    def get_stats(self):
+        """Per-host request counts, connection reuse and time spent waiting for a slot"""
+        connections = {}
+        pools = self.adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is not None:
+                opened, served = connections.get(pool.host, (0, 0))
+                connections[pool.host] = (opened + pool.num_connections, served + pool.num_requests)
+
+        hosts = {}
+        with self.lock:
+            for name, host in self.hosts.items():
+                opened, served = connections.get(name, (0, 0))
+                hosts[name] = {
+                    'requests': host['requests'],
+                    'errors': host['errors'],
+                    'in_flight': host['in_flight'],
+                    'connections_opened': opened,
+                    # Pools evicted from the LRU take their counts with them, so this covers live pools only
+                    'reuse_ratio': round(1 - opened / served, 3) if served else None,
+                    'wait_ms_avg': round(host['wait_total'] / host['requests'] * 1000, 2) if host['requests'] else 0,
+                    'wait_ms_max': round(host['wait_max'] * 1000, 2)
+                }
+        return {'pool_size': self.pool_size, 'max_per_host': self.max_per_host, 'hosts': hosts}
+
+    def _host(self, name):
+        with self.lock:
+            host = self.hosts.get(name)
+            if host is None:
+                host = self.hosts[name] = {
+                    'semaphore': threading.BoundedSemaphore(self.max_per_host),
+                    'requests': 0,
+                    'errors': 0,
+                    'in_flight': 0,
+                    'wait_total': 0.0,
+                    'wait_max': 0.0
+                }
+            return host
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_http_client():
+    """The process-wide HttpClient, so every service shares its connection pools"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = HttpClient()
+    return _client
@@ -0,0 +1,304 @@
+"""Rolling alert aggregates over the full IDS log history.
+
+Counters are updated from IDSLogWriter flushes, so the alerts summary is
+answered from memory instead of re-reading the logs. They are saved to a
+JSON file next to the log, together with how far into the active file they
+have counted, and picked up again (plus anything written since) on restart.
+
+Recount them from the logs on disk with:
+    python -m services.ids_alert_aggregates rebuild [--log-file PATH]
+"""
+import argparse
+import atexit
+import datetime
+import json
+import logging
+import os
+import threading
+import time
+from collections import Counter, deque
+
+from config import Config
+from services.ids_log_index import DEFAULT_LOG_FILE, iter_record_units
+from services.ids_log_writer import list_segments
+
+logger = logging.getLogger(__name__)
+
+STATE_VERSION = 1
+RECENT_ALERTS = 10
+# Per-minute buckets are kept for this long, relative to the newest record
+BUCKET_WINDOW = datetime.timedelta(hours=24)
+MINUTE_FORMAT = "%Y-%m-%d %H:%M"
+
+
+def default_state_path(log_path):
+    """ids_logs.json -> ids_logs.aggregates.json, ids_logs.bin -> ids_logs.bin.aggregates.json"""
+    root, ext = os.path.splitext(log_path)
+    return root + '.aggregates.json' if ext == '.json' else log_path + '.aggregates.json'
+
+
+def is_alert(record):
+    return record.get('alert_level', 'normal') != 'normal'
+
+
+class AlertAggregates:
+    """Incremental counters over every record written to an IDS log"""
+
+    def __init__(self, log_path, state_path=None, top_k=None, save_interval=None):
+        self.log_path = log_path
+        self.state_path = state_path or Config.IDS_ALERT_AGGREGATES_FILE or default_state_path(log_path)
+        self.top_k = top_k or Config.IDS_ALERT_TOP_SOURCES
+        # Source IPs tracked for the top-K list; the least frequent are dropped beyond this
+        self.max_sources = max(self.top_k * 100, 1000)
+        self.save_interval = save_interval if save_interval is not None else Config.IDS_ALERT_AGGREGATES_SAVE_INTERVAL
+        self.lock = threading.RLock()
+        self.loaded = False
+        self.dirty = False
+        self.last_saved = 0.0
+        self._reset()
+
+    def attach(self, writer):
+        """Count everything `writer` flushes; loading the saved state waits until first use"""
+        writer.on_flush.append(self._on_flush)
+        writer.on_rotate.append(self._on_rotate)
+        atexit.register(self.save)
+
+    def get_summary(self, minutes=60):
+        """Totals over the full history, plus per-minute buckets for the last `minutes` minutes"""
+        with self.lock:
+            self._ensure_loaded()
+            minute_keys = sorted(self.minutes)[-minutes:] if minutes > 0 else []
+            return {
+                'total_alerts': self.alerts,
+                'malicious_detections': sum(count for detection, count in self.by_detection.items()
+                                            if 'Malicious' in detection),
+                'http_traffic_alerts': sum(count for detection, count in self.by_detection.items()
+                                           if 'Unsecured HTTP' in detection),
+                'recent_alerts': list(reversed(self.recent_alerts)),
+                'total_records': self.records,
+                'first_record_at': self.first_timestamp,
+                'last_record_at': self.last_timestamp,
+                'by_alert_level': dict(self.by_alert_level),
+                'by_detection': dict(self.by_detection),
+                'by_protocol': dict(self.by_protocol),
+                'top_source_ips': [{'ip': ip, 'alerts': count}
+                                   for ip, count in self.alert_sources.most_common(self.top_k)],
+                'per_minute': [{'minute': key, 'records': self.minutes[key][0], 'alerts': self.minutes[key][1]}
+                               for key in minute_keys]
+            }
+
+    def rebuild(self):
+        """Forget the counters and recount every segment on disk"""
+        with self.lock:
+            self._reset()
+            self.loaded = True
+            total = 0
+            for path in list_segments(self.log_path):
+                total += self._consume_file(path, 0, active=False)
+            total += self._consume_file(self.log_path, 0, active=True)
+            self.save(force=True)
+            return total
+
+    def save(self, force=False):
+        """Write the counters to the state file (atomically) if they changed"""
+        with self.lock:
+            if not self.loaded or not (self.dirty or force):
+                return
+            state = {
+                'version': STATE_VERSION,
+                'active_bytes': self.active_bytes,
+                'records': self.records,
+                'alerts': self.alerts,
+                'first_timestamp': self.first_timestamp,
+                'last_timestamp': self.last_timestamp,
+                'by_alert_level': self.by_alert_level,
+                'by_detection': self.by_detection,
+                'by_protocol': self.by_protocol,
+                'alert_sources': self.alert_sources,
+                'minutes': self.minutes,
+                'recent_alerts': list(self.recent_alerts)
+            }
+            tmp_path = self.state_path + '.tmp'
+            try:
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(state, f, ensure_ascii=False)
+                os.replace(tmp_path, self.state_path)
+                self.dirty = False
+                self.last_saved = time.monotonic()
+            except OSError as e:
+                logger.error(f"Error saving IDS alert aggregates: {e}")
+
+    def _reset(self):
+        self.active_bytes = 0
+        self.records = 0
+        self.alerts = 0
+        self.first_timestamp = None
+        self.last_timestamp = None
+        self.by_alert_level = Counter()
+        self.by_detection = Counter()
+        self.by_protocol = Counter()
+        self.alert_sources = Counter()
+        # "YYYY-mm-dd HH:MM" -> [records, alerts]
+        self.minutes = {}
+        self.newest_minute = None
+        self.recent_alerts = deque(maxlen=RECENT_ALERTS)
+
+    def _ensure_loaded(self, active_path=None):
+        """Load the saved counters and count what the active file gained since they were saved.
+
+        `active_path` is where that file is now, if it has just been rotated.
+        """
+        if self.loaded:
+            return
+        active_path = active_path or self.log_path
+        try:
+            if not self._load():
+                logger.info("No IDS alert aggregates saved yet; counting the logs on disk")
+                self.rebuild()
+                return
+            size = os.path.getsize(active_path) if os.path.exists(active_path) else 0
+            if size < self.active_bytes:
+                # The active file was replaced behind our back
+                logger.warning("IDS log is shorter than the saved alert aggregates; recounting")
+                self.rebuild()
+                return
+            counted = self._consume_file(active_path, self.active_bytes, active=True)
+            if counted:
+                logger.info(f"IDS alert aggregates caught up on {counted} records")
+        except Exception as e:
+            logger.error(f"Error loading IDS alert aggregates: {e}")
+            self._reset()
+        self.loaded = True
+
+    def _load(self):
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except FileNotFoundError:
+            return False
+        except (OSError, ValueError) as e:
+            logger.error(f"Error reading IDS alert aggregates: {e}")
+            return False
+        if state.get('version') != STATE_VERSION:
+            return False
+        self._reset()
+        self.active_bytes = state['active_bytes']
+        self.records = state['records']
+        self.alerts = state['alerts']
+        self.first_timestamp = state['first_timestamp']
+        self.last_timestamp = state['last_timestamp']
+        self.by_alert_level.update(state['by_alert_level'])
+        self.by_detection.update(state['by_detection'])
+        self.by_protocol.update(state['by_protocol'])
+        self.alert_sources.update(state['alert_sources'])
+        self.minutes = state['minutes']
+        self.newest_minute = max(self.minutes) if self.minutes else None
+        self.recent_alerts.extend(state['recent_alerts'])
+        return True
+
+    def _consume_file(self, path, start, active):
+        """Count complete records of `path` from byte `start`"""
+        if not os.path.exists(path):
+            return 0
+        count = 0
+        for end_offset, unit in iter_record_units(path, start):
+            for _, record in unit:
+                self._add(record)
+            count += len(unit)
+            if active:
+                self.active_bytes = end_offset
+        self.dirty = self.dirty or bool(count)
+        return count
+
+    def _add(self, record):
+        timestamp = record.get('timestamp')
+        alert = is_alert(record)
+        self.records += 1
+        self.by_alert_level[record.get('alert_level', 'normal')] += 1
+        self.by_detection[record.get('detection', '')] += 1
+        self.by_protocol[record.get('protocol', 'OTHER')] += 1
+        if alert:
+            self.alerts += 1
+            self.recent_alerts.append(record)
+            source_ip = record.get('source_ip')
+            if source_ip:
+                self.alert_sources[source_ip] += 1
+                if len(self.alert_sources) > 2 * self.max_sources:
+                    # Lossy, like a space-saving sketch: IPs that fall out restart from zero
+                    self.alert_sources = Counter(dict(self.alert_sources.most_common(self.max_sources)))
+        if timestamp:
+            if self.first_timestamp is None or timestamp < self.first_timestamp:
+                self.first_timestamp = timestamp
+            if self.last_timestamp is None or timestamp > self.last_timestamp:
+                self.last_timestamp = timestamp
+            self._add_to_minute(timestamp[:16], alert)
+
+    def _add_to_minute(self, minute, alert):
+        bucket = self.minutes.get(minute)
+        if bucket is None:
+            if self.newest_minute is None or minute > self.newest_minute:
+                self.newest_minute = minute
+                self._prune_minutes()
+            elif minute < self._cutoff():
+                return  # Older than the bucket window (e.g. replaying an old capture)
+            bucket = self.minutes[minute] = [0, 0]
+        bucket[0] += 1
+        if alert:
+            bucket[1] += 1
+
+    def _cutoff(self):
+        try:
+            newest = datetime.datetime.strptime(self.newest_minute, MINUTE_FORMAT)
+        except ValueError:
+            return ''
+        return (newest - BUCKET_WINDOW).strftime(MINUTE_FORMAT)
+
+    def _prune_minutes(self):
+        cutoff = self._cutoff()
+        for key in [key for key in self.minutes if key <= cutoff]:
+            del self.minutes[key]
+
+    def _on_flush(self, start_offset, end_offset, entries):
+        with self.lock:
+            if not self.loaded:
+                # Catch-up counts this flush too, straight from the file
+                self._ensure_loaded()
+            elif self.active_bytes != start_offset:
+                # Missed writes; re-sync from the file itself
+                self._consume_file(self.log_path, self.active_bytes, active=True)
+            else:
+                for _, record in entries:
+                    self._add(record)
+                self.active_bytes = end_offset
+                self.dirty = True
+            if time.monotonic() - self.last_saved >= self.save_interval:
+                self.save()
+
+    def _on_rotate(self, segment_path):
+        with self.lock:
+            if self.loaded:
+                # Anything the old active file gained that flushes did not report
+                self._consume_file(segment_path, self.active_bytes, active=False)
+            else:
+                self._ensure_loaded(active_path=segment_path)
+            self.active_bytes = 0
+            self.save(force=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Maintain the IDS alert aggregates')
+    parser.add_argument('command', choices=['rebuild', 'show'])
+    parser.add_argument('--log-file', default=DEFAULT_LOG_FILE, help='IDS log file (default: %(default)s)')
+    parser.add_argument('--state-file', default=None, help='Aggregates file (default: next to the log file)')
+    parser.add_argument('--minutes', type=int, default=60, help='Per-minute buckets to show (default: %(default)s)')
+    args = parser.parse_args(argv)
+
+    aggregates = AlertAggregates(args.log_file, args.state_file)
+    if args.command == 'rebuild':
+        count = aggregates.rebuild()
+        print(f"Counted {count} records from {args.log_file}")
+    print(json.dumps(aggregates.get_summary(args.minutes), indent=2, ensure_ascii=False))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,145 @@
+"""In-memory fan-out of IDS log records to live subscribers (Server-Sent Events).
+
+Every record the pipeline logs is published here as it is written, before
+it reaches the log file. Each subscriber has its own filters and a bounded
+buffer: a client that cannot keep up loses its oldest undelivered records,
+never slows the pipeline down, and is told how many it missed.
+"""
+import datetime
+import itertools
+import json
+import threading
+from collections import deque
+
+from config import Config
+
+# alert_level values a subscription gets when it does not ask for any
+DEFAULT_ALERT_LEVELS = ('alert', 'warning')
+# How long EventSource waits before reconnecting, in milliseconds
+RECONNECT_DELAY_MS = 3000
+
+
+class Subscription:
+    """One subscriber's filters and its bounded, drop-oldest buffer"""
+
+    def __init__(self, alert_levels=None, ip=None, protocols=None, buffer_size=None):
+        self.alert_levels = set(alert_levels) if alert_levels else set(DEFAULT_ALERT_LEVELS)
+        self.ip = ip
+        self.protocols = {protocol.upper() for protocol in protocols} if protocols else None
+        self.buffer = deque(maxlen=buffer_size or Config.IDS_STREAM_BUFFER_SIZE)
+        self.condition = threading.Condition()
+        self.dropped = 0
+        self.delivered = 0
+        self.closed = False
+
+    def matches(self, record):
+        if record.get('alert_level') not in self.alert_levels:
+            return False
+        if self.ip and self.ip not in (record.get('source_ip'), record.get('destination_ip')):
+            return False
+        if self.protocols and record.get('protocol') not in self.protocols:
+            return False
+        return True
+
+    def put(self, event):
+        with self.condition:
+            if len(self.buffer) == self.buffer.maxlen:
+                self.dropped += 1  # deque drops the oldest for us
+            self.buffer.append(event)
+            self.condition.notify()
+
+    def get(self, timeout):
+        """Everything buffered, waiting up to `timeout` seconds for the first event"""
+        with self.condition:
+            if not self.buffer and not self.closed:
+                self.condition.wait(timeout)
+            events = list(self.buffer)
+            self.buffer.clear()
+            self.delivered += len(events)
+            return events
+
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self.condition.notify()
+
+    def get_stats(self):
+        return {
+            'alert_levels': sorted(self.alert_levels),
+            'ip': self.ip,
+            'protocols': sorted(self.protocols) if self.protocols else None,
+            'buffered': len(self.buffer),
+            'delivered': self.delivered,
+            'dropped': self.dropped
+        }
+
+
+class AlertStream:
+    """Publishes IDS log records to every matching subscription"""
+
+    def __init__(self, max_subscribers=None):
+        self.max_subscribers = max_subscribers or Config.IDS_STREAM_MAX_SUBSCRIBERS
+        self.lock = threading.Lock()
+        # Replaced rather than mutated so publish can iterate it without the lock
+        self.subscriptions = ()
+        self.sequence = itertools.count(1)
+        self.published = 0
+
+    def subscribe(self, alert_levels=None, ip=None, protocols=None):
+        """New Subscription, or None if max_subscribers are already connected"""
+        subscription = Subscription(alert_levels, ip, protocols)
+        with self.lock:
+            if len(self.subscriptions) >= self.max_subscribers:
+                return None
+            self.subscriptions = self.subscriptions + (subscription,)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        subscription.close()
+        with self.lock:
+            self.subscriptions = tuple(s for s in self.subscriptions if s is not subscription)
+
+    def publish(self, record):
+        """Hand a record to matching subscribers; a no-op when nobody is listening"""
+        subscriptions = self.subscriptions
+        if not subscriptions:
+            return
+        event = None
+        for subscription in subscriptions:
+            if subscription.matches(record):
+                if event is None:
+                    # Ids let a client tell how far it got; serialized once for all subscribers
+                    event = (next(self.sequence), json.dumps(record, ensure_ascii=False))
+                subscription.put(event)
+        self.published += 1
+
+    def get_stats(self):
+        subscriptions = self.subscriptions
+        return {
+            'subscribers': len(subscriptions),
+            'published': self.published,
+            'dropped': sum(s.dropped for s in subscriptions)
+        }
+
+
+def sse_events(stream, subscription, heartbeat_interval=None):
+    """Server-Sent Events body for a subscription; unsubscribes when the client goes away"""
+    heartbeat_interval = heartbeat_interval or Config.IDS_STREAM_HEARTBEAT_INTERVAL
+    reported_drops = 0
+    try:
+        yield f"retry: {RECONNECT_DELAY_MS}\n\n"
+        while not subscription.closed:
+            events = subscription.get(heartbeat_interval)
+            chunks = []
+            if subscription.dropped != reported_drops:
+                chunks.append(f"event: dropped\ndata: {json.dumps({'dropped': subscription.dropped - reported_drops})}\n\n")
+                reported_drops = subscription.dropped
+            for event_id, data in events:
+                chunks.append(f"id: {event_id}\nevent: alert\ndata: {data}\n\n")
+            if not chunks:
+                # Keeps proxies from timing the connection out and surfaces dead clients
+                heartbeat = {'timestamp': datetime.datetime.now().isoformat()}
+                chunks.append(f"event: heartbeat\ndata: {json.dumps(heartbeat)}\n\n")
+            yield ''.join(chunks)
+    finally:
+        stream.unsubscribe(subscription)
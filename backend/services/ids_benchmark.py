@@ -0,0 +1,187 @@
+"""Offline throughput benchmark for the IDS pipeline.
+
+Replays a pcap/pcapng file through the same functions live monitoring uses
+and reports packets/sec, p50/p99 per-packet latency and memory for each
+stage (parse, features, predict, log). Log records go to a temporary
+directory, never to the real IDS log.
+
+    python -m services.ids_benchmark capture.pcap [--speed 0|1|N] [--parser fast|scapy] [--packets] [--json]
+
+Latencies come from a pass without tracing; memory comes from a second
+pass under tracemalloc (skip it with --no-memory).
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+
+from config import Config
+from services import ids_monitor
+from services.ids_flow_table import FlowTable
+from services.ids_log_writer import IDSLogWriter
+from services.ids_rate_counter import SlidingWindowCounter
+from services.ids_replay import iter_raw_frames
+
+STAGES = ('parse', 'features', 'predict', 'log')
+
+
+class StageStats:
+    """Per-item latencies (and optionally memory) for one pipeline stage"""
+
+    def __init__(self, name, trace_memory=False):
+        self.name = name
+        self.trace_memory = trace_memory
+        self.latencies = []
+        self.items = 0
+        self.seconds = 0.0
+        self.peak_bytes = 0
+
+    def run(self, func, *args, items=1):
+        """Call func(*args) and charge its duration to each of `items` items"""
+        if self.trace_memory:
+            before = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        started = time.perf_counter()
+        result = func(*args)
+        elapsed = time.perf_counter() - started
+        if self.trace_memory:
+            # Largest amount allocated on top of what was live when the stage was entered
+            self.peak_bytes = max(self.peak_bytes, tracemalloc.get_traced_memory()[1] - before)
+        self.seconds += elapsed
+        self.items += items
+        self.latencies.extend([elapsed] * items)
+        return result
+
+    def report(self):
+        latencies = sorted(self.latencies)
+        return {
+            'items': self.items,
+            'seconds': round(self.seconds, 4),
+            'items_per_sec': round(self.items / self.seconds, 1) if self.seconds > 0 else None,
+            'p50_us': round(_percentile(latencies, 50) * 1e6, 2) if latencies else None,
+            'p99_us': round(_percentile(latencies, 99) * 1e6, 2) if latencies else None
+        }
+
+
+def _percentile(sorted_values, pct):
+    index = min(len(sorted_values) - 1, max(0, int(round(pct / 100.0 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def run_pass(pcap_file, flow_mode, batch_size, speed=None, limit=None, trace_memory=False):
+    """Push a capture through parse -> features -> predict -> log; returns (stats by stage, packets, seconds)"""
+    # Fresh feature state so each pass starts from the same place
+    ids_monitor.freq_counter = SlidingWindowCounter(
+        window_seconds=Config.IDS_FREQ_WINDOW_SECONDS,
+        bucket_seconds=Config.IDS_FREQ_BUCKET_SECONDS,
+        max_keys=Config.IDS_FREQ_MAX_KEYS
+    )
+    flow_table = FlowTable() if flow_mode else None
+    stats = {name: StageStats(name, trace_memory) for name in STAGES}
+    pending = []
+    packets = 0
+    next_sweep = None
+
+    def features_for(header):
+        if flow_table is None:
+            return [ids_monitor.extract_header_features(header)]
+        return [ids_monitor.extract_flow_features(flow) for flow in flow_table.update(**header)]
+
+    def expire_flows(now):
+        return [ids_monitor.extract_flow_features(flow) for flow in flow_table.expire(now)]
+
+    def flush_flows():
+        return [ids_monitor.extract_flow_features(flow) for flow in flow_table.flush_all()]
+
+    def score(batch, writer):
+        predictions = stats['predict'].run(ids_monitor.predict_batch, batch, items=len(batch))
+        for packet_data, prediction in zip(batch, predictions):
+            stats['log'].run(write, writer, packet_data, prediction)
+
+    def write(writer, packet_data, prediction):
+        writer.write(ids_monitor.build_log_record(packet_data, prediction))
+
+    with tempfile.TemporaryDirectory() as log_dir:
+        writer = IDSLogWriter(os.path.join(log_dir, 'ids_logs.json'))
+        if trace_memory:
+            tracemalloc.start()
+        started = time.perf_counter()
+        for raw, linktype, captured_at, wire_len in iter_raw_frames(pcap_file, speed):
+            if limit and packets >= limit:
+                break
+            header = stats['parse'].run(ids_monitor.parse_raw_frame, raw, linktype, captured_at, wire_len)
+            packets += 1
+            if header is None:
+                continue
+            pending.extend(stats['features'].run(features_for, header))
+            if flow_table is not None:
+                if next_sweep is None:
+                    next_sweep = captured_at + ids_monitor.FLOW_SWEEP_INTERVAL
+                elif captured_at >= next_sweep:
+                    pending.extend(stats['features'].run(expire_flows, captured_at, items=0))
+                    next_sweep = captured_at + ids_monitor.FLOW_SWEEP_INTERVAL
+            while len(pending) >= batch_size:
+                score(pending[:batch_size], writer)
+                del pending[:batch_size]
+        if flow_table is not None:
+            pending.extend(stats['features'].run(flush_flows, items=0))
+        for start in range(0, len(pending), batch_size):
+            score(pending[start:start + batch_size], writer)
+        # Serialization and I/O happen at flush time; charge them to the log stage
+        stats['log'].run(writer.close, items=0)
+        elapsed = time.perf_counter() - started
+        if trace_memory:
+            tracemalloc.stop()
+    return stats, packets, elapsed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the IDS pipeline against a pcap/pcapng file')
+    parser.add_argument('pcap_file')
+    parser.add_argument('--speed', type=float, default=0,
+                        help='0 = as fast as possible (default), 1 = real time, N = N x capture speed')
+    parser.add_argument('--limit', type=int, default=None, help='Stop after this many packets')
+    parser.add_argument('--batch-size', type=int, default=Config.IDS_BATCH_SIZE)
+    parser.add_argument('--parser', choices=['fast', 'scapy'], default=Config.IDS_PARSER,
+                        help='Packet parser to benchmark (default: IDS_PARSER, %(default)s)')
+    parser.add_argument('--packets', action='store_true',
+                        help='Score individual packets even if IDS_FLOW_AGGREGATION is on')
+    parser.add_argument('--no-memory', action='store_true', help='Skip the tracemalloc pass')
+    parser.add_argument('--json', action='store_true', help='Print the report as JSON')
+    args = parser.parse_args(argv)
+
+    flow_mode = Config.IDS_FLOW_AGGREGATION and not args.packets
+    # parse_raw_frame picks the parser from config
+    Config.IDS_PARSER = args.parser
+    stats, packets, elapsed = run_pass(args.pcap_file, flow_mode, args.batch_size, args.speed, args.limit)
+    report = {
+        'pcap_file': args.pcap_file,
+        'mode': 'flows' if flow_mode else 'packets',
+        'parser': args.parser,
+        'speed': args.speed or 'max',
+        'batch_size': args.batch_size,
+        'packets': packets,
+        'seconds': round(elapsed, 4),
+        'packets_per_sec': round(packets / elapsed, 1) if elapsed > 0 else None,
+        'stages': {name: stage.report() for name, stage in stats.items()}
+    }
+    if not args.no_memory:
+        memory_stats, _, _ = run_pass(args.pcap_file, flow_mode, args.batch_size, limit=args.limit, trace_memory=True)
+        for name, stage in memory_stats.items():
+            report['stages'][name]['peak_kb'] = round(stage.peak_bytes / 1024, 1)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+    print(f"{report['packets']} packets in {report['seconds']}s ({report['packets_per_sec']} packets/sec), "
+          f"mode={report['mode']}, parser={report['parser']}, speed={report['speed']}, batch_size={report['batch_size']}")
+    print(f"{'stage':<10}{'items':>10}{'items/sec':>14}{'p50 us':>12}{'p99 us':>12}{'peak KB':>12}")
+    for name, stage in report['stages'].items():
+        print(f"{name:<10}{stage['items']:>10}{str(stage['items_per_sec']):>14}{str(stage['p50_us']):>12}"
+              f"{str(stage['p99_us']):>12}{str(stage.get('peak_kb', '-')):>12}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,151 @@
+import threading
+from collections import OrderedDict
+
+from config import Config
+
+TCP_FIN = 0x01
+TCP_RST = 0x04
+
+
+class Flow:
+    """Bidirectional counters for one 5-tuple; 'forward' is the direction of the first packet seen"""
+
+    __slots__ = (
+        'src_ip', 'dst_ip', 'protocol', 'src_port', 'dst_port', 'first_seen', 'last_seen',
+        'packets_fwd', 'packets_rev', 'bytes_fwd', 'bytes_rev', 'tcp_flags', 'fin_fwd', 'fin_rev',
+        'http_flag', 'end_reason'
+    )
+
+    def __init__(self, src_ip, dst_ip, protocol, src_port, dst_port, ts):
+        self.src_ip = src_ip
+        self.dst_ip = dst_ip
+        self.protocol = protocol
+        self.src_port = src_port
+        self.dst_port = dst_port
+        self.first_seen = ts
+        self.last_seen = ts
+        self.packets_fwd = self.packets_rev = 0
+        self.bytes_fwd = self.bytes_rev = 0
+        self.tcp_flags = 0
+        self.fin_fwd = self.fin_rev = False
+        self.http_flag = False
+        self.end_reason = None
+
+    def add(self, forward, length, tcp_flags, http_flag, ts):
+        if forward:
+            self.packets_fwd += 1
+            self.bytes_fwd += length
+            self.fin_fwd = self.fin_fwd or bool(tcp_flags & TCP_FIN)
+        else:
+            self.packets_rev += 1
+            self.bytes_rev += length
+            self.fin_rev = self.fin_rev or bool(tcp_flags & TCP_FIN)
+        self.tcp_flags |= tcp_flags
+        self.http_flag = self.http_flag or http_flag
+        self.last_seen = max(self.last_seen, ts)
+
+    @property
+    def packets(self):
+        return self.packets_fwd + self.packets_rev
+
+    @property
+    def duration(self):
+        return self.last_seen - self.first_seen
+
+
+class FlowTable:
+    """Aggregates packets into flows and hands back each flow once it ends.
+
+    A flow ends on TCP RST, once both sides have sent FIN, after idle_timeout
+    seconds without packets, or after active_timeout seconds in total (long
+    sessions are reported in slices). At most max_flows are tracked; the least
+    recently active flow is ended early to make room.
+    """
+
+    def __init__(self, idle_timeout=None, active_timeout=None, max_flows=None):
+        self.idle_timeout = idle_timeout or Config.IDS_FLOW_IDLE_TIMEOUT
+        self.active_timeout = active_timeout or Config.IDS_FLOW_ACTIVE_TIMEOUT
+        self.max_flows = max_flows or Config.IDS_FLOW_MAX_FLOWS
+        self.lock = threading.Lock()
+        # Ordered by last activity, least recent first
+        self.flows = OrderedDict()
+
+        self.packets_aggregated = 0
+        self.flows_finished = 0
+        self.end_reasons = {}
+
+    def update(self, src_ip, dst_ip, protocol, src_port, dst_port, length, ts, tcp_flags=0, http_flag=False):
+        """Add a packet to its flow and return the flows that ended as a result"""
+        a, b = (src_ip, src_port), (dst_ip, dst_port)
+        key = (protocol,) + ((a + b) if a <= b else (b + a))
+        finished = []
+        with self.lock:
+            self.packets_aggregated += 1
+            flow = self.flows.get(key)
+            if flow is not None and ts - flow.first_seen >= self.active_timeout:
+                del self.flows[key]
+                self._finish(flow, 'active_timeout', finished)
+                flow = None
+
+            if flow is None:
+                if len(self.flows) >= self.max_flows:
+                    _, oldest = self.flows.popitem(last=False)
+                    self._finish(oldest, 'evicted', finished)
+                flow = Flow(src_ip, dst_ip, protocol, src_port, dst_port, ts)
+                self.flows[key] = flow
+            else:
+                self.flows.move_to_end(key)
+
+            forward = src_ip == flow.src_ip and src_port == flow.src_port
+            flow.add(forward, length, tcp_flags, http_flag, ts)
+
+            if tcp_flags & TCP_RST:
+                del self.flows[key]
+                self._finish(flow, 'rst', finished)
+            elif flow.fin_fwd and flow.fin_rev:
+                del self.flows[key]
+                self._finish(flow, 'fin', finished)
+        return finished
+
+    def expire(self, now):
+        """End and return flows that have been idle for idle_timeout seconds as of `now`"""
+        finished = []
+        with self.lock:
+            while self.flows:
+                key, flow = next(iter(self.flows.items()))
+                if now - flow.last_seen < self.idle_timeout:
+                    break
+                del self.flows[key]
+                self._finish(flow, 'idle_timeout', finished)
+        return finished
+
+    def flush_all(self):
+        """End and return every tracked flow (on shutdown)"""
+        finished = []
+        with self.lock:
+            while self.flows:
+                _, flow = self.flows.popitem(last=False)
+                self._finish(flow, 'shutdown', finished)
+        return finished
+
+    def get_stats(self):
+        """Get flow table counters"""
+        with self.lock:
+            active = len(self.flows)
+            reasons = dict(self.end_reasons)
+        return {
+            'active_flows': active,
+            'max_flows': self.max_flows,
+            'packets_aggregated': self.packets_aggregated,
+            'flows_finished': self.flows_finished,
+            'packets_per_flow': round(self.packets_aggregated / self.flows_finished, 2) if self.flows_finished else None,
+            'end_reasons': reasons,
+            'idle_timeout': self.idle_timeout,
+            'active_timeout': self.active_timeout
+        }
+
+    def _finish(self, flow, reason, finished):
+        flow.end_reason = reason
+        self.flows_finished += 1
+        self.end_reasons[reason] = self.end_reasons.get(reason, 0) + 1
+        finished.append(flow)
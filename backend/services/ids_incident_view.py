@@ -0,0 +1,200 @@
+"""Materialized view of the IDS log records that are security incidents.
+
+Keeps the incident form of every qualifying record in timestamp order and
+remembers how far into the active log file it has read, so each request
+only parses what was written since the previous one and then serves a
+slice of the view.
+"""
+import base64
+import binascii
+import logging
+import os
+import threading
+from bisect import bisect_left
+
+from config import Config
+from services.ids_log_index import iter_record_units
+from services.ids_log_writer import list_segments, resolve_segment, segment_key
+
+logger = logging.getLogger(__name__)
+
+
+def is_incident(log):
+    """Only actual security incidents, not normal traffic"""
+    return log.get('alert_level') != 'normal' and log.get('ml_prediction') == 1
+
+
+def log_to_incident(log):
+    """Transform an IDS log record to the incident format"""
+    return {
+        'timestamp': log.get('timestamp'),
+        'eventid': f"IDS-{log.get('timestamp', '').replace(' ', '-').replace(':', '-')}",
+        'severity': 'Critical' if log.get('alert_level') == 'alert' else 'High',
+        'sourceip': log.get('source_ip'),
+        'destinationip': log.get('destination_ip'),
+        'attacktype': log.get('detection', 'Unknown'),
+        'status': 'open' if log.get('status') == 'blocked' else 'investigating',
+        'actiontaken': 'Blocked' if log.get('status') == 'blocked' else 'Alert Sent',
+        'protocol': log.get('protocol'),
+        'packet_size': log.get('packet_size'),
+        'frequency': log.get('frequency'),
+        'http_traffic': log.get('http_traffic', False)
+    }
+
+
+def encode_cursor(key):
+    timestamp, seq = key
+    return base64.urlsafe_b64encode(f"{timestamp}|{seq}".encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor):
+    """Raises ValueError for a cursor this module did not produce"""
+    try:
+        timestamp, seq = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8').rsplit('|', 1)
+        return timestamp, int(seq)
+    except (binascii.Error, UnicodeError, ValueError):
+        raise ValueError(f"Invalid cursor: {cursor}")
+
+
+class IncidentView:
+    """Incidents from an IDS log and its rotated segments, sorted by timestamp"""
+
+    def __init__(self, log_path, max_incidents=None):
+        self.log_path = log_path
+        self.max_incidents = max_incidents or Config.IDS_INCIDENT_VIEW_MAX
+        self.lock = threading.Lock()
+        # (timestamp, seq) ascending, and the incidents in the same order;
+        # seq keeps records with equal timestamps in the order they were read
+        self.keys = []
+        self.incidents = []
+        self.seq = 0
+        self.loaded = False
+        # Rotated segments already read (by segment_key), identity (device, inode)
+        # of the active file and how much of it has been read
+        self.segments = set()
+        self.active_id = None
+        self.offset = 0
+
+    def get_page(self, limit=None, cursor=None):
+        """Newest-first incidents older than `cursor`; returns (incidents, next_cursor).
+
+        Without a limit everything older than the cursor is returned and
+        next_cursor is None.
+        """
+        before = decode_cursor(cursor) if cursor else None
+        with self.lock:
+            self._refresh()
+            end = bisect_left(self.keys, before) if before else len(self.keys)
+            start = max(0, end - limit) if limit else 0
+            page = self.incidents[start:end]
+            next_cursor = encode_cursor(self.keys[start]) if limit and start > 0 else None
+        page.reverse()
+        return page, next_cursor
+
+    def iter_incidents(self, cursor=None, chunk_size=500):
+        """(incident, cursor) pairs newest first, older than `cursor`, read from the view in chunks.
+
+        The lock is only held per chunk, so a long export does not hold up
+        other requests. A bad cursor raises ValueError here, not mid-iteration.
+        """
+        before = decode_cursor(cursor) if cursor else None
+        with self.lock:
+            self._refresh()
+        return self._iter_incidents(before, chunk_size)
+
+    def _iter_incidents(self, before, chunk_size):
+        while True:
+            with self.lock:
+                end = bisect_left(self.keys, before) if before else len(self.keys)
+                start = max(0, end - chunk_size)
+                keys = self.keys[start:end]
+                incidents = self.incidents[start:end]
+            for key, incident in zip(reversed(keys), reversed(incidents)):
+                yield incident, encode_cursor(key)
+            if start == 0 or not keys:
+                return
+            before = keys[0]
+
+    def get_stats(self):
+        with self.lock:
+            return {'incidents': len(self.incidents), 'active_offset': self.offset, 'loaded': self.loaded}
+
+    def _refresh(self):
+        """Read what the log gained since the last request"""
+        try:
+            stat = os.stat(self.log_path)
+        except FileNotFoundError:
+            stat = None
+        active_id = (stat.st_dev, stat.st_ino) if stat else None
+
+        if not self.loaded:
+            self._rebuild(active_id)
+            return
+        segments = list_segments(self.log_path)
+        new_segments = [segment for segment in segments if segment_key(segment) not in self.segments]
+        if new_segments:
+            # Rotated since the last request: the oldest new segment is the file we
+            # were reading, any others were written and rotated in between
+            for position, segment in enumerate(new_segments):
+                self._consume_segment(segment, self.offset if position == 0 and self.active_id else 0)
+            self.segments = {segment_key(segment) for segment in segments}
+            self.active_id, self.offset = active_id, 0
+        elif active_id != self.active_id and self.active_id:
+            # Replaced behind our back
+            self._rebuild(active_id)
+            return
+        elif stat and stat.st_size < self.offset:
+            # Truncated behind our back
+            self._rebuild(active_id)
+            return
+        self.active_id = active_id
+        if stat:
+            self.offset = self._consume(self.log_path, self.offset)
+
+    def _rebuild(self, active_id):
+        self.keys, self.incidents = [], []
+        self.seq = 0
+        segments = list_segments(self.log_path)
+        for segment in segments:
+            self._consume_segment(segment, 0)
+        self.segments = {segment_key(segment) for segment in segments}
+        self.active_id = active_id
+        self.offset = self._consume(self.log_path, 0) if active_id else 0
+        self.loaded = True
+        logger.info(f"Loaded {len(self.incidents)} IDS incidents from {self.log_path}")
+
+    def _consume_segment(self, segment, start):
+        """_consume for a rotated segment that may get gzipped or pruned under us"""
+        try:
+            self._consume(segment, start)
+        except FileNotFoundError:
+            path = resolve_segment(self.log_path, segment_key(segment))
+            if path:
+                self._consume(path, start)
+
+    def _consume(self, path, start):
+        """Add incidents from complete records of `path` after byte `start`; returns the new offset"""
+        offset = start
+        for end_offset, unit in iter_record_units(path, start):
+            offset = end_offset
+            for _, log in unit:
+                if is_incident(log):
+                    self._insert(log_to_incident(log))
+        overflow = len(self.incidents) - self.max_incidents
+        if overflow > 0:
+            # Oldest first out
+            del self.keys[:overflow]
+            del self.incidents[:overflow]
+        return offset
+
+    def _insert(self, incident):
+        key = (incident.get('timestamp') or '', self.seq)
+        self.seq += 1
+        if not self.keys or key > self.keys[-1]:
+            self.keys.append(key)
+            self.incidents.append(incident)
+            return
+        # Flow records carry the flow's start time, so they can arrive out of order
+        index = bisect_left(self.keys, key)
+        self.keys.insert(index, key)
+        self.incidents.insert(index, incident)
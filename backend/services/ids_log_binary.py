@@ -0,0 +1,431 @@
+"""Packed columnar storage for IDS log records.
+
+Each writer flush becomes one self-contained block:
+
+    header   'IDSB' | version u8 | 3 pad | rows u32 | body length u32
+    body     dictionary (JSON list of the block's distinct strings, length-prefixed)
+             then one little-endian column per field in COLUMNS order
+    trailer  block length u32 | 'IDSE'
+
+Strings are dictionary encoded, IPv4 addresses are stored as integers and
+timestamps as epoch seconds. The trailer lets readers walk blocks backwards
+from the end of the file. A record's location is (block offset << 16) | row.
+
+Convert existing NDJSON logs with:
+    python -m services.ids_log_binary convert services/ids_logs.json [--all]
+"""
+import argparse
+import datetime
+import gzip
+import ipaddress
+import json
+import math
+import os
+import struct
+import sys
+import time
+from array import array
+from collections import deque
+
+MAGIC = b'IDSB'
+TRAILER_MAGIC = b'IDSE'
+VERSION = 1
+HEADER = struct.Struct('<4sB3xII')
+TRAILER = struct.Struct('<I4s')
+DICT_LENGTH = struct.Struct('<I')
+ROW_BITS = 16
+
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# (field, array typecode, kind) in storage order; also the order fields come back in
+COLUMNS = (
+    ('timestamp', 'I', 'epoch'),
+    ('source_ip', 'q', 'ip'),
+    ('destination_ip', 'q', 'ip'),
+    ('protocol', 'H', 'str'),
+    ('detection', 'H', 'str'),
+    ('alert_level', 'H', 'str'),
+    ('status', 'H', 'str'),
+    ('ml_prediction', 'b', 'int'),
+    ('http_traffic', 'b', 'bool'),
+    ('packet_size', 'I', 'int'),
+    ('frequency', 'I', 'int'),
+    ('bytes_received', 'q', 'int'),
+    ('packets', 'I', 'int'),
+    ('duration', 'd', 'float'),
+    ('flow_end_reason', 'H', 'str'),
+    # JSON object with any keys (or values) the columns above cannot hold
+    ('extra', 'H', 'str'),
+)
+FIELDS = frozenset(name for name, _, _ in COLUMNS)
+# Each row adds at most one dictionary string per string-capable column (8: the IPs
+# when not IPv4, the str columns and extra); capping rows keeps every index below
+# 0xFFFF, which 'H' columns reserve for "missing"
+STRINGS_PER_ROW = sum(1 for _, _, kind in COLUMNS if kind in ('ip', 'str'))
+MAX_BLOCK_ROWS = 0xFFFF // STRINGS_PER_ROW
+
+# Sentinel meaning "field absent" per typecode
+MISSING = {'I': 0xFFFFFFFF, 'q': -2 ** 63, 'H': 0xFFFF, 'b': -128, 'd': float('nan')}
+RANGES = {'I': (0, 0xFFFFFFFE), 'q': (-2 ** 63 + 1, 2 ** 63 - 1), 'b': (-127, 127)}
+_SWAP = sys.byteorder == 'big'
+
+
+class _TimestampCodec:
+    """Converts the log's local-time strings to epoch seconds and back, caching the last value"""
+
+    def __init__(self):
+        self.last_text = self.last_epoch = None
+
+    def encode(self, text):
+        if text == self.last_text:
+            return self.last_epoch
+        epoch = int(time.mktime(time.strptime(text, TIMESTAMP_FORMAT)))
+        self.last_text, self.last_epoch = text, epoch
+        return epoch
+
+    def decode(self, epoch):
+        if epoch == self.last_epoch:
+            return self.last_text
+        text = datetime.datetime.fromtimestamp(epoch).strftime(TIMESTAMP_FORMAT)
+        self.last_text, self.last_epoch = text, epoch
+        return text
+
+
+def location(block_offset, row):
+    return (block_offset << ROW_BITS) | row
+
+
+def split_location(value):
+    return value >> ROW_BITS, value & ((1 << ROW_BITS) - 1)
+
+
+def encode_block(records):
+    """Pack up to MAX_BLOCK_ROWS records into one block"""
+    strings = {}
+    columns = [array(typecode) for _, typecode, _ in COLUMNS]
+    timestamps = _TimestampCodec()
+    ips = {}
+
+    def intern(value):
+        index = strings.get(value)
+        if index is None:
+            index = strings[value] = len(strings)
+        return index
+
+    for record in records:
+        extra = {key: value for key, value in record.items() if key not in FIELDS}
+        for (name, typecode, kind), column in zip(COLUMNS[:-1], columns):
+            value = record.get(name)
+            stored = MISSING[typecode]
+            if value is not None:
+                try:
+                    if kind == 'epoch':
+                        epoch = timestamps.encode(value)
+                        if 0 <= epoch < MISSING['I']:
+                            stored = epoch
+                    elif kind == 'ip':
+                        stored = ips.get(value)
+                        if stored is None:
+                            try:
+                                stored = int(ipaddress.IPv4Address(value))
+                            except ValueError:
+                                stored = -(intern(value) + 1)
+                            ips[value] = stored
+                    elif kind == 'str' and isinstance(value, str):
+                        stored = intern(value)
+                    elif kind == 'bool' and isinstance(value, bool):
+                        stored = int(value)
+                    elif kind == 'int' and isinstance(value, int) and not isinstance(value, bool):
+                        low, high = RANGES[typecode]
+                        if low <= value <= high:
+                            stored = value
+                    elif kind == 'float' and isinstance(value, (int, float)) and not isinstance(value, bool):
+                        stored = float(value)
+                except (ValueError, TypeError, OverflowError):
+                    pass
+                if stored == MISSING[typecode] or (kind == 'float' and math.isnan(stored)):
+                    # Keep the value losslessly when its column cannot represent it
+                    extra[name] = value
+                    stored = MISSING[typecode]
+            column.append(stored)
+        columns[-1].append(intern(json.dumps(extra, ensure_ascii=False)) if extra else MISSING['H'])
+
+    dictionary = json.dumps(list(strings), ensure_ascii=False).encode('utf-8')
+    parts = [DICT_LENGTH.pack(len(dictionary)), dictionary]
+    for column in columns:
+        if _SWAP:
+            column.byteswap()
+        parts.append(column.tobytes())
+    body = b''.join(parts)
+    block_length = HEADER.size + len(body) + TRAILER.size
+    return HEADER.pack(MAGIC, VERSION, len(records), len(body)) + body + TRAILER.pack(block_length, TRAILER_MAGIC)
+
+
+def encode_blocks(records, start_offset=0):
+    """Encode records as consecutive blocks; returns (data, [(location, record), ...])"""
+    parts = []
+    entries = []
+    offset = start_offset
+    for start in range(0, len(records), MAX_BLOCK_ROWS):
+        chunk = records[start:start + MAX_BLOCK_ROWS]
+        block = encode_block(chunk)
+        entries.extend((location(offset, row), record) for row, record in enumerate(chunk))
+        parts.append(block)
+        offset += len(block)
+    return b''.join(parts), entries
+
+
+class Block:
+    """A decoded block; rows are materialized as dicts only on request"""
+
+    def __init__(self, data):
+        magic, version, rows, body_length = HEADER.unpack_from(data, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("Not an IDS log block")
+        self.rows = rows
+        position = HEADER.size
+        dictionary_length, = DICT_LENGTH.unpack_from(data, position)
+        position += DICT_LENGTH.size
+        self.strings = json.loads(data[position:position + dictionary_length].decode('utf-8'))
+        position += dictionary_length
+        self.columns = []
+        for _, typecode, _ in COLUMNS:
+            column = array(typecode)
+            size = column.itemsize * rows
+            column.frombytes(data[position:position + size])
+            if _SWAP:
+                column.byteswap()
+            self.columns.append(column)
+            position += size
+        self.timestamps = _TimestampCodec()
+        self.ips = {}
+
+    def record(self, row):
+        strings = self.strings
+        record = {}
+        for (name, typecode, kind), column in zip(COLUMNS[:-1], self.columns):
+            value = column[row]
+            if kind == 'float':
+                if math.isnan(value):
+                    continue
+            elif value == MISSING[typecode]:
+                continue
+            if kind == 'epoch':
+                value = self.timestamps.decode(value)
+            elif kind == 'ip':
+                if value < 0:
+                    value = strings[-value - 1]
+                else:
+                    text = self.ips.get(value)
+                    if text is None:
+                        text = self.ips[value] = str(ipaddress.IPv4Address(value))
+                    value = text
+            elif kind == 'str':
+                value = strings[value]
+            elif kind == 'bool':
+                value = bool(value)
+            record[name] = value
+        extra = self.columns[-1][row]
+        if extra != MISSING['H']:
+            record.update(json.loads(strings[extra]))
+        return record
+
+    def records(self):
+        return [self.record(row) for row in range(self.rows)]
+
+
+def _read_block_at(f, offset):
+    """Read the complete block starting at `offset`, or None at EOF / on a partial block"""
+    f.seek(offset)
+    header = f.read(HEADER.size)
+    if len(header) < HEADER.size:
+        return None
+    magic, _, _, body_length = HEADER.unpack(header)
+    if magic != MAGIC:
+        raise ValueError(f"Corrupt IDS log block at offset {offset}")
+    rest = f.read(body_length + TRAILER.size)
+    if len(rest) < body_length + TRAILER.size:
+        return None  # write in progress
+    return header + rest
+
+
+def is_binary_log(path):
+    """True if `path` (plain or gzipped) holds packed blocks rather than NDJSON.
+
+    Empty files are judged by name (<log>.bin or its segments), since a reader
+    may look at the active file just before its first block is written.
+    """
+    opener = gzip.open if path.endswith('.gz') else open
+    try:
+        with opener(path, 'rb') as f:
+            head = f.read(len(MAGIC))
+    except (OSError, EOFError):
+        head = b''
+    if head:
+        return head == MAGIC
+    name = os.path.basename(path)
+    return name.endswith('.bin') or '.bin.' in name
+
+
+def iter_blocks(path, start=0):
+    """Yield (offset, length, Block) for every complete block from byte `start`"""
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rb') as f:
+        offset = start
+        while True:
+            data = _read_block_at(f, offset)
+            if data is None:
+                return
+            yield offset, len(data), Block(data)
+            offset += len(data)
+
+
+def iter_records(path):
+    """Yield every record of a segment, oldest first"""
+    for _, _, block in iter_blocks(path):
+        yield from block.records()
+
+
+def tail_records(path, limit):
+    """Return the last `limit` records of a segment, newest first.
+
+    Plain files are walked backwards block by block using each block's
+    trailer; gzipped segments are decoded front to back.
+    """
+    if limit <= 0:
+        return []
+    if path.endswith('.gz'):
+        tail = deque(maxlen=limit)
+        for _, _, block in iter_blocks(path):
+            for row in range(max(0, block.rows - limit), block.rows):
+                tail.append(block.record(row))
+        return list(reversed(tail))
+
+    records = []
+    with open(path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        end = f.tell()
+        while end > 0 and len(records) < limit:
+            if end < TRAILER.size:
+                break
+            f.seek(end - TRAILER.size)
+            block_length, magic = TRAILER.unpack(f.read(TRAILER.size))
+            if magic != TRAILER_MAGIC or block_length > end:
+                # Partial block at the end (write in progress); fall back to a forward scan
+                return _tail_forward(path, limit, end_before=end) if not records else records
+            start = end - block_length
+            data = _read_block_at(f, start)
+            block = Block(data)
+            for row in range(block.rows - 1, -1, -1):
+                records.append(block.record(row))
+                if len(records) >= limit:
+                    break
+            end = start
+    return records
+
+
+def _tail_forward(path, limit, end_before):
+    tail = deque(maxlen=limit)
+    for offset, length, block in iter_blocks(path):
+        if offset + length > end_before:
+            break
+        for row in range(max(0, block.rows - limit), block.rows):
+            tail.append(block.record(row))
+    return list(reversed(tail))
+
+
+def read_locations(path, locations):
+    """Read the records at the given locations of one segment; returns {location: record}"""
+    by_block = {}
+    for value in locations:
+        block_offset, row = split_location(value)
+        by_block.setdefault(block_offset, []).append((value, row))
+
+    found = {}
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rb') as f:
+        # Ascending order keeps gzip seeks forward-only
+        for block_offset in sorted(by_block):
+            data = _read_block_at(f, block_offset)
+            if data is None:
+                continue
+            block = Block(data)
+            for value, row in by_block[block_offset]:
+                if row < block.rows:
+                    found[value] = block.record(row)
+    return found
+
+
+def _iter_json_records(path):
+    """Records of an NDJSON file (or a JSON array file), plain or gzipped"""
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rt', encoding='utf-8') as f:
+        first = f.read(1)
+        while first and first.isspace():
+            first = f.read(1)
+        if first == '[':
+            yield from json.loads(first + f.read())
+            return
+        for line in (first + f.readline(), *f):
+            if line.strip():
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+
+
+def convert_file(source, destination, compress=False):
+    """Convert an NDJSON log (or JSON array) to packed blocks; returns the record count"""
+    count = 0
+    pending = []
+    opener = gzip.open if compress else open
+    tmp_path = destination + '.tmp'
+    with opener(tmp_path, 'wb') as out:
+        for record in _iter_json_records(source):
+            pending.append(record)
+            if len(pending) >= MAX_BLOCK_ROWS:
+                out.write(encode_block(pending))
+                count += len(pending)
+                pending = []
+        if pending:
+            out.write(encode_block(pending))
+            count += len(pending)
+    os.replace(tmp_path, destination)
+    return count
+
+
+def main(argv=None):
+    from services.ids_log_writer import list_segments
+
+    parser = argparse.ArgumentParser(description='Convert NDJSON IDS logs to the packed binary format')
+    parser.add_argument('command', choices=['convert'])
+    parser.add_argument('source', help='NDJSON log file, e.g. services/ids_logs.json')
+    parser.add_argument('-o', '--output', help='Binary log to write (default: source with a .bin extension)')
+    parser.add_argument('--all', action='store_true', help='Also convert the rotated segments of the source log')
+    args = parser.parse_args(argv)
+
+    output = args.output or os.path.splitext(args.source)[0] + '.bin'
+    sources = [(args.source, output)]
+    if args.all:
+        for segment in list_segments(args.source):
+            # <log>.<stamp>[.gz] -> <output>.<stamp>[.gz]
+            suffix = os.path.basename(segment)[len(os.path.basename(args.source)):]
+            sources.append((segment, output + suffix))
+
+    total_in = total_out = 0
+    for source, destination in sources:
+        if not os.path.exists(source):
+            continue
+        count = convert_file(source, destination, compress=destination.endswith('.gz'))
+        total_in += os.path.getsize(source)
+        total_out += os.path.getsize(destination)
+        print(f"{source} -> {destination}: {count} records")
+    print(f"{total_in} bytes -> {total_out} bytes")
+
+    from services.ids_log_index import IDSLogIndex
+    indexed = IDSLogIndex(output).rebuild()
+    print(f"Indexed {indexed} records for {output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,293 @@
+"""Per-IP inverted index over IDS log segments.
+
+Maps every source/destination IP to the byte offsets of its records so
+lookups can seek straight to them. The index is a SQLite file next to the
+log and is kept current by listening to IDSLogWriter flushes.
+
+Rebuild it from the logs on disk with:
+    python -m services.ids_log_index rebuild [--log-file PATH]
+"""
+import argparse
+import gzip
+import json
+import logging
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+
+from config import Config
+from services import ids_log_binary
+from services.ids_log_writer import list_segments, resolve_segment, segment_key
+
+logger = logging.getLogger(__name__)
+
+# Same file ids_monitor.LOG_FILE writes to
+DEFAULT_LOG_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                'ids_logs.bin' if Config.IDS_LOG_FORMAT == 'binary' else 'ids_logs.json')
+
+# Segment name used for the file currently being written
+ACTIVE_SEGMENT = ''
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS segments (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL UNIQUE,
+    indexed_bytes INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS postings (
+    ip TEXT NOT NULL,
+    segment_id INTEGER NOT NULL,
+    offset INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_postings_ip ON postings (ip, segment_id, offset);
+"""
+
+
+def default_index_path(log_path):
+    """ids_logs.json -> ids_logs.index.db, ids_logs.bin -> ids_logs.bin.index.db
+
+    Kept out of the log's segment namespace, and separate per log format.
+    """
+    root, ext = os.path.splitext(log_path)
+    return root + '.index.db' if ext == '.json' else log_path + '.index.db'
+
+
+def iter_lines_with_offsets(path, start=0):
+    """Yield (offset, line) for complete lines of a plain or gzipped segment"""
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rb') as f:
+        if start:
+            f.seek(start)
+        offset = start
+        for line in f:
+            if not line.endswith(b'\n'):
+                break  # write in progress
+            yield offset, line
+            offset += len(line)
+
+
+def iter_record_units(path, start=0):
+    """Yield (end byte offset, [(offset, record), ...]) per line, or per block for binary logs.
+
+    Each unit is complete, so a consumer that stores the end offset can resume from it.
+    """
+    if ids_log_binary.is_binary_log(path):
+        for block_offset, length, block in ids_log_binary.iter_blocks(path, start):
+            yield block_offset + length, [(ids_log_binary.location(block_offset, row), block.record(row))
+                                          for row in range(block.rows)]
+        return
+    for offset, line in iter_lines_with_offsets(path, start):
+        try:
+            yield offset + len(line), [(offset, json.loads(line))]
+        except json.JSONDecodeError:
+            yield offset + len(line), []
+
+
+def _record_ips(record):
+    return {ip for ip in (record.get('source_ip'), record.get('destination_ip')) if ip}
+
+
+class IDSLogIndex:
+    """On-disk index from IP address to record offsets in IDS log segments"""
+
+    def __init__(self, log_path, index_path=None):
+        self.log_path = log_path
+        self.index_path = index_path or Config.IDS_LOG_INDEX_FILE or default_index_path(log_path)
+        self.lock = threading.RLock()
+        self.conn = None
+        self.caught_up = False
+
+    def attach(self, writer):
+        """Keep the index current with everything `writer` flushes, rotates or prunes.
+
+        Only registers callbacks; nothing is opened until the index is used, so
+        modules that create an index at import time stay cheap to import.
+        """
+        writer.on_flush.append(self._on_flush)
+        writer.on_rotate.append(self._on_rotate)
+        writer.on_prune.append(self._on_prune)
+
+    def lookup(self, ip_address, limit=20):
+        """Return up to `limit` records mentioning `ip_address`, newest first"""
+        with self.lock:
+            if not self.caught_up:
+                # Pick up anything written while the index was not listening (e.g. before a crash)
+                self._safe_catch_up()
+            rows = self._connect().execute(
+                """SELECT s.name, p.offset FROM postings p JOIN segments s ON s.id = p.segment_id
+                   WHERE p.ip = ? ORDER BY p.segment_id DESC, p.offset DESC LIMIT ?""",
+                (ip_address, limit)
+            ).fetchall()
+
+        by_segment = OrderedDict()
+        for name, offset in rows:
+            by_segment.setdefault(name, []).append(offset)
+
+        records = []
+        for name, offsets in by_segment.items():
+            path = self.log_path if name == ACTIVE_SEGMENT else resolve_segment(self.log_path, name)
+            if not path:
+                continue
+            try:
+                found = self._read_at_offsets(path, offsets)
+            except FileNotFoundError:
+                continue
+            for offset in offsets:
+                record = found.get(offset)
+                # Guard against a stale index pointing at an unrelated record
+                if record and ip_address in _record_ips(record):
+                    records.append(record)
+        return records
+
+    def catch_up(self):
+        """Index whatever the active file holds beyond what has been indexed"""
+        with self.lock:
+            self.caught_up = True
+            if not os.path.exists(self.log_path):
+                return 0
+            segment_id, indexed_bytes = self._segment(ACTIVE_SEGMENT)
+            if os.path.getsize(self.log_path) < indexed_bytes:
+                # The file was replaced behind our back; start it over
+                self._drop_segment(segment_id)
+                segment_id, indexed_bytes = self._segment(ACTIVE_SEGMENT)
+            return self._index_file(segment_id, self.log_path, indexed_bytes)
+
+    def rebuild(self):
+        """Drop the index and rebuild it from every segment on disk"""
+        with self.lock:
+            conn = self._connect()
+            conn.execute("DELETE FROM postings")
+            conn.execute("DELETE FROM segments")
+            conn.commit()
+
+            total = 0
+            for path in list_segments(self.log_path):
+                segment_id, _ = self._segment(segment_key(path))
+                total += self._index_file(segment_id, path, 0)
+            if os.path.exists(self.log_path):
+                segment_id, _ = self._segment(ACTIVE_SEGMENT)
+                total += self._index_file(segment_id, self.log_path, 0)
+            conn.execute("VACUUM")
+            return total
+
+    def get_stats(self):
+        """Get index size counters"""
+        with self.lock:
+            conn = self._connect()
+            postings = conn.execute("SELECT COUNT(*) FROM postings").fetchone()[0]
+            segments = conn.execute("SELECT COUNT(*) FROM segments").fetchone()[0]
+        return {'index_path': self.index_path, 'postings': postings, 'segments': segments}
+
+    def _connect(self):
+        if self.conn is None:
+            self.conn = sqlite3.connect(self.index_path, check_same_thread=False)
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+            self.conn.executescript(SCHEMA)
+        return self.conn
+
+    def _segment(self, name):
+        """Get (id, indexed_bytes) for a segment, creating its row if needed"""
+        conn = self._connect()
+        row = conn.execute("SELECT id, indexed_bytes FROM segments WHERE name = ?", (name,)).fetchone()
+        if row:
+            return row
+        cursor = conn.execute("INSERT INTO segments (name) VALUES (?)", (name,))
+        conn.commit()
+        return cursor.lastrowid, 0
+
+    def _drop_segment(self, segment_id):
+        conn = self._connect()
+        conn.execute("DELETE FROM postings WHERE segment_id = ?", (segment_id,))
+        conn.execute("DELETE FROM segments WHERE id = ?", (segment_id,))
+        conn.commit()
+
+    def _insert(self, segment_id, entries, indexed_bytes):
+        """Add postings for [(offset, record), ...] and advance the segment's indexed_bytes"""
+        postings = [(ip, segment_id, offset) for offset, record in entries for ip in _record_ips(record)]
+        conn = self._connect()
+        conn.executemany("INSERT INTO postings (ip, segment_id, offset) VALUES (?, ?, ?)", postings)
+        conn.execute("UPDATE segments SET indexed_bytes = ? WHERE id = ?", (indexed_bytes, segment_id))
+        conn.commit()
+
+    def _index_file(self, segment_id, path, start):
+        """Index complete records of `path` from byte `start`, committing in chunks"""
+        entries = []
+        indexed_bytes = start
+        count = 0
+        for end_offset, unit in iter_record_units(path, start):
+            indexed_bytes = end_offset
+            entries.extend(unit)
+            if len(entries) >= 10000:
+                self._insert(segment_id, entries, indexed_bytes)
+                count += len(entries)
+                entries = []
+        self._insert(segment_id, entries, indexed_bytes)
+        return count + len(entries)
+
+    def _read_at_offsets(self, path, offsets):
+        """Read the records starting at each offset (record location, for binary logs) of one segment"""
+        if ids_log_binary.is_binary_log(path):
+            return ids_log_binary.read_locations(path, offsets)
+        found = {}
+        opener = gzip.open if path.endswith('.gz') else open
+        with opener(path, 'rb') as f:
+            # Ascending order keeps gzip seeks forward-only
+            for offset in sorted(offsets):
+                f.seek(offset)
+                try:
+                    found[offset] = json.loads(f.readline())
+                except json.JSONDecodeError:
+                    continue
+        return found
+
+    def _safe_catch_up(self):
+        try:
+            indexed = self.catch_up()
+            if indexed:
+                logger.info(f"IDS log index caught up on {indexed} records")
+        except Exception as e:
+            logger.error(f"Error catching up IDS log index: {e}")
+
+    def _on_flush(self, start_offset, end_offset, entries):
+        with self.lock:
+            segment_id, indexed_bytes = self._segment(ACTIVE_SEGMENT)
+            if indexed_bytes != start_offset:
+                # Missed writes (or catch-up is ahead of us); re-sync from the file itself
+                self.catch_up()
+                return
+            self._insert(segment_id, entries, end_offset)
+
+    def _on_rotate(self, segment_path):
+        with self.lock:
+            conn = self._connect()
+            # Postings follow the segment row, so a rotation is a rename
+            conn.execute("UPDATE segments SET name = ? WHERE name = ?", (segment_key(segment_path), ACTIVE_SEGMENT))
+            conn.commit()
+
+    def _on_prune(self, segment_path):
+        with self.lock:
+            row = self._connect().execute(
+                "SELECT id FROM segments WHERE name = ?", (segment_key(segment_path),)
+            ).fetchone()
+            if row:
+                self._drop_segment(row[0])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Maintain the per-IP index of the IDS logs')
+    parser.add_argument('command', choices=['rebuild', 'stats'])
+    parser.add_argument('--log-file', default=DEFAULT_LOG_FILE, help='IDS log file (default: %(default)s)')
+    parser.add_argument('--index-file', default=None, help='Index file (default: next to the log file)')
+    args = parser.parse_args(argv)
+
+    index = IDSLogIndex(args.log_file, args.index_file)
+    if args.command == 'rebuild':
+        count = index.rebuild()
+        print(f"Indexed {count} records from {args.log_file}")
+    print(json.dumps(index.get_stats(), indent=2))
+
+
+if __name__ == '__main__':
+    main()
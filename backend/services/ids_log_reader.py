@@ -0,0 +1,209 @@
+import base64
+import binascii
+import gzip
+import json
+import logging
+import os
+from collections import deque
+
+from services import ids_log_binary
+from services.ids_log_index import iter_record_units
+from services.ids_log_writer import list_segments, resolve_segment, segment_key, segment_order
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BLOCK_SIZE = 64 * 1024
+
+
+def tail_lines(path, limit, block_size=DEFAULT_BLOCK_SIZE):
+    """Return the last `limit` complete lines of a plain file, newest first.
+
+    Reads fixed-size blocks backwards from EOF until enough newlines have been
+    seen, so I/O and memory depend on `limit`, not on the file size. A trailing
+    line without its newline (a write in progress) is not returned.
+    """
+    if limit <= 0:
+        return []
+
+    with open(path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        position = f.tell()
+        blocks = []
+        newlines = 0
+        # One newline more than `limit` guarantees `limit` lines that start after it
+        while position > 0 and newlines <= limit:
+            read_size = min(block_size, position)
+            position -= read_size
+            f.seek(position)
+            block = f.read(read_size)
+            newlines += block.count(b'\n')
+            blocks.append(block)
+
+    data = b''.join(reversed(blocks))
+    end = data.rfind(b'\n')
+    if end == -1:
+        return []
+    lines = data[:end].split(b'\n')
+    if position > 0:
+        # The first piece starts mid-line
+        lines = lines[1:]
+    return [line for line in reversed(lines[-limit:]) if line.strip()]
+
+
+def tail_gzip_lines(path, limit):
+    """Return the last `limit` complete lines of a gzipped segment, newest first.
+
+    Gzip streams cannot be read backwards, so the segment is decompressed
+    front to back while only the last `limit` lines are kept in memory.
+    """
+    if limit <= 0:
+        return []
+    tail = deque(maxlen=limit)
+    with gzip.open(path, 'rb') as f:
+        for line in f:
+            if line.endswith(b'\n') and line.strip():
+                tail.append(line[:-1])
+    return list(reversed(tail))
+
+
+def tail_segment(path, limit):
+    """Tail a plain or gzipped log segment"""
+    if path.endswith('.gz'):
+        return tail_gzip_lines(path, limit)
+    return tail_lines(path, limit)
+
+
+def tail_records(path, limit):
+    """Last `limit` records of a segment in either log format, newest first"""
+    if ids_log_binary.is_binary_log(path):
+        return ids_log_binary.tail_records(path, limit)
+    records = []
+    for line in tail_segment(path, limit):
+        try:
+            records.append(json.loads(line))
+        except json.JSONDecodeError:
+            continue
+    return records
+
+
+def read_recent(path, limit):
+    """Return the newest `limit` records of a rotating log, newest first.
+
+    Starts at the active file and walks rotated segments from newest to oldest
+    only while more records are still needed.
+    """
+    if limit <= 0:
+        return []
+
+    # List segments before touching the active file so a rotation in between
+    # can only skip records, never return them twice
+    sources = [path] + list(reversed(list_segments(path)))
+    records = []
+    for source in sources:
+        needed = limit - len(records)
+        if needed <= 0:
+            break
+        try:
+            records.extend(tail_records(source, needed))
+        except FileNotFoundError:
+            # Rotated, compressed or pruned while we were reading
+            continue
+    return records
+
+
+def iter_records(path):
+    """Yield every record of a log file or rotated segment, oldest first"""
+    if not os.path.exists(path):
+        return
+    if ids_log_binary.is_binary_log(path):
+        yield from ids_log_binary.iter_records(path)
+        return
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rb') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                continue
+
+
+def encode_cursor(segment, offset, skip, newest):
+    """Opaque position in a rotating log: `skip` records into the unit at `offset` of `segment`.
+
+    `segment` is a segment_key, or None for the active file; `newest` is the
+    newest segment that existed then, so a rotation since can be recognised.
+    """
+    state = json.dumps([segment, offset, skip, newest], separators=(',', ':'))
+    return base64.urlsafe_b64encode(state.encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor):
+    """Raises ValueError for a cursor encode_cursor did not produce"""
+    try:
+        segment, offset, skip, newest = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        if not (isinstance(offset, int) and isinstance(skip, int) and offset >= 0 and skip >= 0):
+            raise ValueError(cursor)
+        # Segment names are compared as strings later on, after the response has started
+        if not all(name is None or isinstance(name, str) for name in (segment, newest)):
+            raise ValueError(cursor)
+        return segment, offset, skip, newest
+    except (binascii.Error, UnicodeError, ValueError, TypeError):
+        raise ValueError(f"Invalid cursor: {cursor}")
+
+
+def iter_records_from(path, cursor=None):
+    """Yield (record, cursor) for every record of a rotating log, oldest first.
+
+    Starts after `cursor` (from an earlier call) or at the oldest segment.
+    Each yielded cursor resumes right after its record, also once the active
+    file it points into has been rotated. The cursor is checked before this
+    returns, so a bad one raises ValueError here rather than mid-iteration.
+    """
+    position = decode_cursor(cursor) if cursor else None
+    return _iter_records_from(path, position)
+
+
+def _iter_records_from(path, position):
+    segments = list_segments(path)
+    keys = [segment_key(segment) for segment in segments]
+    newest = keys[-1] if keys else ''
+
+    # (segment key or None for the active file, start offset, records to skip there)
+    sources = []
+    active_offset = active_skip = 0
+    if position is None:
+        sources = [(key, 0, 0) for key in keys]
+    else:
+        segment, offset, skip, previous_newest = position
+        if segment is None:
+            # Segments newer than the cursor's newest were rotated out since; the first is its file
+            rotated = [key for key in keys if segment_order(key) > segment_order(previous_newest)]
+            if rotated:
+                sources = [(rotated[0], offset, skip)] + [(key, 0, 0) for key in rotated[1:]]
+            else:
+                active_offset, active_skip = offset, skip
+        else:
+            if segment in keys:
+                sources.append((segment, offset, skip))
+            sources.extend((key, 0, 0) for key in keys if segment_order(key) > segment_order(segment))
+    sources.append((None, active_offset, active_skip))
+
+    for key, offset, skip in sources:
+        source = path if key is None else resolve_segment(path, key)
+        if not source or not os.path.exists(source):
+            continue  # Pruned, or no active file yet
+        unit_start = offset
+        try:
+            for end_offset, unit in iter_record_units(source, offset):
+                for row in range(skip, len(unit)):
+                    if row + 1 < len(unit):
+                        after = encode_cursor(key, unit_start, row + 1, newest)
+                    else:
+                        after = encode_cursor(key, end_offset, 0, newest)
+                    yield unit[row][1], after
+                skip = 0
+                unit_start = end_offset
+        except FileNotFoundError:
+            continue  # Compressed or pruned between listing and opening
@@ -0,0 +1,286 @@
+import atexit
+import glob
+import gzip
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+
+from config import Config
+from services.ids_log_binary import encode_blocks
+
+logger = logging.getLogger(__name__)
+
+# fsync policies: 'none' leaves it to the OS, 'flush' fsyncs after every buffer
+# flush, 'rotate' only fsyncs a segment right before it is rotated out
+FSYNC_POLICIES = ('none', 'flush', 'rotate')
+
+# 'json' writes one JSON object per line, 'binary' packed blocks (see ids_log_binary)
+LOG_FORMATS = ('json', 'binary')
+
+
+def segment_key(segment_path):
+    """Stable name of a rotated segment, the same before and after it is gzipped"""
+    name = os.path.basename(segment_path)
+    if name.endswith('.gz'):
+        name = name[:-3]
+    return name
+
+
+def segment_order(key):
+    """Sort key for a segment_key: rotation stamp, then the same-second counter as a number.
+
+    Plain string order would put <stamp>-10 before <stamp>-2.
+    """
+    date, _, rest = key.rsplit('.', 1)[-1].partition('-')
+    clock, _, counter = rest.partition('-')
+    return date, clock, int(counter) if counter.isdigit() else 0
+
+
+def resolve_segment(path, key):
+    """Find the file currently holding a rotated segment, plain or gzipped"""
+    candidate = os.path.join(os.path.dirname(path), key)
+    if os.path.exists(candidate):
+        return candidate
+    if os.path.exists(candidate + '.gz'):
+        return candidate + '.gz'
+    return None
+
+
+def list_segments(path):
+    """List rotated segments of a log file, oldest first.
+
+    A segment that is mid-compression can briefly exist both plain and
+    gzipped; the plain file wins since it is the one guaranteed complete.
+    """
+    segments = {}
+    prefix = os.path.basename(path) + '.'
+    for candidate in glob.glob(glob.escape(path) + '.*'):
+        # Rotated segments are named <log>.<YYYYmmdd-HHMMSS>[-n][.gz]
+        if candidate.endswith('.tmp') or not os.path.basename(candidate)[len(prefix):][:1].isdigit():
+            continue
+        key = segment_key(candidate)
+        if key not in segments or not candidate.endswith('.gz'):
+            segments[key] = candidate
+    return [segments[key] for key in sorted(segments, key=segment_order)]
+
+
+class IDSLogWriter:
+    """Buffered NDJSON (or packed binary) writer for IDS logs with size/time based rotation.
+
+    Listeners can follow what reaches disk:
+      on_flush(start_offset, end_offset, [(offset, record), ...]) for the active file;
+        in the binary format each offset is a record location (see ids_log_binary)
+      on_rotate(segment_path) right after the active file is moved aside
+      on_prune(segment_path) when an old segment is deleted
+    Listeners run on the writer's background threads and must not call back
+    into the writer.
+    """
+
+    def __init__(self, path, flush_interval=None, max_buffer_records=None, fsync_policy=None,
+                 max_bytes=None, rotate_interval=None, backup_count=None, compress=True, log_format=None):
+        self.path = path
+        self.log_format = log_format or Config.IDS_LOG_FORMAT
+        if self.log_format not in LOG_FORMATS:
+            raise ValueError(f"Unknown IDS log format '{self.log_format}', expected one of {LOG_FORMATS}")
+        self.flush_interval = flush_interval if flush_interval is not None else Config.IDS_LOG_FLUSH_INTERVAL
+        self.max_buffer_records = max_buffer_records or Config.IDS_LOG_BUFFER_RECORDS
+        self.fsync_policy = fsync_policy or Config.IDS_LOG_FSYNC
+        if self.fsync_policy not in FSYNC_POLICIES:
+            raise ValueError(f"Unknown fsync policy '{self.fsync_policy}', expected one of {FSYNC_POLICIES}")
+        self.max_bytes = max_bytes if max_bytes is not None else Config.IDS_LOG_MAX_BYTES
+        self.rotate_interval = rotate_interval if rotate_interval is not None else Config.IDS_LOG_ROTATE_INTERVAL
+        self.backup_count = backup_count if backup_count is not None else Config.IDS_LOG_BACKUP_COUNT
+        self.compress = compress
+
+        self.buffer = []
+        self.buffer_lock = threading.Lock()
+        # Serializes flushes against rotation so only one thread touches the file handle
+        self.file_lock = threading.Lock()
+        self.flush_event = threading.Event()
+        self.file = None
+        self.opened_at = None
+        self.flush_thread = None
+        self.closed = False
+
+        self.records_written = 0
+        self.flushes = 0
+        self.rotations = 0
+        # Stamp and same-second counter of the last segment rotated out
+        self.last_stamp = None
+        self.last_suffix = 0
+
+        self.on_flush = []
+        self.on_rotate = []
+        self.on_prune = []
+
+    def write(self, record):
+        """Queue a log record; it reaches disk on the next periodic or size-triggered flush"""
+        if self.closed:
+            raise RuntimeError("IDS log writer is closed")
+        self._ensure_started()
+        with self.buffer_lock:
+            self.buffer.append(record)
+            full = len(self.buffer) >= self.max_buffer_records
+        if full:
+            self.flush_event.set()
+
+    def flush(self):
+        """Write everything buffered so far to disk"""
+        with self.file_lock:
+            with self.buffer_lock:
+                records, self.buffer = self.buffer, []
+            if records:
+                self._open()
+                start_offset = self.file.tell()
+                if self.log_format == 'binary':
+                    data, entries = encode_blocks(records, start_offset)
+                else:
+                    data, entries = self._encode_lines(records, start_offset)
+                offset = start_offset + len(data)
+                self.file.write(data)
+                self.file.flush()
+                if self.fsync_policy == 'flush':
+                    os.fsync(self.file.fileno())
+                self.records_written += len(records)
+                self.flushes += 1
+                self._notify(self.on_flush, start_offset, offset, entries)
+            if self._should_rotate():
+                self._rotate()
+
+    @staticmethod
+    def _encode_lines(records, start_offset):
+        offset = start_offset
+        lines = []
+        entries = []
+        for record in records:
+            line = (json.dumps(record) + "\n").encode('utf-8')
+            lines.append(line)
+            entries.append((offset, record))
+            offset += len(line)
+        return b''.join(lines), entries
+
+    def close(self):
+        """Flush remaining records and stop the flush thread"""
+        if self.closed:
+            return
+        self.closed = True
+        self.flush_event.set()
+        if self.flush_thread and self.flush_thread is not threading.current_thread():
+            self.flush_thread.join(timeout=5)
+        self.flush()
+        with self.file_lock:
+            if self.file:
+                self.file.close()
+                self.file = None
+
+    def get_stats(self):
+        """Get writer counters"""
+        with self.buffer_lock:
+            buffered = len(self.buffer)
+        return {
+            'path': self.path,
+            'format': self.log_format,
+            'buffered_records': buffered,
+            'records_written': self.records_written,
+            'flushes': self.flushes,
+            'rotations': self.rotations,
+            'fsync_policy': self.fsync_policy
+        }
+
+    def _ensure_started(self):
+        """Start the flush thread on first use"""
+        if self.flush_thread is None:
+            with self.buffer_lock:
+                if self.flush_thread is None:
+                    self.flush_thread = threading.Thread(target=self._flush_loop, daemon=True)
+                    self.flush_thread.start()
+                    atexit.register(self.close)
+
+    def _flush_loop(self):
+        """Flush every flush_interval seconds, or as soon as the buffer fills up"""
+        while not self.closed:
+            self.flush_event.wait(self.flush_interval)
+            self.flush_event.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Error flushing IDS logs: {e}")
+
+    def _open(self):
+        """Open the active segment for appending if it is not open yet"""
+        if self.file is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self.file = open(self.path, 'ab')
+            self.opened_at = time.time()
+
+    def _should_rotate(self):
+        if self.file is None:
+            return False
+        if self.max_bytes and self.file.tell() >= self.max_bytes:
+            return True
+        return bool(self.rotate_interval) and time.time() - self.opened_at >= self.rotate_interval
+
+    def _rotate(self):
+        """Move the active file aside as a timestamped segment and start a fresh one"""
+        if self.fsync_policy == 'rotate':
+            os.fsync(self.file.fileno())
+        self.file.close()
+        self.file = None
+
+        stamp = time.strftime('%Y%m%d-%H%M%S')
+        # Names must keep increasing: reusing one freed by pruning would sort the
+        # newest segment as the oldest, and it would be pruned next
+        suffix = self.last_suffix + 1 if stamp == self.last_stamp else 0
+        for existing in list_segments(self.path):
+            date, clock, counter = segment_order(segment_key(existing))
+            if f"{date}-{clock}" == stamp:
+                suffix = max(suffix, counter + 1)
+        segment = f"{self.path}.{stamp}-{suffix}" if suffix else f"{self.path}.{stamp}"
+        self.last_stamp, self.last_suffix = stamp, suffix
+        os.replace(self.path, segment)
+        self.rotations += 1
+        logger.info(f"Rotated IDS log to {segment}")
+        self._notify(self.on_rotate, segment)
+
+        if self.compress:
+            threading.Thread(target=self._compress_segment, args=(segment,), daemon=True).start()
+        else:
+            self._prune_segments()
+
+    def _compress_segment(self, segment):
+        """Gzip a rotated segment off the write path, then drop the plain copy"""
+        try:
+            tmp_path = segment + '.gz.tmp'
+            with open(segment, 'rb') as src, gzip.open(tmp_path, 'wb') as dst:
+                shutil.copyfileobj(src, dst)
+            os.replace(tmp_path, segment + '.gz')
+            os.remove(segment)
+        except Exception as e:
+            logger.error(f"Error compressing IDS log segment {segment}: {e}")
+        self._prune_segments()
+
+    def _prune_segments(self):
+        """Delete the oldest segments beyond backup_count"""
+        if not self.backup_count:
+            return
+        segments = list_segments(self.path)
+        for segment in segments[:-self.backup_count]:
+            try:
+                os.remove(segment)
+            except OSError as e:
+                logger.error(f"Error removing old IDS log segment {segment}: {e}")
+                continue
+            self._notify(self.on_prune, segment)
+
+    def _notify(self, listeners, *args):
+        """Call listeners, keeping a failing listener from breaking the write path"""
+        for listener in listeners:
+            try:
+                listener(*args)
+            except Exception as e:
+                logger.error(f"IDS log listener {getattr(listener, '__qualname__', listener)} failed: {e}")
@@ -1,45 +1,212 @@
 from scapy.all import sniff, IP, TCP, UDP, ICMP, Raw
 import random
 import datetime
+import numpy as np
 import pandas as pd
 from joblib import load
-import json
 import os
+import queue
+from collections import deque
 import threading
 import time
-import psutil
+from config import Config
+from services.ids_log_writer import IDSLogWriter
+from services.ids_log_reader import read_recent, iter_records, iter_records_from
+from services.ids_alert_aggregates import AlertAggregates
+from services.ids_alert_stream import AlertStream, sse_events
+from services.ids_incident_view import IncidentView
+from services.ids_log_index import IDSLogIndex
+from services.ids_rate_counter import SlidingWindowCounter
+from services.ids_multiprocess import MultiprocessPipeline
+from services.ids_flow_table import FlowTable
+from services.ids_replay import dissect, iter_raw_frames
+from services.ids_packet_parser import RawFrameSource, parse_frame, SUPPORTED_LINKTYPES
+from services.ids_resource_sampler import ResourceSampler
 
 # Set paths relative to the script's directory
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
-LOG_FILE = os.path.join(SCRIPT_DIR, "ids_logs.json")
+LOG_FILE = os.path.join(SCRIPT_DIR, "ids_logs.bin" if Config.IDS_LOG_FORMAT == 'binary' else "ids_logs.json")
 MODEL_PATH = os.path.join(SCRIPT_DIR, "nids_model_balanced.joblib")
 
 # Load the trained model
 model = load(MODEL_PATH)
 
+# How often idle flows are swept out of the flow table
+FLOW_SWEEP_INTERVAL = 1.0
+
 # Predefined feature names (used during training)
 FEATURES = [
     "source_port", "destination_port", "bytes_sent", "bytes_received", "frequency",
     "protocol_ICMP", "protocol_TCP", "protocol_UDP"
 ]
 
-# Store frequency of (src_ip + dst_port)
-freq_map = {}
+# Shared buffered writer for LOG_FILE; flushes and rotates off the packet path
+log_writer = IDSLogWriter(LOG_FILE, log_format=Config.IDS_LOG_FORMAT)
+# Per-IP offsets into LOG_FILE and its rotated segments, updated on every flush
+log_index = IDSLogIndex(LOG_FILE)
+log_index.attach(log_writer)
+alert_aggregates = AlertAggregates(LOG_FILE)
+alert_aggregates.attach(log_writer)
+incident_view = IncidentView(LOG_FILE)
+# Live feed of every record written, for /ids/alerts/stream
+alert_stream = AlertStream()
+
+# Recent frequency of (src_ip + dst_port): a bounded sliding-window count, not a lifetime total
+freq_counter = SlidingWindowCounter(
+    window_seconds=Config.IDS_FREQ_WINDOW_SECONDS,
+    bucket_seconds=Config.IDS_FREQ_BUCKET_SECONDS,
+    max_keys=Config.IDS_FREQ_MAX_KEYS
+)
+
+# Host and pipeline metrics sampled in the background so status reads never block
+resource_sampler = ResourceSampler()
+
+
+class BatchInferenceStage:
+    """Queues extracted packet features and scores them in batches with one model.predict call"""
+
+    def __init__(self, batch_size=None, max_latency_ms=None, queue_size=None, on_result=None):
+        self.batch_size = max(1, batch_size or Config.IDS_BATCH_SIZE)
+        self.max_latency = (max_latency_ms if max_latency_ms is not None else Config.IDS_BATCH_MAX_LATENCY_MS) / 1000.0
+        self.queue = queue.Queue(maxsize=queue_size or Config.IDS_QUEUE_SIZE)
+        self.on_result = on_result
+        self.is_running = False
+        self.worker_thread = None
+
+        self.stats_lock = threading.Lock()
+        self.batches_processed = 0
+        self.packets_scored = 0
+        self.packets_dropped = 0
+        self.total_batch_time = 0.0
+        self.last_batch = None
+        self.max_batch_latency_ms = 0.0
+
+    def start(self):
+        """Start the batching worker thread, with stats counted from this run"""
+        if not self.is_running:
+            self.reset_stats()
+            self.is_running = True
+            self.worker_thread = threading.Thread(target=self._worker_loop, daemon=True)
+            self.worker_thread.start()
+
+    def stop(self, timeout=5):
+        """Stop the worker once the queue has been drained"""
+        self.is_running = False
+        if self.worker_thread:
+            self.worker_thread.join(timeout=timeout)
+            self.worker_thread = None
+
+    def reset_stats(self):
+        with self.stats_lock:
+            self.batches_processed = 0
+            self.packets_scored = 0
+            self.packets_dropped = 0
+            self.total_batch_time = 0.0
+            self.last_batch = None
+            self.max_batch_latency_ms = 0.0
+
+    def submit(self, packet_data, block=False):
+        """Queue packet features for scoring; drops the packet if the queue is full unless `block`"""
+        try:
+            self.queue.put((time.perf_counter(), packet_data), block=block)
+            return True
+        except queue.Full:
+            with self.stats_lock:
+                self.packets_dropped += 1
+            return False
+
+    def _worker_loop(self):
+        """Drain up to batch_size packets, or whatever arrives within max_latency, per batch"""
+        while self.is_running or not self.queue.empty():
+            try:
+                first = self.queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+
+            batch = [first]
+            deadline = time.perf_counter() + self.max_latency
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self.queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            try:
+                self._run_batch(batch)
+            except Exception as e:
+                print(f"Batch inference error: {e}")
+
+    def _run_batch(self, batch):
+        """Score one batch, log every record and update the batch stats"""
+        started = time.perf_counter()
+        records = [packet_data for _, packet_data in batch]
+        predictions = predict_batch(records)
+        for packet_data, prediction in zip(records, predictions):
+            log_prediction(packet_data, prediction)
+            if self.on_result:
+                self.on_result(packet_data, prediction)
+        finished = time.perf_counter()
+
+        batch_time = finished - started
+        # Latency of the oldest packet: time spent queued plus time spent scoring
+        latency_ms = (finished - batch[0][0]) * 1000
+        with self.stats_lock:
+            self.batches_processed += 1
+            self.packets_scored += len(batch)
+            self.total_batch_time += batch_time
+            self.max_batch_latency_ms = max(self.max_batch_latency_ms, latency_ms)
+            self.last_batch = {
+                'size': len(batch),
+                'processing_ms': round(batch_time * 1000, 3),
+                'latency_ms': round(latency_ms, 3),
+                'packets_per_sec': round(len(batch) / batch_time, 1) if batch_time > 0 else None
+            }
+
+    def get_stats(self):
+        """Get batch throughput and latency stats"""
+        with self.stats_lock:
+            batches = self.batches_processed
+            return {
+                'mode': 'threaded',
+                'batch_size': self.batch_size,
+                'max_latency_ms': self.max_latency * 1000,
+                'queue_depth': self.queue.qsize(),
+                'queue_capacity': self.queue.maxsize,
+                'batches_processed': batches,
+                'packets_scored': self.packets_scored,
+                'packets_dropped': self.packets_dropped,
+                'avg_batch_size': round(self.packets_scored / batches, 2) if batches else 0,
+                'avg_processing_ms': round(self.total_batch_time * 1000 / batches, 3) if batches else 0,
+                'max_latency_ms_observed': round(self.max_batch_latency_ms, 3),
+                'packets_per_sec': round(self.packets_scored / self.total_batch_time, 1) if self.total_batch_time > 0 else 0,
+                'last_batch': self.last_batch
+            }
+
 
 class IDSMonitor:
-    def __init__(self):
+    def __init__(self, batch_size=None, max_latency_ms=None):
         self.is_monitoring = False
         self.packets_processed = 0
         self.alerts_generated = 0
         self.start_time = time.time()
         self.monitor_thread = None
+        self.sweeper_thread = None
+        self.pipeline = None
+        self.flow_table = None
+        self.source = {'type': 'live'}
         self.model_loaded = True  # Since model is loaded at module level
+        self.inference = BatchInferenceStage(
+            batch_size=batch_size,
+            max_latency_ms=max_latency_ms,
+            on_result=self._on_prediction
+        )
 
     def get_status(self):
         """Get current status of IDS monitor"""
-        cpu_usage = psutil.cpu_percent(interval=1)
-        memory = psutil.virtual_memory()
-        memory_usage = memory.percent
+        sample = resource_sampler.latest()
 
         return {
             'is_monitoring': self.is_monitoring,
@@ -47,119 +214,271 @@ class IDSMonitor:
             'stats': {
                 'packets_processed': self.packets_processed,
                 'alerts_generated': self.alerts_generated,
-                'system_health': 100 - max(cpu_usage, memory_usage),  # Simple health calculation
-                'cpu_usage': cpu_usage,
-                'memory_usage': memory_usage,
-                'uptime': time.time() - self.start_time
-            }
+                'system_health': sample['system_health'],
+                'cpu_usage': sample['cpu_usage'],
+                'memory_usage': sample['memory_usage'],
+                'uptime': time.time() - self.start_time,
+                'sampled_at': sample['timestamp']
+            },
+            'resources': sample,
+            'inference': self.pipeline.get_stats() if self.pipeline else self.inference.get_stats(),
+            'flows': self.flow_table.get_stats() if self.flow_table else None,
+            'source': self._source_status(),
+            'frequency_tracker': freq_counter.get_stats(),
+            'alert_stream': alert_stream.get_stats()
         }
 
-    def start_monitoring(self):
-        """Start the IDS monitoring in a separate thread"""
+    def get_status_history(self, limit=None):
+        """Recent resource samples, oldest first"""
+        return resource_sampler.get_history(limit)
+
+    def start_monitoring(self, workers=None, pcap_file=None, replay_speed=None):
+        """Start the IDS monitoring.
+
+        With workers=0 (the default unless IDS_WORKERS is set) capture and scoring
+        run on threads in this process. With workers=N a capture process hashes
+        flows across N scoring processes and results come back here to be logged.
+
+        With pcap_file set, packets are replayed from a pcap/pcapng file instead of
+        sniffed: as fast as possible (replay_speed None/0, the queue applies
+        backpressure instead of dropping), in real time (1.0) or at N x speed.
+        """
         if not self.is_monitoring:
+            workers = Config.IDS_WORKERS if workers is None else workers
+            if pcap_file and not os.path.exists(pcap_file):
+                raise FileNotFoundError(f"Capture file not found: {pcap_file}")
             self.is_monitoring = True
-            self.monitor_thread = threading.Thread(target=self._monitor_loop, daemon=True)
-            self.monitor_thread.start()
+            resource_sampler.add_source('ids', self._pipeline_metrics)
+            resource_sampler.start()
+            if pcap_file:
+                self.source = {'type': 'pcap', 'pcap_file': pcap_file, 'speed': replay_speed or 'max', 'finished': False}
+            else:
+                self.source = {'type': 'live'}
+            if workers > 0:
+                self.pipeline = MultiprocessPipeline(workers, on_records=self._on_worker_records,
+                                                     pcap_file=pcap_file, replay_speed=replay_speed)
+                self.pipeline.start()
+            else:
+                self.inference.start()
+                if Config.IDS_FLOW_AGGREGATION:
+                    self.flow_table = FlowTable()
+                    if not pcap_file:
+                        # Replay expires flows on capture time instead, see _replay_loop
+                        self.sweeper_thread = threading.Thread(target=self._sweep_loop, daemon=True)
+                        self.sweeper_thread.start()
+                if pcap_file:
+                    self.monitor_thread = threading.Thread(target=self._replay_loop, args=(pcap_file, replay_speed),
+                                                           daemon=True)
+                else:
+                    self.monitor_thread = threading.Thread(target=self._monitor_loop, daemon=True)
+                self.monitor_thread.start()
+        return True
 
     def stop_monitoring(self):
         """Stop the IDS monitoring"""
         self.is_monitoring = False
+        if self.pipeline:
+            self.pipeline.stop()
+            self.pipeline = None
         if self.monitor_thread:
             self.monitor_thread.join(timeout=5)
+            self.monitor_thread = None
+        if self.sweeper_thread:
+            self.sweeper_thread.join(timeout=5)
+            self.sweeper_thread = None
+        if self.flow_table:
+            # Score whatever is still in flight before the inference stage drains
+            for flow in self.flow_table.flush_all():
+                self.inference.submit(extract_flow_features(flow))
+            # A restart begins with an empty table rather than reporting this run's flows
+            self.flow_table = None
+        self.inference.stop()
+        log_writer.flush()
+        resource_sampler.remove_source('ids')
+        return True
 
     def _monitor_loop(self):
         """Main monitoring loop"""
         print("🔍 IDS started. Sniffing real network traffic... Press Ctrl+C to stop.")
         try:
+            if Config.IDS_PARSER == 'fast' and self._raw_capture_loop():
+                return
             sniff(filter="ip", prn=self._process_packet, store=0, stop_filter=lambda x: not self.is_monitoring)
         except Exception as e:
             print(f"Monitoring stopped: {e}")
         finally:
             self.is_monitoring = False
 
+    def _raw_capture_loop(self):
+        """Capture raw frames and parse only their headers; returns False if raw capture is unavailable"""
+        try:
+            source = RawFrameSource().open()
+        except OSError as e:
+            print(f"Raw capture unavailable ({e}), falling back to scapy sniffing")
+            return False
+        try:
+            while self.is_monitoring:
+                frame = source.recv()
+                if frame is None:
+                    continue
+                header = parse_raw_frame(*frame)
+                if header:
+                    self._process_header(header)
+        finally:
+            source.close()
+        return True
+
+    def _replay_loop(self, pcap_file, speed):
+        """Feed packets from a capture file through the same path as live traffic"""
+        print(f"🔍 IDS replaying {pcap_file} at {f'{speed}x' if speed else 'maximum'} speed...")
+        block = not speed
+        next_sweep = None
+        flow_table = self.flow_table
+        try:
+            for frame in iter_raw_frames(pcap_file, speed, should_stop=lambda: not self.is_monitoring):
+                header = parse_raw_frame(*frame)
+                if header is None:
+                    continue
+                self._process_header(header, block=block)
+                captured_at = header["ts"]
+                if flow_table:
+                    # Idle timeouts follow the capture's clock, not the wall clock
+                    if next_sweep is None:
+                        next_sweep = captured_at + FLOW_SWEEP_INTERVAL
+                    elif captured_at >= next_sweep:
+                        for flow in flow_table.expire(captured_at):
+                            self.inference.submit(extract_flow_features(flow), block=block)
+                        next_sweep = captured_at + FLOW_SWEEP_INTERVAL
+            if flow_table:
+                for flow in flow_table.flush_all():
+                    self.inference.submit(extract_flow_features(flow), block=block)
+            print(f"✅ IDS replay of {pcap_file} finished.")
+        except Exception as e:
+            print(f"Replay stopped: {e}")
+        finally:
+            self.source['finished'] = True
+            self.is_monitoring = False
+
     def _process_packet(self, packet):
         """Process individual packets"""
         if IP in packet:
-            self.packets_processed += 1
-            features = extract_features(packet)
-            prediction = predict_and_log(features)
-            if prediction == 1:  # Assuming 1 is malicious
-                self.alerts_generated += 1
+            self._process_header(parse_packet(packet))
         return None  # Required for scapy prn callback
 
+    def _process_header(self, header, block=False):
+        """Feed one parsed packet (see parse_packet) to the flow table or straight to inference"""
+        self.packets_processed += 1
+        # stop_monitoring drops the table, possibly while a capture thread is still finishing
+        flow_table = self.flow_table
+        if flow_table:
+            for flow in flow_table.update(**header):
+                self.inference.submit(extract_flow_features(flow), block=block)
+        else:
+            self.inference.submit(extract_header_features(header), block=block)
+
+    def _sweep_loop(self):
+        """Score flows that went idle; the sniff callback only runs when packets arrive"""
+        flow_table = self.flow_table
+        while self.is_monitoring:
+            time.sleep(FLOW_SWEEP_INTERVAL)
+            for flow in flow_table.expire(time.time()):
+                self.inference.submit(extract_flow_features(flow))
+
+    def _pipeline_metrics(self):
+        """Counters and queue depths recorded with every resource sample"""
+        metrics = {
+            'packets_processed': self.packets_processed,
+            'alerts_generated': self.alerts_generated,
+            'log_buffer': log_writer.get_stats()['buffered_records']
+        }
+        if self.pipeline:
+            stats = self.pipeline.get_stats()
+            metrics['worker_queues'] = [worker['queue_depth'] for worker in stats['worker_stats']]
+            metrics['packets_dropped'] = stats['packets_dropped']
+        else:
+            metrics['inference_queue'] = self.inference.queue.qsize()
+            metrics['packets_dropped'] = self.inference.packets_dropped
+        flow_table = self.flow_table
+        if flow_table:
+            metrics['active_flows'] = len(flow_table.flows)
+        return metrics
+
+    def _source_status(self):
+        """Where packets come from, and for a replay whether the file has been consumed"""
+        source = dict(self.source)
+        if self.pipeline and source['type'] == 'pcap':
+            source['finished'] = self.pipeline.is_finished()
+        return source
+
+    def _on_prediction(self, packet_data, prediction):
+        """Called by the inference stage for every scored packet"""
+        if prediction == 1:  # Assuming 1 is malicious
+            self.alerts_generated += 1
+
+    def _on_worker_records(self, records, packets):
+        """Single writer for log records scored by the worker processes"""
+        self.packets_processed += packets
+        for log in records:
+            if log["ml_prediction"] == 1:
+                self.alerts_generated += 1
+            write_log_record(log)
+
     def get_recent_logs(self, limit=50):
         """Get recent IDS logs"""
         try:
-            if not os.path.exists(LOG_FILE):
-                return []
-
-            with open(LOG_FILE, "r") as f:
-                lines = f.readlines()
-
-            logs = []
-            for line in reversed(lines[-limit:]):
-                try:
-                    log_entry = json.loads(line.strip())
-                    logs.append(log_entry)
-                except json.JSONDecodeError:
-                    continue
-
-            return logs
+            return read_recent(LOG_FILE, limit)
         except Exception as e:
             print(f"Error reading logs: {e}")
             return []
 
+    def iter_logs(self):
+        """Yield every record of the active IDS log file, oldest first"""
+        return iter_records(LOG_FILE)
+
     def get_logs_by_ip(self, ip_address, limit=20):
         """Get IDS logs for specific IP address"""
         try:
-            if not os.path.exists(LOG_FILE):
-                return []
-
-            with open(LOG_FILE, "r") as f:
-                lines = f.readlines()
-
-            logs = []
-            for line in reversed(lines):
-                try:
-                    log_entry = json.loads(line.strip())
-                    if log_entry.get('source_ip') == ip_address or log_entry.get('destination_ip') == ip_address:
-                        logs.append(log_entry)
-                        if len(logs) >= limit:
-                            break
-                except json.JSONDecodeError:
-                    continue
+            return log_index.lookup(ip_address, limit=limit)
+        except Exception as e:
+            print(f"Error reading IDS log index, falling back to a full scan: {e}")
+            return self._scan_logs_by_ip(ip_address, limit)
 
-            return logs
+    def _scan_logs_by_ip(self, ip_address, limit=20):
+        """Find IDS logs for an IP by scanning the active log file"""
+        try:
+            matches = deque(maxlen=limit)
+            for log_entry in iter_records(LOG_FILE):
+                if log_entry.get('source_ip') == ip_address or log_entry.get('destination_ip') == ip_address:
+                    matches.append(log_entry)
+            return list(reversed(matches))
         except Exception as e:
             print(f"Error reading logs by IP: {e}")
             return []
 
-    def get_alerts_summary(self):
-        """Get IDS alerts summary"""
-        try:
-            logs = self.get_recent_logs(limit=1000)  # Get last 1000 logs for summary
+    def iter_logs_from(self, cursor=None):
+        """(record, cursor) pairs oldest first across rotated segments, resuming after `cursor`"""
+        return iter_records_from(LOG_FILE, cursor)
 
-            alerts = {
-                'total_alerts': 0,
-                'malicious_detections': 0,
-                'http_traffic_alerts': 0,
-                'recent_alerts': []
-            }
+    def iter_incidents(self, cursor=None):
+        """(incident, cursor) pairs newest first, resuming after `cursor`"""
+        return incident_view.iter_incidents(cursor)
+
+    def subscribe_alerts(self, alert_levels=None, ip=None, protocols=None):
+        """Subscribe to records as they are logged; None if too many clients are subscribed"""
+        return alert_stream.subscribe(alert_levels, ip, protocols)
 
-            for log in logs:
-                detection = log.get('detection', '')
-                if 'Malicious' in detection or 'Alert' in detection:
-                    alerts['total_alerts'] += 1
-                    if 'Malicious IP detected' in detection:
-                        alerts['malicious_detections'] += 1
-                    elif 'Unsecured HTTP traffic' in detection:
-                        alerts['http_traffic_alerts'] += 1
+    def alert_events(self, subscription):
+        """Server-Sent Events body for a subscription; ends the subscription when the client disconnects"""
+        return sse_events(alert_stream, subscription)
 
-                    # Add to recent alerts (last 10)
-                    if len(alerts['recent_alerts']) < 10:
-                        alerts['recent_alerts'].append(log)
+    def get_incidents(self, limit=None, cursor=None):
+        """Get a newest-first page of security incidents; returns (incidents, next_cursor)"""
+        return incident_view.get_page(limit=limit, cursor=cursor)
 
-            return alerts
+    def get_alerts_summary(self, minutes=60):
+        """Get IDS alerts summary over the full log history"""
+        try:
+            return alert_aggregates.get_summary(minutes=minutes)
         except Exception as e:
             print(f"Error getting alerts summary: {e}")
             return {
@@ -170,40 +489,97 @@ class IDSMonitor:
             }
 
 
-def extract_features(packet):
+def extract_features(packet, pkt_len=None, captured_at=None):
+    """Extract model features; pkt_len/captured_at override the values read from `packet`"""
+    return extract_header_features(parse_packet(packet, pkt_len, captured_at))
+
+
+def extract_header_features(header):
+    """Model features for a single packet from its parsed headers (see parse_packet)"""
+    key = f"{header['src_ip']}:{header['dst_port']}"
+    frequency = freq_counter.increment(key)
+
+    return {
+        "source_ip": header["src_ip"],
+        "destination_ip": header["dst_ip"],
+        "source_port": header["src_port"],
+        "destination_port": header["dst_port"],
+        "protocol": header["protocol"],
+        "bytes_sent": header["length"],
+        "bytes_received": random.randint(100, 12000),
+        "frequency": frequency,
+        "timestamp": datetime.datetime.fromtimestamp(header["ts"]).strftime("%Y-%m-%d %H:%M:%S"),
+        "http_flag": header["http_flag"]
+    }
+
+
+def parse_packet(packet, pkt_len=None, captured_at=None):
+    """Read the header fields FlowTable.update needs from a packet"""
     protocol = "OTHER"
     src_port = dst_port = 0
-    pkt_len = len(packet)
+    tcp_flags = 0
 
     if TCP in packet:
         protocol = "TCP"
         src_port = packet[TCP].sport
         dst_port = packet[TCP].dport
+        tcp_flags = int(packet[TCP].flags)
     elif UDP in packet:
         protocol = "UDP"
         src_port = packet[UDP].sport
         dst_port = packet[UDP].dport
     elif ICMP in packet:
         protocol = "ICMP"
-        src_port = dst_port = 0
-
-    key = f"{packet[IP].src}:{dst_port}"
-    freq_map[key] = freq_map.get(key, 0) + 1
 
     return {
-        "source_ip": packet[IP].src,
-        "destination_ip": packet[IP].dst,
-        "source_port": src_port,
-        "destination_port": dst_port,
+        "src_ip": packet[IP].src,
+        "dst_ip": packet[IP].dst,
         "protocol": protocol,
-        "bytes_sent": pkt_len,
-        "bytes_received": random.randint(100, 12000),
-        "frequency": freq_map[key],
-        "timestamp": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "src_port": src_port,
+        "dst_port": dst_port,
+        "length": pkt_len if pkt_len is not None else len(packet),
+        "ts": captured_at if captured_at is not None else float(packet.time),
+        "tcp_flags": tcp_flags,
         "http_flag": detect_http(packet)
     }
 
 
+def parse_raw_frame(frame, linktype, captured_at=None, wire_len=None):
+    """parse_packet for a raw frame: header-only parsing with IDS_PARSER=fast, scapy otherwise.
+
+    Returns None for frames that carry no IP packet.
+    """
+    if Config.IDS_PARSER == 'fast' and linktype in SUPPORTED_LINKTYPES:
+        return parse_frame(frame, linktype, captured_at, wire_len)
+    packet = dissect(frame, linktype)
+    if IP not in packet:
+        return None
+    return parse_packet(packet, wire_len, captured_at)
+
+
+def extract_flow_features(flow):
+    """Model features for a finished flow: forward/reverse bytes instead of per-packet guesses"""
+    key = f"{flow.src_ip}:{flow.dst_port}"
+    # Counts flows (not packets) from this source to this port within the window
+    frequency = freq_counter.increment(key)
+
+    return {
+        "source_ip": flow.src_ip,
+        "destination_ip": flow.dst_ip,
+        "source_port": flow.src_port,
+        "destination_port": flow.dst_port,
+        "protocol": flow.protocol,
+        "bytes_sent": flow.bytes_fwd,
+        "bytes_received": flow.bytes_rev,
+        "frequency": frequency,
+        "timestamp": datetime.datetime.fromtimestamp(flow.first_seen).strftime("%Y-%m-%d %H:%M:%S"),
+        "http_flag": flow.http_flag,
+        "packets": flow.packets,
+        "duration": round(flow.duration, 3),
+        "flow_end_reason": flow.end_reason
+    }
+
+
 def detect_http(packet):
     if TCP in packet and Raw in packet:
         payload = packet[Raw].load
@@ -213,28 +589,42 @@ def detect_http(packet):
     return False
 
 
+def build_feature_matrix(records):
+    """Build the (n, len(FEATURES)) model input for a list of packet feature dicts"""
+    matrix = np.empty((len(records), len(FEATURES)), dtype=np.float64)
+    for row, packet_data in enumerate(records):
+        # Encode protocol manually
+        protocol = packet_data["protocol"]
+        packet_data["protocol_ICMP"] = 1 if protocol == "ICMP" else 0
+        packet_data["protocol_TCP"] = 1 if protocol == "TCP" else 0
+        packet_data["protocol_UDP"] = 1 if protocol == "UDP" else 0
+        matrix[row] = [packet_data[name] for name in FEATURES]
+    return matrix
+
+
+def predict_batch(records):
+    """Score a list of packet feature dicts with a single model.predict call"""
+    if not records:
+        return []
+    # Wrap once per batch so the model still sees the feature names it was trained with
+    df = pd.DataFrame(build_feature_matrix(records), columns=FEATURES)
+    return model.predict(df)
+
+
 def predict_and_log(packet_data):
-    # Encode protocol manually
-    protocol = packet_data["protocol"]
-    packet_data["protocol_ICMP"] = 1 if protocol == "ICMP" else 0
-    packet_data["protocol_TCP"] = 1 if protocol == "TCP" else 0
-    packet_data["protocol_UDP"] = 1 if protocol == "UDP" else 0
-
-    # Extract features for model
-    input_data = [[
-        packet_data["source_port"],
-        packet_data["destination_port"],
-        packet_data["bytes_sent"],
-        packet_data["bytes_received"],
-        packet_data["frequency"],
-        packet_data["protocol_ICMP"],
-        packet_data["protocol_TCP"],
-        packet_data["protocol_UDP"]
-    ]]
-
-    df = pd.DataFrame(input_data, columns=FEATURES)
-    prediction = model.predict(df)[0]
+    prediction = predict_batch([packet_data])[0]
+    log_prediction(packet_data, prediction)
+    return prediction
+
+
+def log_prediction(packet_data, prediction):
+    log = build_log_record(packet_data, prediction)
+    write_log_record(log)
+    return log
+
 
+def build_log_record(packet_data, prediction):
+    """Turn scored packet features into an IDS log record"""
     is_http = packet_data.get("http_flag", False)
     if is_http:
         detection = "⚠  Unsecured HTTP traffic detected"
@@ -269,13 +659,23 @@ def predict_and_log(packet_data):
         "packet_size": int(packet_data["bytes_sent"]),  # Convert to int
         "frequency": int(packet_data["frequency"])  # Convert to int
     }
-
-    with open(LOG_FILE, "a") as f:
-        f.write(json.dumps(log) + "\n")
-
-    print(f"[{packet_data['timestamp']}] {status} traffic from {packet_data['source_ip']} to {packet_data['destination_ip']}")
-
-    return prediction
+    if "packets" in packet_data:
+        # Flow-level record
+        log.update({
+            "bytes_received": int(packet_data["bytes_received"]),
+            "packets": int(packet_data["packets"]),
+            "duration": packet_data["duration"],
+            "flow_end_reason": packet_data["flow_end_reason"]
+        })
+    return log
+
+
+def write_log_record(log):
+    """Hand a log record to the shared writer and to live subscribers"""
+    log_writer.write(log)
+    alert_stream.publish(log)
+
+    print(f"[{log['timestamp']}] {log['status']} traffic from {log['source_ip']} to {log['destination_ip']}")
 
 
 def process_packet(packet):
@@ -0,0 +1,350 @@
+import logging
+import multiprocessing
+import queue
+import threading
+import time
+import zlib
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# How often the capture process publishes its counters to the parent
+COUNTER_SYNC_INTERVAL = 1.0
+
+
+def flow_worker_index(src_ip, dst_ip, proto, src_port, dst_port, workers):
+    """Map a flow 5-tuple to a worker; both directions of a flow map to the same worker"""
+    a, b = (src_ip, src_port), (dst_ip, dst_port)
+    if b < a:
+        a, b = b, a
+    key = f"{proto}|{a[0]}|{a[1]}|{b[0]}|{b[1]}".encode()
+    # crc32 rather than hash(): stable across processes and restarts
+    return zlib.crc32(key) % workers
+
+
+def _capture_main(worker_queues, stop_event, captured, dropped, pcap_file=None, replay_speed=None):
+    """Capture process: sniff (or replay) and hand packets to the worker owning their flow.
+
+    With IDS_PARSER=fast frames are parsed here by header only and workers get the
+    parsed headers; otherwise workers get raw IP bytes to rebuild with scapy.
+    """
+    from scapy.all import AsyncSniffer, IP, TCP, UDP
+    from services.ids_monitor import parse_raw_frame
+    from services.ids_packet_parser import RawFrameSource
+    from services.ids_replay import iter_pcap, iter_raw_frames
+
+    workers = len(worker_queues)
+    fast = Config.IDS_PARSER == 'fast'
+    counts = {'captured': 0, 'dropped': 0, 'next_sync': time.monotonic() + COUNTER_SYNC_INTERVAL}
+    # A replay at maximum speed waits for the workers instead of dropping packets
+    block = bool(pcap_file) and not replay_speed
+
+    def sync():
+        captured.value, dropped.value = counts['captured'], counts['dropped']
+        counts['next_sync'] = time.monotonic() + COUNTER_SYNC_INTERVAL
+
+    def route(index, item):
+        counts['captured'] += 1
+        try:
+            worker_queues[index].put(item, block=block)
+        except queue.Full:
+            counts['dropped'] += 1
+
+    def handle(packet):
+        if IP not in packet:
+            return
+        ip = packet[IP]
+        l4 = packet[TCP] if TCP in packet else packet[UDP] if UDP in packet else None
+        src_port = l4.sport if l4 is not None else 0
+        dst_port = l4.dport if l4 is not None else 0
+        wire_len = getattr(packet, 'wirelen', None) or len(packet)
+        route(flow_worker_index(ip.src, ip.dst, ip.proto, src_port, dst_port, workers),
+              (bytes(ip), wire_len, float(packet.time)))
+
+    def handle_frame(frame, linktype, captured_at, wire_len):
+        header = parse_raw_frame(frame, linktype, captured_at, wire_len)
+        if header is None:
+            return
+        route(flow_worker_index(header['src_ip'], header['dst_ip'], header['protocol'],
+                                header['src_port'], header['dst_port'], workers), header)
+
+    if pcap_file:
+        # Replay the file, then tell the workers the input has ended
+        try:
+            if fast:
+                for frame in iter_raw_frames(pcap_file, replay_speed, should_stop=stop_event.is_set):
+                    handle_frame(*frame)
+                    if time.monotonic() >= counts['next_sync']:
+                        sync()
+            else:
+                for packet in iter_pcap(pcap_file, replay_speed, should_stop=stop_event.is_set):
+                    handle(packet)
+                    if time.monotonic() >= counts['next_sync']:
+                        sync()
+        except Exception as e:
+            logger.error(f"IDS replay of {pcap_file} stopped: {e}")
+        finally:
+            sync()
+            for worker_queue in worker_queues:
+                worker_queue.put(None)
+        return
+
+    source = None
+    if fast:
+        try:
+            source = RawFrameSource().open()
+        except OSError as e:
+            logger.warning(f"Raw capture unavailable ({e}), falling back to scapy sniffing")
+    if source is not None:
+        try:
+            while not stop_event.is_set():
+                frame = source.recv()
+                if frame is not None:
+                    handle_frame(*frame)
+                if time.monotonic() >= counts['next_sync']:
+                    sync()
+        finally:
+            source.close()
+            sync()
+        return
+
+    sniffer = AsyncSniffer(filter="ip", prn=handle, store=False)
+    sniffer.start()
+    try:
+        while not stop_event.wait(COUNTER_SYNC_INTERVAL):
+            sync()
+    finally:
+        sniffer.stop()
+        sync()
+
+
+def _scoring_main(worker_id, in_queue, result_queue, batch_size, max_latency, flow_mode, replay=False):
+    """Scoring process: rebuild packets, extract features and score them in batches.
+
+    In flow mode packets are folded into a per-worker flow table (the capture
+    process routes both directions of a flow here) and finished flows are scored.
+    During a replay idle flows are expired on the capture's clock, not the wall clock.
+    """
+    from scapy.all import IP
+    # Imported here to avoid a circular import; each worker ends up with its own
+    # per-flow feature state (frequency counters, flow table)
+    from services.ids_monitor import (extract_header_features, extract_flow_features, parse_packet,
+                                      predict_batch, build_log_record, FLOW_SWEEP_INTERVAL)
+    from services.ids_flow_table import FlowTable
+
+    flow_table = FlowTable() if flow_mode else None
+    next_sweep = None
+    last_capture = 0.0
+    stopping = False
+    while not stopping:
+        try:
+            item = in_queue.get(timeout=FLOW_SWEEP_INTERVAL)
+        except queue.Empty:
+            item = ()
+        if item is None:
+            break
+        batch = [item] if item else []
+        deadline = time.perf_counter() + max_latency
+        while batch and len(batch) < batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                item = in_queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                stopping = True
+                break
+            batch.append(item)
+
+        started = time.perf_counter()
+        try:
+            # Headers arrive parsed from the fast path, raw IP bytes from the scapy path
+            headers = [item if isinstance(item, dict) else
+                       parse_packet(IP(item[0]), pkt_len=item[1], captured_at=item[2]) for item in batch]
+            if flow_table is None:
+                features = [extract_header_features(header) for header in headers]
+            else:
+                flows = []
+                for header in headers:
+                    flows.extend(flow_table.update(**header))
+                    last_capture = max(last_capture, header['ts'])
+                now = last_capture if replay else time.time()
+                if next_sweep is None:
+                    next_sweep = now + FLOW_SWEEP_INTERVAL
+                if stopping:
+                    flows.extend(flow_table.flush_all())
+                elif now >= next_sweep:
+                    flows.extend(flow_table.expire(now))
+                    next_sweep = now + FLOW_SWEEP_INTERVAL
+                features = [extract_flow_features(flow) for flow in flows]
+            predictions = predict_batch(features) if features else []
+            records = [build_log_record(f, p) for f, p in zip(features, predictions)]
+        except Exception as e:
+            logger.error(f"IDS worker {worker_id} failed to score a batch: {e}")
+            continue
+        if not batch and not records:
+            continue
+        processing = time.perf_counter() - started
+        # Capture timestamps of replayed packets say nothing about current latency
+        latency = time.time() - headers[0]['ts'] if headers and not replay else 0.0
+        result_queue.put((worker_id, records, len(batch), processing, latency))
+
+    if flow_table is not None and not stopping:
+        # Sentinel arrived on its own; score the flows still open
+        try:
+            features = [extract_flow_features(flow) for flow in flow_table.flush_all()]
+            if features:
+                records = [build_log_record(f, p) for f, p in zip(features, predict_batch(features))]
+                result_queue.put((worker_id, records, 0, 0.0, 0.0))
+        except Exception as e:
+            logger.error(f"IDS worker {worker_id} failed to score remaining flows: {e}")
+    result_queue.put((worker_id, None, 0, 0.0, 0.0))
+
+
+class MultiprocessPipeline:
+    """One capture process feeding N scoring processes, with results logged by the parent"""
+
+    def __init__(self, workers, on_records, batch_size=None, max_latency_ms=None, queue_size=None, flow_mode=None,
+                 pcap_file=None, replay_speed=None):
+        self.workers = workers
+        self.on_records = on_records
+        self.pcap_file = pcap_file
+        self.replay_speed = replay_speed
+        self.flow_mode = Config.IDS_FLOW_AGGREGATION if flow_mode is None else flow_mode
+        self.batch_size = max(1, batch_size or Config.IDS_BATCH_SIZE)
+        self.max_latency = (max_latency_ms if max_latency_ms is not None else Config.IDS_BATCH_MAX_LATENCY_MS) / 1000.0
+        self.queue_size = max(1, (queue_size or Config.IDS_QUEUE_SIZE) // workers)
+
+        # fork where available: children share the loaded model copy-on-write, and
+        # spawn would re-run the parent's __main__ (server.py) in every child. The
+        # children only use the model, scapy and their own queues, none of which
+        # another parent thread can be holding a lock on at fork time.
+        start_method = 'fork' if 'fork' in multiprocessing.get_all_start_methods() else 'spawn'
+        self.context = multiprocessing.get_context(start_method)
+        self.worker_queues = []
+        self.result_queue = None
+        self.stop_event = None
+        self.captured = None
+        self.dropped = None
+        self.capture_process = None
+        self.worker_processes = []
+        self.collector_thread = None
+
+        self.stats_lock = threading.Lock()
+        self.worker_stats = {}
+
+    def start(self):
+        """Start the worker processes, then capture, then the result collector"""
+        ctx = self.context
+        self.worker_queues = [ctx.Queue(maxsize=self.queue_size) for _ in range(self.workers)]
+        self.result_queue = ctx.Queue()
+        self.stop_event = ctx.Event()
+        self.captured = ctx.Value('L', 0, lock=False)
+        self.dropped = ctx.Value('L', 0, lock=False)
+        self.worker_stats = {
+            worker_id: {'batches': 0, 'packets': 0, 'records': 0, 'processing_seconds': 0.0, 'last_latency_ms': None}
+            for worker_id in range(self.workers)
+        }
+
+        self.worker_processes = [
+            ctx.Process(target=_scoring_main, name=f"ids-worker-{worker_id}", daemon=True,
+                        args=(worker_id, self.worker_queues[worker_id], self.result_queue,
+                              self.batch_size, self.max_latency, self.flow_mode, bool(self.pcap_file)))
+            for worker_id in range(self.workers)
+        ]
+        for process in self.worker_processes:
+            process.start()
+
+        self.capture_process = ctx.Process(target=_capture_main, name="ids-capture", daemon=True,
+                                           args=(self.worker_queues, self.stop_event, self.captured, self.dropped,
+                                                 self.pcap_file, self.replay_speed))
+        self.capture_process.start()
+
+        self.collector_thread = threading.Thread(target=self._collect_loop, daemon=True)
+        self.collector_thread.start()
+        print(f"🔍 IDS started with 1 capture process and {self.workers} scoring workers.")
+
+    def stop(self, timeout=5):
+        """Stop capture, let the workers drain their queues, then stop collecting"""
+        self.stop_event.set()
+        self.capture_process.join(timeout)
+        for worker_queue in self.worker_queues:
+            try:
+                worker_queue.put(None, timeout=timeout)
+            except queue.Full:
+                pass
+        for process in self.worker_processes:
+            process.join(timeout)
+            if process.is_alive():
+                process.terminate()
+        if self.capture_process.is_alive():
+            self.capture_process.terminate()
+        self.collector_thread.join(timeout)
+
+    def is_finished(self):
+        """True once every worker has signed off (e.g. a replay reached the end of its file)"""
+        return self.collector_thread is not None and not self.collector_thread.is_alive()
+
+    def _collect_loop(self):
+        """Forward worker results to on_records until every worker has signed off"""
+        remaining = self.workers
+        while remaining:
+            try:
+                worker_id, records, packets, processing, latency = self.result_queue.get(timeout=1)
+            except queue.Empty:
+                if not any(process.is_alive() for process in self.worker_processes):
+                    break
+                continue
+            if records is None:
+                remaining -= 1
+                continue
+
+            with self.stats_lock:
+                stats = self.worker_stats[worker_id]
+                stats['batches'] += 1
+                stats['packets'] += packets
+                stats['records'] += len(records)
+                stats['processing_seconds'] += processing
+                stats['last_latency_ms'] = round(latency * 1000, 3)
+            try:
+                self.on_records(records, packets)
+            except Exception as e:
+                logger.error(f"Error handling IDS worker results: {e}")
+
+    def get_stats(self):
+        """Get capture counters and per-worker batch stats"""
+        workers = []
+        with self.stats_lock:
+            for worker_id, stats in self.worker_stats.items():
+                batches, seconds = stats['batches'], stats['processing_seconds']
+                workers.append({
+                    'worker': worker_id,
+                    'alive': self.worker_processes[worker_id].is_alive() if self.worker_processes else False,
+                    'queue_depth': self._qsize(self.worker_queues[worker_id]),
+                    'batches_processed': batches,
+                    'packets_received': stats['packets'],
+                    'records_scored': stats['records'],
+                    'avg_batch_size': round(stats['packets'] / batches, 2) if batches else 0,
+                    'packets_per_sec': round(stats['packets'] / seconds, 1) if seconds > 0 else 0,
+                    'last_latency_ms': stats['last_latency_ms']
+                })
+        return {
+            'mode': 'multiprocess',
+            'workers': self.workers,
+            'batch_size': self.batch_size,
+            'max_latency_ms': self.max_latency * 1000,
+            'flow_mode': self.flow_mode,
+            'packets_captured': self.captured.value if self.captured else 0,
+            'packets_dropped': self.dropped.value if self.dropped else 0,
+            'worker_stats': workers
+        }
+
+    @staticmethod
+    def _qsize(worker_queue):
+        try:
+            return worker_queue.qsize()
+        except NotImplementedError:  # macOS
+            return None
@@ -0,0 +1,166 @@
+import logging
+import socket
+import struct
+import time
+
+logger = logging.getLogger(__name__)
+
+# Link types (pcap DLT_* values) parse_frame understands
+LINKTYPE_ETHERNET = 1
+LINKTYPE_RAW = 101
+LINKTYPE_RAW_ALT = 12  # DLT_RAW on OpenBSD
+LINKTYPE_LINUX_SLL = 113
+SUPPORTED_LINKTYPES = (LINKTYPE_ETHERNET, LINKTYPE_RAW, LINKTYPE_RAW_ALT, LINKTYPE_LINUX_SLL)
+
+ETH_P_ALL = 0x0003
+ETHERTYPE_IPV4 = 0x0800
+VLAN_ETHERTYPES = (0x8100, 0x88A8, 0x9100)
+
+PROTO_ICMP = 1
+PROTO_TCP = 6
+PROTO_UDP = 17
+
+_ETHERTYPE = struct.Struct('!H')
+_PORTS = struct.Struct('!HH')
+_IPV4_FRAG = struct.Struct('!H')
+
+MAX_FRAME_SIZE = 65535
+
+
+def _is_http(payload):
+    """Same test as ids_monitor.detect_http, on raw TCP payload bytes"""
+    if b"HTTP" in payload or b"Host:" in payload:
+        return b"https" not in payload.lower()
+    return False
+
+
+def parse_frame(frame, linktype=LINKTYPE_ETHERNET, captured_at=None, wire_len=None):
+    """Parse link/IP/transport headers of a raw frame without scapy.
+
+    Returns the same dict as ids_monitor.parse_packet, or None if the frame is
+    not IPv4 (scapy parsing and the live capture filter only pass IPv4 too) or
+    is truncated before the IP header. Non-first fragments and
+    unknown transports come back as protocol "OTHER" with ports 0, as they do
+    when scapy dissects them.
+    """
+    try:
+        if linktype == LINKTYPE_ETHERNET:
+            offset = 12
+            ethertype, = _ETHERTYPE.unpack_from(frame, offset)
+            while ethertype in VLAN_ETHERTYPES:
+                offset += 4
+                ethertype, = _ETHERTYPE.unpack_from(frame, offset)
+            offset += 2
+        elif linktype == LINKTYPE_LINUX_SLL:
+            ethertype, = _ETHERTYPE.unpack_from(frame, 14)
+            offset = 16
+        elif linktype in (LINKTYPE_RAW, LINKTYPE_RAW_ALT):
+            ethertype = ETHERTYPE_IPV4 if frame[0] >> 4 == 4 else None
+            offset = 0
+        else:
+            return None
+
+        if ethertype != ETHERTYPE_IPV4:
+            return None
+        ihl = (frame[offset] & 0x0F) * 4
+        proto = frame[offset + 9]
+        src_ip = socket.inet_ntoa(frame[offset + 12:offset + 16])
+        dst_ip = socket.inet_ntoa(frame[offset + 16:offset + 20])
+        fragment_offset = _IPV4_FRAG.unpack_from(frame, offset + 6)[0] & 0x1FFF
+        transport = offset + ihl
+        if fragment_offset:
+            proto = None
+    except (IndexError, struct.error, ValueError, OSError):
+        return None
+
+    protocol = "OTHER"
+    src_port = dst_port = 0
+    tcp_flags = 0
+    http_flag = False
+    try:
+        if proto == PROTO_TCP:
+            src_port, dst_port = _PORTS.unpack_from(frame, transport)
+            tcp_flags = frame[transport + 13]
+            payload_start = transport + (frame[transport + 12] >> 4) * 4
+            protocol = "TCP"
+            if payload_start < len(frame):
+                http_flag = _is_http(frame[payload_start:])
+        elif proto == PROTO_UDP:
+            src_port, dst_port = _PORTS.unpack_from(frame, transport)
+            protocol = "UDP"
+        elif proto == PROTO_ICMP:
+            protocol = "ICMP"
+    except (IndexError, struct.error):
+        # Truncated transport header; keep what the IP header told us
+        protocol = "OTHER"
+        src_port = dst_port = 0
+
+    return {
+        "src_ip": src_ip,
+        "dst_ip": dst_ip,
+        "protocol": protocol,
+        "src_port": src_port,
+        "dst_port": dst_port,
+        "length": wire_len if wire_len is not None else len(frame),
+        "ts": captured_at if captured_at is not None else time.time(),
+        "tcp_flags": tcp_flags,
+        "http_flag": http_flag
+    }
+
+
+class RawFrameSource:
+    """Raw link-layer frames from the network, without dissecting them.
+
+    Uses an AF_PACKET socket where available (Linux) and falls back to scapy's
+    L2 listen socket, read through recv_raw so scapy never dissects the frame.
+    """
+
+    def __init__(self, interface=None, timeout=0.5):
+        self.interface = interface
+        self.timeout = timeout
+        self.sock = None
+        self.scapy_socket = None
+        self.linktype = LINKTYPE_ETHERNET
+        self.buffer = bytearray(MAX_FRAME_SIZE)
+
+    def open(self):
+        """Open the capture socket; raises OSError if capture is not permitted"""
+        if hasattr(socket, 'AF_PACKET'):
+            self.sock = socket.socket(socket.AF_PACKET, socket.SOCK_RAW, socket.htons(ETH_P_ALL))
+            if self.interface:
+                self.sock.bind((self.interface, 0))
+            self.sock.settimeout(self.timeout)
+            return self
+
+        from scapy.all import conf
+        self.scapy_socket = conf.L2listen(iface=self.interface) if self.interface else conf.L2listen()
+        return self
+
+    def recv(self):
+        """Return (frame, linktype, captured_at, wire_len), or None if nothing arrived within the timeout"""
+        if self.sock is not None:
+            try:
+                # MSG_TRUNC makes recv report the full frame length even if the buffer was short
+                size = self.sock.recv_into(self.buffer, MAX_FRAME_SIZE, socket.MSG_TRUNC)
+            except socket.timeout:
+                return None
+            captured = min(size, MAX_FRAME_SIZE)
+            return bytes(self.buffer[:captured]), self.linktype, time.time(), size
+
+        from scapy.all import conf, select_objects
+        if not select_objects([self.scapy_socket], self.timeout):
+            return None
+        cls, frame, captured_at = self.scapy_socket.recv_raw()
+        if frame is None:
+            return None
+        linktype = conf.l2types.layer2num.get(cls)
+        return frame, linktype, captured_at or time.time(), len(frame)
+
+    def close(self):
+        for sock in (self.sock, self.scapy_socket):
+            if sock is not None:
+                try:
+                    sock.close()
+                except Exception as e:
+                    logger.debug(f"Error closing capture socket: {e}")
+        self.sock = self.scapy_socket = None
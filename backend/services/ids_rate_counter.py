@@ -0,0 +1,96 @@
+import math
+import threading
+import time
+from array import array
+from collections import OrderedDict
+
+
+class SlidingWindowCounter:
+    """Per-key event counts over a sliding time window with a hard cap on tracked keys.
+
+    Each key owns a fixed ring of per-bucket counts covering `window_seconds`,
+    so memory per key is constant and old events age out bucket by bucket.
+    Once `max_keys` keys are tracked the least recently seen key is evicted.
+    """
+
+    def __init__(self, window_seconds=60, bucket_seconds=5, max_keys=100000, clock=time.monotonic):
+        if bucket_seconds <= 0 or window_seconds < bucket_seconds:
+            raise ValueError("Need 0 < bucket_seconds <= window_seconds")
+        self.window_seconds = window_seconds
+        self.bucket_seconds = bucket_seconds
+        self.num_buckets = math.ceil(window_seconds / bucket_seconds)
+        self.max_keys = max_keys
+        self.clock = clock
+        self.lock = threading.Lock()
+        # key -> [ring of bucket counts, events in ring, absolute index of newest bucket]
+        self.entries = OrderedDict()
+        self.evictions = 0
+
+    def increment(self, key, amount=1):
+        """Record `amount` events for `key` and return its count over the full window"""
+        bucket = self._bucket_index()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                entry = [array('L', [0]) * self.num_buckets, 0, bucket]
+                self.entries[key] = entry
+                if len(self.entries) > self.max_keys:
+                    self.entries.popitem(last=False)
+                    self.evictions += 1
+            else:
+                self.entries.move_to_end(key)
+                self._advance(entry, bucket)
+            entry[0][bucket % self.num_buckets] += amount
+            entry[1] += amount
+            return entry[1]
+
+    def count(self, key, window_seconds=None):
+        """Events for `key` over the last `window_seconds` (the full window by default)"""
+        bucket = self._bucket_index()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return 0
+            self._advance(entry, bucket)
+            if window_seconds is None or window_seconds >= self.window_seconds:
+                return entry[1]
+            buckets = max(1, math.ceil(window_seconds / self.bucket_seconds))
+            ring = entry[0]
+            return sum(ring[(bucket - i) % self.num_buckets] for i in range(buckets))
+
+    def rate(self, key, window_seconds=None):
+        """Events per second for `key` over the last `window_seconds`"""
+        window_seconds = min(window_seconds or self.window_seconds, self.window_seconds)
+        return self.count(key, window_seconds) / window_seconds
+
+    def get_stats(self):
+        """Get tracker size counters"""
+        with self.lock:
+            tracked = len(self.entries)
+        return {
+            'tracked_keys': tracked,
+            'max_keys': self.max_keys,
+            'evictions': self.evictions,
+            'window_seconds': self.window_seconds,
+            'bucket_seconds': self.bucket_seconds
+        }
+
+    def _bucket_index(self):
+        return int(self.clock() // self.bucket_seconds)
+
+    def _advance(self, entry, bucket):
+        """Zero the buckets that fell out of the window since the key was last touched"""
+        ring, _, newest = entry
+        elapsed = bucket - newest
+        if elapsed <= 0:
+            return
+        if elapsed >= self.num_buckets:
+            for i in range(self.num_buckets):
+                ring[i] = 0
+            entry[1] = 0
+        else:
+            for i in range(newest + 1, bucket + 1):
+                slot = i % self.num_buckets
+                entry[1] -= ring[slot]
+                ring[slot] = 0
+        entry[2] = bucket
@@ -0,0 +1,87 @@
+import time
+
+from scapy.all import conf, Raw
+from scapy.utils import RawPcapReader
+
+# Replay speeds: None/0 replays as fast as possible, 1.0 in real time, N at N x capture speed
+AS_FAST_AS_POSSIBLE = 0
+
+
+def _timestamp(reader, metadata):
+    """Capture time of a record, for both pcap and pcapng readers"""
+    if hasattr(metadata, 'tshigh'):  # pcapng
+        if metadata.tshigh is None:
+            return None  # Simple Packet Blocks carry no timestamp
+        return ((metadata.tshigh << 32) + metadata.tslow) / float(metadata.tsresol)
+    return metadata.sec + metadata.usec / (1e9 if getattr(reader, 'nano', False) else 1e6)
+
+
+def dissect(raw, linktype):
+    """Build a scapy packet from a raw frame of the given pcap link type"""
+    return conf.l2types.get(linktype, Raw)(raw)
+
+
+def iter_raw_pcap(path):
+    """Yield (raw_bytes, linktype, captured_at, wire_len) for each frame of a pcap/pcapng file.
+
+    Frames are not dissected here so callers can time (or skip) parsing separately.
+    """
+    captured_at = 0.0
+    reader = RawPcapReader(path)
+    try:
+        for raw, metadata in reader:
+            linktype = getattr(metadata, 'linktype', None)
+            if linktype is None:
+                linktype = reader.linktype
+            timestamp = _timestamp(reader, metadata)
+            if timestamp is not None:
+                captured_at = timestamp
+            yield raw, linktype, captured_at, metadata.wirelen or len(raw)
+    finally:
+        reader.close()
+
+
+class ReplayClock:
+    """Paces replayed packets to their capture timestamps divided by `speed`"""
+
+    def __init__(self, speed=None):
+        self.speed = speed or AS_FAST_AS_POSSIBLE
+        self.first_capture = None
+        self.started = None
+
+    def wait(self, captured_at, should_stop=None):
+        """Sleep until `captured_at` is due; returns False if should_stop() fired while waiting"""
+        if not self.speed:
+            return True
+        now = time.monotonic()
+        if self.first_capture is None:
+            self.first_capture, self.started = captured_at, now
+            return True
+        due = self.started + (captured_at - self.first_capture) / self.speed
+        while now < due:
+            if should_stop and should_stop():
+                return False
+            # Short sleeps so a stop request is noticed during long gaps in the capture
+            time.sleep(min(due - now, 0.1))
+            now = time.monotonic()
+        return True
+
+
+def iter_raw_frames(path, speed=None, should_stop=None):
+    """Yield (raw_bytes, linktype, captured_at, wire_len) from a pcap/pcapng file, paced at `speed`"""
+    clock = ReplayClock(speed)
+    for frame in iter_raw_pcap(path):
+        if should_stop and should_stop():
+            return
+        if not clock.wait(frame[2], should_stop):
+            return
+        yield frame
+
+
+def iter_pcap(path, speed=None, should_stop=None):
+    """Yield dissected packets from a pcap/pcapng file, paced at `speed` (see ReplayClock)"""
+    for raw, linktype, captured_at, wire_len in iter_raw_frames(path, speed, should_stop):
+        packet = dissect(raw, linktype)
+        packet.time = captured_at
+        packet.wirelen = wire_len
+        yield packet
@@ -0,0 +1,128 @@
+import datetime
+import logging
+import threading
+import time
+from collections import deque
+
+import psutil
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class ResourceSampler:
+    """Samples host and pipeline metrics on a background thread into a fixed-size history.
+
+    Readers get the latest sample without waiting: CPU usage is measured
+    between consecutive samples rather than by blocking the caller.
+    """
+
+    def __init__(self, interval=None, history_size=None):
+        self.interval = interval or Config.IDS_STATUS_SAMPLE_INTERVAL
+        self.history = deque(maxlen=history_size or Config.IDS_STATUS_HISTORY_SIZE)
+        self.lock = threading.Lock()
+        # name -> callable returning a dict merged into each sample's 'pipeline'
+        self.sources = {}
+        self.thread = None
+        self.stop_event = threading.Event()
+        self.process = psutil.Process()
+        self.last_net = None
+        self.last_time = None
+
+    def start(self):
+        """Start sampling if not started yet"""
+        if self.thread is None:
+            with self.lock:
+                if self.thread is None:
+                    # Prime the CPU counter so the first real sample has a baseline
+                    psutil.cpu_percent(interval=None)
+                    self.stop_event.clear()
+                    self.thread = threading.Thread(target=self._sample_loop, daemon=True)
+                    self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread:
+            self.thread.join(timeout=self.interval + 1)
+            self.thread = None
+
+    def add_source(self, name, func):
+        """Include func()'s dict in every sample under pipeline[name]"""
+        with self.lock:
+            self.sources[name] = func
+
+    def remove_source(self, name):
+        with self.lock:
+            self.sources.pop(name, None)
+
+    def latest(self):
+        """The most recent sample; takes one now if the sampler has not produced any yet"""
+        self.start()
+        with self.lock:
+            if self.history:
+                return self.history[-1]
+        return self.sample()
+
+    def get_history(self, limit=None):
+        """Samples oldest first, at most the last `limit`"""
+        self.start()
+        with self.lock:
+            samples = list(self.history)
+        return samples[-limit:] if limit else samples
+
+    def sample(self):
+        """Take one sample and append it to the history"""
+        now = time.time()
+        cpu_usage = psutil.cpu_percent(interval=None)
+        memory_usage = psutil.virtual_memory().percent
+        net = psutil.net_io_counters(pernic=True)
+
+        elapsed = now - self.last_time if self.last_time else None
+        interfaces = {}
+        for name, counters in net.items():
+            previous = self.last_net.get(name) if self.last_net else None
+            interface = {
+                'packets_recv': counters.packets_recv,
+                'packets_sent': counters.packets_sent,
+                'dropin': counters.dropin,
+                'dropout': counters.dropout,
+                'errin': counters.errin,
+                'errout': counters.errout
+            }
+            if previous and elapsed:
+                interface['packets_recv_per_sec'] = round((counters.packets_recv - previous.packets_recv) / elapsed, 1)
+                interface['packets_sent_per_sec'] = round((counters.packets_sent - previous.packets_sent) / elapsed, 1)
+                interface['drops_per_sec'] = round(
+                    (counters.dropin + counters.dropout - previous.dropin - previous.dropout) / elapsed, 2)
+            interfaces[name] = interface
+
+        with self.lock:
+            sources = list(self.sources.items())
+        pipeline = {}
+        for name, func in sources:
+            try:
+                pipeline[name] = func()
+            except Exception as e:
+                logger.error(f"Error sampling {name}: {e}")
+
+        sample = {
+            'timestamp': datetime.datetime.fromtimestamp(now).isoformat(),
+            'cpu_usage': cpu_usage,
+            'memory_usage': memory_usage,
+            'system_health': 100 - max(cpu_usage, memory_usage),  # Simple health calculation
+            'process_rss_mb': round(self.process.memory_info().rss / (1024 * 1024), 1),
+            'interfaces': interfaces,
+            'pipeline': pipeline
+        }
+        with self.lock:
+            self.last_net, self.last_time = net, now
+            self.history.append(sample)
+        return sample
+
+    def _sample_loop(self):
+        while not self.stop_event.wait(self.interval):
+            try:
+                self.sample()
+            except Exception as e:
+                logger.error(f"Error sampling IDS resources: {e}")
@@ -0,0 +1,493 @@
+"""Local incident store: SQLite as the system of record, Google Sheets as a replica.
+
+Reads and writes are served from a SQLite file. Every write also goes into
+an outbox table in the same transaction, and a background thread replays
+the outbox to Google Sheets in batches, so Sheets being slow, down or over
+quota never blocks a request and no write is lost across restarts. Failed
+writes are retried with exponential backoff for as long as the failure looks
+transient; ones Sheets rejects outright move to a dead-letter table.
+
+The store is seeded from the sheet on first use, and rows added to the
+sheet by other clients are imported every INCIDENT_PULL_INTERVAL seconds.
+"""
+import argparse
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+from config import Config
+from services.google_sheets import GoogleSheetsService
+
+logger = logging.getLogger(__name__)
+
+# Incident columns, named as get_security_incidents returns them (the sheet headers, lowercased)
+COLUMNS = ('timestamp', 'eventid', 'severity', 'sourceip', 'destinationip', 'attacktype', 'status', 'actiontaken')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS incidents (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    timestamp TEXT,
+    eventid TEXT NOT NULL,
+    severity TEXT,
+    sourceip TEXT,
+    destinationip TEXT,
+    attacktype TEXT,
+    status TEXT,
+    actiontaken TEXT,
+    extra TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_incidents_eventid ON incidents (eventid);
+CREATE INDEX IF NOT EXISTS idx_incidents_severity ON incidents (severity);
+CREATE INDEX IF NOT EXISTS idx_incidents_status ON incidents (status);
+CREATE INDEX IF NOT EXISTS idx_incidents_timestamp ON incidents (timestamp);
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    op TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT,
+    next_attempt_at REAL NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS dead_letter (
+    id INTEGER PRIMARY KEY,
+    op TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    attempts INTEGER NOT NULL,
+    last_error TEXT,
+    failed_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+# Seconds before retrying a replication op after its nth consecutive transient failure:
+# BACKOFF_BASE * 2 ** (n - 1), capped at BACKOFF_MAX
+BACKOFF_BASE = 5.0
+BACKOFF_MAX = 600.0
+
+
+def _is_permanent(result):
+    """Whether a failed Sheets call will fail the same way however often it is retried.
+
+    Client errors are, except rate limiting and timeouts; server errors,
+    network errors and failures without a status code are assumed transient.
+    """
+    status_code = result.get('status_code')
+    return bool(status_code) and 400 <= status_code < 500 and status_code not in (408, 429)
+
+
+def _field(incident, *names, default=''):
+    """First non-empty value among the spellings callers use (sourceip / sourceIp)"""
+    for name in names:
+        value = incident.get(name)
+        if value:
+            return value
+    return default
+
+
+def _new_event_id(incident):
+    return f"INC-{datetime.now().strftime('%Y%m%d')}-{str(hash(str(incident)) % 1000).zfill(3)}"
+
+
+class IncidentStore:
+    """Security incidents in SQLite, replicated to Google Sheets in the background"""
+
+    def __init__(self, path=None, sheets=None):
+        self.path = path or Config.INCIDENT_STORE_FILE
+        self.sheets = sheets or GoogleSheetsService()
+        self.sync_interval = Config.INCIDENT_SYNC_INTERVAL
+        self.batch_size = Config.INCIDENT_SYNC_BATCH_SIZE
+        self.pull_interval = Config.INCIDENT_PULL_INTERVAL
+        self.lock = threading.RLock()
+        self.conn = None
+        self.thread = None
+        self.stop_event = threading.Event()
+        self.seeded = False
+        self.last_sync = None
+        self.last_pull = 0.0
+        self.last_error = None
+        self.replicated = 0
+
+    def get_security_incidents(self):
+        """Get all security incidents, in the order they were added"""
+        self._ensure_started()
+        with self.lock:
+            rows = self._connect().execute(
+                f"SELECT {', '.join(COLUMNS)}, extra FROM incidents ORDER BY id"
+            ).fetchall()
+        return {'success': True, 'data': [self._to_incident(row) for row in rows]}
+
+    def add_security_incident(self, incident):
+        """Add a new security incident"""
+        timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        event_id = incident.get('eventId') or _new_event_id(incident)
+        self._insert([self._normalize(incident, timestamp, event_id)])
+        return {
+            'success': True,
+            'data': {
+                'incident': {
+                    'timestamp': timestamp,
+                    'eventId': event_id,
+                    'severity': incident.get('severity'),
+                    'sourceIp': incident.get('sourceIp'),
+                    'destinationIp': incident.get('destinationIp'),
+                    'attackType': incident.get('attackType'),
+                    'status': incident.get('status'),
+                    'actionTaken': incident.get('actionTaken')
+                }
+            }
+        }
+
+    def bulk_add_incidents(self, incidents_list):
+        """Bulk add multiple incidents"""
+        rows = []
+        for incident in incidents_list:
+            timestamp = incident.get('timestamp') or datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            event_id = incident.get('eventId') or _new_event_id(incident)
+            rows.append(self._normalize(incident, timestamp, event_id))
+        self._insert(rows)
+        return {'success': True, 'data': {'addedCount': len(rows), 'eventIds': [row['eventid'] for row in rows]}}
+
+    def update_incident_status(self, event_id, new_status, action_taken):
+        """Update incident status"""
+        self._ensure_started()
+        with self.lock:
+            conn = self._connect()
+            with conn:
+                cursor = conn.execute("UPDATE incidents SET status = ?, actiontaken = ? WHERE eventid = ?",
+                                      (new_status, action_taken, event_id))
+                if cursor.rowcount == 0:
+                    return {'success': False, 'error': 'Incident not found'}
+                self._enqueue(conn, 'status', {'eventid': event_id, 'status': new_status,
+                                               'actiontaken': action_taken})
+        return {'success': True, 'data': {'eventId': event_id, 'status': new_status, 'actionTaken': action_taken}}
+
+    def bulk_update_incident_status(self, updates):
+        """Update the status of many incidents in one transaction; unknown IDs are reported in notFound"""
+        self._ensure_started()
+        updated = []
+        not_found = []
+        with self.lock:
+            conn = self._connect()
+            with conn:
+                for update in updates:
+                    event_id = update['eventId']
+                    action_taken = update.get('actionTaken', 'Updated')
+                    cursor = conn.execute("UPDATE incidents SET status = ?, actiontaken = ? WHERE eventid = ?",
+                                          (update['status'], action_taken, event_id))
+                    if cursor.rowcount == 0:
+                        not_found.append(event_id)
+                        continue
+                    self._enqueue(conn, 'status', {'eventid': event_id, 'status': update['status'],
+                                                   'actiontaken': action_taken})
+                    updated.append(event_id)
+        return {'success': True, 'data': {'updated': updated, 'notFound': not_found}}
+
+    def sync(self, force=False):
+        """Replicate pending writes to Google Sheets now; returns how many were replicated.
+
+        Ops backing off after a failure wait for their retry time unless `force` is set.
+        """
+        with self.lock:
+            self._ensure_seeded()
+        replicated = 0
+        while True:
+            with self.lock:
+                ops = self._connect().execute(
+                    "SELECT id, op, payload, attempts, next_attempt_at FROM outbox ORDER BY id LIMIT ?",
+                    (self.batch_size,)
+                ).fetchall()
+            # Ops go out in order, so everything waits while the oldest one backs off
+            if not ops or (ops[0][4] > time.time() and not force):
+                break
+            sent, handled = self._replicate(ops)
+            replicated += sent
+            if handled < len(ops):
+                break  # Sheets failed transiently; retry after the backoff, in order
+            force = False
+        self.last_sync = datetime.now().isoformat()
+        self.replicated += replicated
+        return replicated
+
+    def pull(self):
+        """Import incidents added to the sheet by other clients; returns how many were new, None on failure"""
+        try:
+            result = self.sheets.get_security_incidents()
+        except Exception as e:
+            result = {'success': False, 'error': str(e)}
+        if not result['success']:
+            logger.warning(f"Could not read incidents from Google Sheets: {result.get('error')}")
+            return None
+        with self.lock:
+            conn = self._connect()
+            known = {row[0] for row in conn.execute("SELECT eventid FROM incidents")}
+            new_rows = [incident for incident in result['data']
+                        if incident.get('eventid') and incident['eventid'] not in known]
+            if new_rows:
+                with conn:
+                    self._insert_rows(conn, new_rows)
+        self.last_pull = time.monotonic()
+        if new_rows:
+            logger.info(f"Imported {len(new_rows)} incidents from Google Sheets")
+        return len(new_rows)
+
+    def get_stats(self):
+        with self.lock:
+            conn = self._connect()
+            incidents = conn.execute("SELECT COUNT(*) FROM incidents").fetchone()[0]
+            pending, retrying, next_attempt_at = conn.execute(
+                "SELECT COUNT(*), SUM(attempts > 0), MIN(CASE WHEN attempts > 0 THEN next_attempt_at END) FROM outbox"
+            ).fetchone()
+            dead_letter = conn.execute("SELECT COUNT(*) FROM dead_letter").fetchone()[0]
+        return {
+            'path': self.path,
+            'incidents': incidents,
+            'pending_replication': pending,
+            # Pending ops that have failed at least once, and when the next retry is due
+            'retrying': retrying or 0,
+            'next_retry_at': datetime.fromtimestamp(next_attempt_at).isoformat() if next_attempt_at else None,
+            'dead_letter': dead_letter,
+            'replicated': self.replicated,
+            'last_sync': self.last_sync,
+            'last_error': self.last_error
+        }
+
+    def requeue_dead_letter(self):
+        """Queue dead-lettered ops for replication again, e.g. after fixing Sheets access; returns how many"""
+        with self.lock:
+            conn = self._connect()
+            with conn:
+                rows = conn.execute("SELECT id, op, payload FROM dead_letter ORDER BY id").fetchall()
+                conn.executemany("INSERT INTO outbox (op, payload) VALUES (?, ?)", [(op, payload) for _, op, payload in rows])
+                conn.executemany("DELETE FROM dead_letter WHERE id = ?", [(op_id,) for op_id, _, _ in rows])
+        return len(rows)
+
+    def close(self):
+        self.stop_event.set()
+        if self.thread:
+            self.thread.join(timeout=5)
+            self.thread = None
+
+    def _connect(self):
+        if self.conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            self.conn = sqlite3.connect(self.path, check_same_thread=False)
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+            self.conn.executescript(SCHEMA)
+            # Outboxes created before retries were backed off
+            columns = [row[1] for row in self.conn.execute("PRAGMA table_info(outbox)")]
+            if 'next_attempt_at' not in columns:
+                self.conn.execute("ALTER TABLE outbox ADD COLUMN next_attempt_at REAL NOT NULL DEFAULT 0")
+        return self.conn
+
+    def _ensure_started(self):
+        """Seed from the sheet on first use and start the replication thread"""
+        if self.thread is None:
+            with self.lock:
+                if self.thread is None:
+                    self._ensure_seeded()
+                    self.stop_event.clear()
+                    self.thread = threading.Thread(target=self._sync_loop, daemon=True)
+                    self.thread.start()
+
+    def _ensure_seeded(self):
+        """Import the sheet once; until that succeeds it is retried on every sync"""
+        if self.seeded:
+            return
+        conn = self._connect()
+        if not conn.execute("SELECT value FROM meta WHERE key = 'seeded_at'").fetchone():
+            if self.pull() is None:
+                return
+            with conn:
+                conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('seeded_at', ?)",
+                             (datetime.now().isoformat(),))
+        self.seeded = True
+
+    def _normalize(self, incident, timestamp, event_id):
+        return {
+            'timestamp': timestamp,
+            'eventid': event_id,
+            'severity': incident.get('severity', 'Medium'),
+            'sourceip': _field(incident, 'sourceip', 'sourceIp', default='Unknown'),
+            'destinationip': _field(incident, 'destinationip', 'destinationIp', default='Unknown'),
+            'attacktype': _field(incident, 'attacktype', 'attackType', default='Unknown'),
+            'status': incident.get('status', 'Investigating'),
+            'actiontaken': _field(incident, 'actiontaken', 'actionTaken', default='Alert Sent')
+        }
+
+    def _insert(self, rows):
+        """Store new incidents and queue them for replication, in one transaction"""
+        self._ensure_started()
+        with self.lock:
+            conn = self._connect()
+            with conn:
+                self._insert_rows(conn, rows)
+                for row in rows:
+                    self._enqueue(conn, 'add', row)
+
+    @staticmethod
+    def _insert_rows(conn, rows):
+        values = []
+        for row in rows:
+            # Columns the sheet has beyond the standard ones
+            extra = {key: value for key, value in row.items() if key not in COLUMNS}
+            values.append([row.get(column, '') for column in COLUMNS] + [json.dumps(extra) if extra else None])
+        conn.executemany(
+            f"INSERT INTO incidents ({', '.join(COLUMNS)}, extra) VALUES ({', '.join('?' * (len(COLUMNS) + 1))})",
+            values
+        )
+
+    @staticmethod
+    def _enqueue(conn, op, payload):
+        conn.execute("INSERT INTO outbox (op, payload) VALUES (?, ?)", (op, json.dumps(payload)))
+
+    @staticmethod
+    def _to_incident(row):
+        incident = dict(zip(COLUMNS, row))
+        if row[-1]:
+            incident.update(json.loads(row[-1]))
+        return incident
+
+    def _replicate(self, ops):
+        """Send a batch of outbox ops to Sheets, consecutive ops of a kind as one bulk call.
+
+        Returns (replicated, handled): ops that reached the sheet, and those plus
+        ops dead-lettered; anything after the first transient failure is left queued.
+        """
+        sent = 0
+        handled = 0
+        index = 0
+        while index < len(ops):
+            op = ops[index][1]
+            run = [ops[index]]
+            while index + len(run) < len(ops) and ops[index + len(run)][1] == op:
+                run.append(ops[index + len(run)])
+            result = self._send_run(op, run)
+            if not result['success'] and _is_permanent(result) and len(run) > 1:
+                # One bad op fails the whole bulk call; send them one at a time to find it
+                for single in run:
+                    result = self._send_run(op, [single])
+                    if not self._settle(op, [single], result):
+                        return sent, handled
+                    sent += 1 if result['success'] else 0
+                    handled += 1
+            else:
+                if not self._settle(op, run, result):
+                    return sent, handled
+                sent += len(run) if result['success'] else 0
+                handled += len(run)
+            index += len(run)
+        return sent, handled
+
+    def _send_run(self, op, run):
+        try:
+            return self._send(op, [json.loads(payload) for _, _, payload, _, _ in run])
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+
+    def _settle(self, op, run, result):
+        """Record the outcome of sending `run`; False if it failed transiently and stays queued"""
+        ids = [(op_id,) for op_id, _, _, _, _ in run]
+        permanent = not result['success'] and _is_permanent(result)
+        with self.lock:
+            conn = self._connect()
+            with conn:
+                if result['success']:
+                    conn.executemany("DELETE FROM outbox WHERE id = ?", ids)
+                    return True
+                self.last_error = result.get('error')
+                if permanent:
+                    conn.executemany(
+                        "INSERT INTO dead_letter (id, op, payload, attempts, last_error, failed_at) "
+                        "SELECT id, op, payload, attempts + 1, ?, ? FROM outbox WHERE id = ?",
+                        [(self.last_error, datetime.now().isoformat(), op_id) for op_id, in ids]
+                    )
+                    conn.executemany("DELETE FROM outbox WHERE id = ?", ids)
+                else:
+                    now = time.time()
+                    conn.executemany(
+                        "UPDATE outbox SET attempts = attempts + 1, last_error = ?, next_attempt_at = ? WHERE id = ?",
+                        [(self.last_error, now + min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempts), op_id)
+                         for op_id, _, _, attempts, _ in run]
+                    )
+        if permanent:
+            logger.error(f"Sheets rejected {len(run)} incident {op} operations ({result.get('status_code')}), "
+                         f"moved to the dead-letter table: {self.last_error}")
+            return True
+        logger.warning(f"Replicating incident {op} to Google Sheets failed, will retry: {self.last_error}")
+        return False
+
+    def _send(self, op, payloads):
+        if op == 'add':
+            # bulk_add_incidents takes the camelCase keys the API accepts
+            return self.sheets.bulk_add_incidents([{
+                'timestamp': row['timestamp'],
+                'eventId': row['eventid'],
+                'severity': row['severity'],
+                'sourceIp': row['sourceip'],
+                'destinationIp': row['destinationip'],
+                'attackType': row['attacktype'],
+                'status': row['status'],
+                'actionTaken': row['actiontaken']
+            } for row in payloads])
+        if op == 'status':
+            # Incidents no longer in the sheet are reported as notFound, which is not worth retrying
+            return self.sheets.bulk_update_incident_status([{
+                'eventId': update['eventid'],
+                'status': update['status'],
+                'actionTaken': update['actiontaken']
+            } for update in payloads])
+        return {'success': False, 'status_code': 400, 'error': f"Unknown replication op {op}"}
+
+    def _sync_loop(self):
+        # Writes made within one interval go out together
+        while not self.stop_event.wait(self.sync_interval):
+            try:
+                self.sync()
+                if self.pull_interval and time.monotonic() - self.last_pull >= self.pull_interval:
+                    self.pull()
+            except Exception as e:
+                self.last_error = str(e)
+                logger.error(f"Error replicating incidents to Google Sheets: {e}")
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_incident_store():
+    """The process-wide IncidentStore, so only one thread replicates the outbox"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = IncidentStore()
+    return _store
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Replicate the local incident store to Google Sheets')
+    parser.add_argument('command', choices=['sync', 'pull', 'stats', 'requeue'])
+    parser.add_argument('--store-file', default=None, help='SQLite incident store (default: INCIDENT_STORE_FILE)')
+    args = parser.parse_args(argv)
+
+    store = IncidentStore(args.store_file)
+    if args.command == 'sync':
+        print(f"Replicated {store.sync(force=True)} pending writes")
+    elif args.command == 'pull':
+        imported = store.pull()
+        print("Could not read the sheet" if imported is None else f"Imported {imported} incidents")
+    elif args.command == 'requeue':
+        print(f"Requeued {store.requeue_dead_letter()} dead-lettered writes")
+    print(json.dumps(store.get_stats(), indent=2))
+
+
+if __name__ == '__main__':
+    main()
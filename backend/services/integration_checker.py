@@ -6,6 +6,7 @@ from datetime import datetime, timedelta
 from services.n8n import N8nService
 from services.google_sheets import GoogleSheetsService
 from services.groq import GroqService
+from services.groq_scheduler import BACKGROUND
 from services.pdf_generator import PDFReportGenerator
 from services.ids_monitor import IDSMonitor
 from firebase_init import firebase_initialized
@@ -17,7 +18,8 @@ class IntegrationChecker:
     def __init__(self):
         self.n8n_service = N8nService()
         self.google_sheets = GoogleSheetsService()
-        self.groq_service = GroqService()
+        # Health probes should not hold up analysts' requests
+        self.groq_service = GroqService(priority=BACKGROUND)
         self.pdf_generator = PDFReportGenerator()
         self.ids_monitor = IDSMonitor()
         self.last_check = {}
@@ -87,7 +89,8 @@ class IntegrationChecker:
                 'status': status,
                 'lastSync': datetime.now(),
                 'events': incident_count,
-                'health': 100 if status == 'connected' else 0
+                'health': 100 if status == 'connected' else 0,
+                'cache': self.google_sheets.get_cache_stats()
             }
         except Exception as e:
             logger.error(f"Error checking Google Sheets integration: {str(e)}")
@@ -0,0 +1,113 @@
+"""Generators for streaming large JSON responses in constant memory.
+
+Bodies are produced piece by piece so Flask can send them chunked as they
+are generated: either NDJSON (one record per line, then a final
+{"next_cursor": ...} line), the usual {"success": true, "data": [...]}
+envelope with the array written out incrementally, or Server-Sent Events.
+"""
+import codecs
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Records joined into one chunk before it is handed to the server
+CHUNK_RECORDS = 200
+READ_SIZE = 64 * 1024
+
+_decoder = json.JSONDecoder()
+_SEPARATORS = ' \t\r\n,'
+# What can follow an element of a valid array
+_TERMINATORS = _SEPARATORS + ']'
+
+
+def iter_json_array(path, start=0, read_size=READ_SIZE):
+    """Yield (next_offset, item) for each element of a JSON array file, without loading it.
+
+    `start` is 0 or an offset previously yielded, to resume after that
+    element. Memory depends on the largest element, not on the file size.
+    """
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    with open(path, 'rb') as f:
+        f.seek(start)
+        text = ''
+        base, offset = 0, start  # text[base] is at byte `offset` of the file
+        expect_open = start == 0
+        eof = False
+        while not eof:
+            data = f.read(read_size)
+            eof = not data
+            text = text[base:] + decoder.decode(data, final=eof)
+            base = position = 0
+            while True:
+                while position < len(text) and text[position] in _SEPARATORS:
+                    position += 1
+                if position >= len(text):
+                    break
+                if expect_open:
+                    if text[position] != '[':
+                        raise ValueError(f"{path} does not hold a JSON array")
+                    expect_open = False
+                    offset += len(text[base:position + 1].encode('utf-8'))
+                    base = position = position + 1
+                    continue
+                if text[position] == ']':
+                    return
+                try:
+                    item, end = _decoder.raw_decode(text, position)
+                except json.JSONDecodeError:
+                    if eof:
+                        raise
+                    break  # The element continues in the next read
+                if not eof and (end == len(text) or text[end] not in _TERMINATORS):
+                    break  # A number may be cut short (e.g. "-350." of "-350.0"); wait for what follows
+                offset += len(text[base:end].encode('utf-8'))
+                base = position = end
+                yield offset, item
+
+
+def ndjson_chunks(items, next_cursor=None):
+    """NDJSON body for `items`; next_cursor() is called once they are exhausted"""
+    lines = []
+    try:
+        for item in items:
+            lines.append(json.dumps(item, ensure_ascii=False))
+            if len(lines) >= CHUNK_RECORDS:
+                yield '\n'.join(lines) + '\n'
+                lines = []
+        lines.append(json.dumps({'next_cursor': next_cursor() if next_cursor else None}))
+    except Exception as e:
+        # The status line is gone already; report the failure in-band
+        logger.error(f"Error streaming NDJSON response: {e}")
+        lines.append(json.dumps({'error': str(e)}))
+    yield '\n'.join(lines) + '\n'
+
+
+def json_array_chunks(items, next_cursor=None):
+    """{"success": true, "data": [...], "next_cursor": ...} for `items`, written incrementally"""
+    yield '{"success": true, "data": ['
+    pieces = []
+    separator = ''
+    try:
+        for item in items:
+            pieces.append(separator + json.dumps(item, ensure_ascii=False))
+            separator = ','
+            if len(pieces) >= CHUNK_RECORDS:
+                yield ''.join(pieces)
+                pieces = []
+        tail = {'next_cursor': next_cursor() if next_cursor else None}
+    except Exception as e:
+        logger.error(f"Error streaming JSON response: {e}")
+        tail = {'next_cursor': None, 'error': str(e)}
+    pieces.append('], ' + json.dumps(tail)[1:])
+    yield ''.join(pieces)
+
+
+def sse_chunks(events):
+    """Server-Sent Events body for (event name, JSON-serializable data) pairs"""
+    try:
+        for name, data in events:
+            yield f"event: {name}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+    except Exception as e:
+        logger.error(f"Error streaming events: {e}")
+        yield f"event: error\ndata: {json.dumps({'success': False, 'error': str(e)})}\n\n"
@@ -0,0 +1,198 @@
+"""Response cache for Groq completions.
+
+Completions are keyed by the normalized (model, messages, temperature,
+max_tokens) they were requested with. Entries live in an in-memory LRU and,
+when GROQ_CACHE_FILE is set, in a SQLite file that survives restarts. With
+GROQ_CACHE_SIMILARITY on, a prompt whose simhash is within a few bits of a
+cached one with the same model, parameters and system prompt reuses its answer.
+"""
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# Prompts whose 64-bit simhashes differ in at most this many bits count as the same
+SIMILARITY_BITS = 3
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    scope TEXT NOT NULL,
+    simhash INTEGER NOT NULL,
+    content TEXT NOT NULL,
+    tokens INTEGER NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_responses_scope ON responses (scope);
+"""
+
+_WHITESPACE = re.compile(r'\s+')
+_WORD = re.compile(r'\w+')
+
+
+def normalize_messages(messages):
+    """Messages with whitespace collapsed, so re-indented f-string prompts hash the same"""
+    return [{'role': message.get('role'), 'content': _WHITESPACE.sub(' ', message.get('content') or '').strip()}
+            for message in messages]
+
+
+def simhash(text):
+    """64-bit simhash over word 3-shingles"""
+    words = _WORD.findall(text.lower())
+    shingles = [' '.join(words[i:i + 3]) for i in range(max(1, len(words) - 2))]
+    weights = [0] * 64
+    for shingle in shingles:
+        value = int.from_bytes(hashlib.blake2b(shingle.encode('utf-8'), digest_size=8).digest(), 'big')
+        for bit in range(64):
+            weights[bit] += 1 if value >> bit & 1 else -1
+    fingerprint = sum(1 << bit for bit in range(64) if weights[bit] > 0)
+    # SQLite integers are signed
+    return fingerprint - (1 << 64) if fingerprint >= 1 << 63 else fingerprint
+
+
+def _distance(a, b):
+    return bin((a ^ b) & ((1 << 64) - 1)).count('1')
+
+
+class ResponseCache:
+    """LRU memory tier over an optional SQLite tier, with hit and tokens-saved counters"""
+
+    def __init__(self, path=None, max_entries=None, similarity=None):
+        self.path = Config.GROQ_CACHE_FILE if path is None else path
+        self.max_entries = max_entries or Config.GROQ_CACHE_SIZE
+        self.similarity = Config.GROQ_CACHE_SIMILARITY if similarity is None else similarity
+        self.lock = threading.Lock()
+        # key -> {'scope', 'simhash', 'content', 'tokens', 'expires_at'}, least recently used first
+        self.entries = OrderedDict()
+        self.conn = None
+        self.hits = 0
+        self.disk_hits = 0
+        self.similar_hits = 0
+        self.misses = 0
+        self.tokens_saved = 0
+
+    def get(self, model, messages, temperature, max_tokens):
+        """Cached content for this request, or None"""
+        key, scope, fingerprint = self._keys(model, messages, temperature, max_tokens)
+        now = time.time()
+        with self.lock:
+            entry = self._lookup(key, now)
+            if entry:
+                self.hits += 1
+            elif self.similarity:
+                entry = self._lookup_similar(scope, fingerprint, now)
+                if entry:
+                    self.similar_hits += 1
+            if not entry:
+                self.misses += 1
+                return None
+            self.tokens_saved += entry['tokens']
+            return entry['content']
+
+    def put(self, model, messages, temperature, max_tokens, content, tokens, ttl):
+        key, scope, fingerprint = self._keys(model, messages, temperature, max_tokens)
+        entry = {'scope': scope, 'simhash': fingerprint, 'content': content, 'tokens': tokens or 0,
+                 'expires_at': time.time() + ttl}
+        with self.lock:
+            self._remember(key, entry)
+            conn = self._connect()
+            if conn:
+                with conn:
+                    conn.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+                                 (key, scope, fingerprint, content, entry['tokens'], entry['expires_at']))
+                    conn.execute("DELETE FROM responses WHERE expires_at < ?", (time.time(),))
+
+    def get_stats(self):
+        with self.lock:
+            lookups = self.hits + self.similar_hits + self.misses
+            return {
+                'entries': len(self.entries),
+                'disk': bool(self.path),
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'similar_hits': self.similar_hits,
+                'misses': self.misses,
+                'hit_rate': round((self.hits + self.similar_hits) / lookups, 3) if lookups else None,
+                'tokens_saved': self.tokens_saved
+            }
+
+    def _keys(self, model, messages, temperature, max_tokens):
+        """(exact key, scope, simhash); the scope is everything but the user prompt, which similarity may vary"""
+        messages = normalize_messages(messages)
+        exact = json.dumps([model, messages, temperature, max_tokens], sort_keys=True)
+        context = [message for message in messages if message['role'] != 'user']
+        prompt = ' '.join(message['content'] for message in messages if message['role'] == 'user')
+        scope = json.dumps([model, context, temperature, max_tokens], sort_keys=True)
+        return (hashlib.sha256(exact.encode('utf-8')).hexdigest(),
+                hashlib.sha256(scope.encode('utf-8')).hexdigest(),
+                simhash(prompt))
+
+    def _lookup(self, key, now):
+        entry = self.entries.get(key)
+        if entry and entry['expires_at'] > now:
+            self.entries.move_to_end(key)
+            return entry
+        conn = self._connect()
+        if conn:
+            row = conn.execute("SELECT scope, simhash, content, tokens, expires_at FROM responses "
+                               "WHERE key = ? AND expires_at > ?", (key, now)).fetchone()
+            if row:
+                self.disk_hits += 1
+                return self._remember(key, dict(zip(('scope', 'simhash', 'content', 'tokens', 'expires_at'), row)))
+        return None
+
+    def _lookup_similar(self, scope, fingerprint, now):
+        for entry in reversed(self.entries.values()):
+            if entry['scope'] == scope and entry['expires_at'] > now \
+                    and _distance(entry['simhash'], fingerprint) <= SIMILARITY_BITS:
+                return entry
+        conn = self._connect()
+        if conn:
+            rows = conn.execute("SELECT key, simhash, content, tokens, expires_at FROM responses "
+                                "WHERE scope = ? AND expires_at > ?", (scope, now))
+            for key, candidate, content, tokens, expires_at in rows:
+                if _distance(candidate, fingerprint) <= SIMILARITY_BITS:
+                    self.disk_hits += 1
+                    return self._remember(key, {'scope': scope, 'simhash': candidate, 'content': content,
+                                                'tokens': tokens, 'expires_at': expires_at})
+        return None
+
+    def _remember(self, key, entry):
+        self.entries[key] = entry
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        return entry
+
+    def _connect(self):
+        if not self.path:
+            return None
+        if self.conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            self.conn = sqlite3.connect(self.path, check_same_thread=False)
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.executescript(SCHEMA)
+        return self.conn
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_response_cache():
+    """The process-wide ResponseCache, shared by every GroqService"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ResponseCache()
+    return _cache
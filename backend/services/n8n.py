@@ -11,6 +11,7 @@ from urllib.parse import urlencode, urlparse, parse_qsl, urlunparse
 from typing import Optional, Tuple, Dict, Any
 
 from config import Config
+from services.http_client import get_http_client
 
 logger = logging.getLogger(__name__)
 
@@ -167,9 +168,9 @@ class N8nService:
         headers = self._merge_headers(None)
         # Try HEAD first (fast), then POST (some webhooks expect POST)
         try:
-            r = requests.head(url, headers=headers, timeout=5, verify=self.verify_ssl, allow_redirects=True)
+            r = get_http_client().head(url, headers=headers, timeout=5, verify=self.verify_ssl, allow_redirects=True)
         except Exception:
-            r = requests.post(url, headers=headers, json={"_ping": True}, timeout=10, verify=self.verify_ssl)
+            r = get_http_client().post(url, headers=headers, json={"_ping": True}, timeout=10, verify=self.verify_ssl)
 
         ok_statuses = {200, 400, 401, 403, 404, 405}
         is_ok = (r.status_code in ok_statuses) or (100 <= r.status_code < 500)
@@ -515,9 +516,9 @@ class N8nService:
             try:
                 logger.info("N8n %s attempt %s/%s to %s", method, attempt + 1, max_retries + 1, url)
                 if method.upper() == "GET":
-                    response = requests.get(url, headers=headers, params=params, timeout=timeout, verify=self.verify_ssl)
+                    response = get_http_client().get(url, headers=headers, params=params, timeout=timeout, verify=self.verify_ssl)
                 else:
-                    response = requests.post(url, headers=headers, json=json_payload, params=params,
+                    response = get_http_client().post(url, headers=headers, json=json_payload, params=params,
                                              timeout=timeout, verify=self.verify_ssl)
 
                 # Decode early (so logs and returns are readable).
@@ -191,14 +191,14 @@ class SchedulerService:
     async def _execute_report_task(self, task):
         """Execute a scheduled report task"""
         try:
-            from .google_sheets import GoogleSheetsService
+            from .incident_store import get_incident_store
             from .groq import GroqService
+            from .groq_scheduler import BACKGROUND
 
-            sheets_service = GoogleSheetsService()
-            groq_service = GroqService()
+            groq_service = GroqService(priority=BACKGROUND)
 
             # Get incidents data
-            incidents_result = sheets_service.get_security_incidents()
+            incidents_result = get_incident_store().get_security_incidents()
             if not incidents_result['success']:
                 return {'success': False, 'message': 'Failed to fetch incidents data'}
 
@@ -227,9 +227,10 @@ class SchedulerService:
         try:
             from .ids_monitor import IDSMonitor
             from .groq import GroqService
+            from .groq_scheduler import BACKGROUND
 
             ids_monitor = IDSMonitor()
-            groq_service = GroqService()
+            groq_service = GroqService(priority=BACKGROUND)
 
             # Get recent logs
             logs = ids_monitor.get_recent_logs(limit=100)
@@ -0,0 +1,135 @@
+"""Bulk incident triage: AI analysis for many incidents at once, as a background job.
+
+Incidents whose analyzed fields are identical (repeats of the same event at
+different times) are analyzed once. GroqService.analyze_security_events packs
+small events several to a prompt and runs the prompts concurrently at
+background priority, and the enriched incidents are written to the incident
+store in one batch. Jobs live in memory; clients poll their progress by ID.
+"""
+import json
+import logging
+import threading
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+
+from config import Config
+from services.groq import GroqService
+from services.groq_scheduler import BACKGROUND
+from services.incident_store import get_incident_store
+
+logger = logging.getLogger(__name__)
+
+
+def enrich_incident(incident, analysis):
+    """The incident with severity, attack type and action taken from its AI analysis, if there is one"""
+    enriched_data = incident.copy()
+    if analysis:
+        enriched_data.update({
+            'severity': analysis.get('severity', incident.get('severity', 'Medium')),
+            'attackType': analysis.get('attackType', incident.get('attackType', 'Unknown')),
+            'actionTaken': analysis.get('actions', incident.get('actionTaken', 'Alert Sent'))
+        })
+    return enriched_data
+
+
+def _dedupe_key(incident):
+    # What analyze_security_event's prompt is built from, less the timestamp
+    return json.dumps([incident.get('sourceIp'), incident.get('destinationIp'), incident.get('eventType'),
+                       incident.get('additionalInfo', {})], sort_keys=True, default=str)
+
+
+class TriageJobs:
+    """Runs bulk triage jobs in background threads and keeps the last few for progress queries"""
+
+    def __init__(self, store=None, groq=None, max_jobs=None):
+        self.store = store or get_incident_store()
+        # Bulk imports wait behind interactive chat and analysis
+        self.groq = groq or GroqService(priority=BACKGROUND)
+        self.max_jobs = max_jobs or Config.TRIAGE_MAX_JOBS
+        self.lock = threading.Lock()
+        self.jobs = OrderedDict()
+
+    def start(self, incidents):
+        """Queue incidents for triage; returns the new job"""
+        job = {
+            'jobId': uuid.uuid4().hex,
+            'status': 'queued',
+            'total': len(incidents),
+            'unique': None,
+            'analyzed': 0,
+            'failed': 0,
+            'added': 0,
+            'eventIds': [],
+            'error': None,
+            'createdAt': datetime.now().isoformat(),
+            'finishedAt': None
+        }
+        with self.lock:
+            self.jobs[job['jobId']] = job
+            self._evict()
+            snapshot = dict(job)
+        threading.Thread(target=self._run, args=(job, incidents), daemon=True).start()
+        return snapshot
+
+    def get(self, job_id):
+        """A copy of the job's current state, or None if it is unknown or was evicted"""
+        with self.lock:
+            job = self.jobs.get(job_id)
+            return dict(job) if job else None
+
+    def _run(self, job, incidents):
+        try:
+            groups = OrderedDict()
+            for position, incident in enumerate(incidents):
+                groups.setdefault(_dedupe_key(incident), []).append(position)
+            representatives = [incidents[positions[0]] for positions in groups.values()]
+            self._update(job, status='analyzing', unique=len(representatives))
+
+            results = self.groq.analyze_security_events(
+                representatives, on_progress=lambda analyzed: self._update(job, analyzed=analyzed)
+            )
+
+            enriched = [None] * len(incidents)
+            failed = 0
+            for positions, result in zip(groups.values(), results):
+                analysis = result['data'] if result['success'] else None
+                if analysis is None:
+                    failed += len(positions)
+                for position in positions:
+                    enriched[position] = enrich_incident(incidents[position], analysis)
+            self._update(job, status='writing', failed=failed)
+
+            result = self.store.bulk_add_incidents(enriched)
+            self._update(job, status='completed', added=result['data']['addedCount'],
+                         eventIds=result['data']['eventIds'], finishedAt=datetime.now().isoformat())
+            logger.info(f"Triage job {job['jobId']}: {len(incidents)} incidents, "
+                        f"{len(representatives)} analyzed, {failed} without analysis")
+        except Exception as e:
+            logger.error(f"Triage job {job['jobId']} failed: {str(e)}")
+            self._update(job, status='failed', error=str(e), finishedAt=datetime.now().isoformat())
+
+    def _update(self, job, **changes):
+        with self.lock:
+            job.update(changes)
+
+    def _evict(self):
+        # Oldest finished jobs go first; running ones are kept until they finish
+        for job_id in [job_id for job_id, job in self.jobs.items() if job['finishedAt']]:
+            if len(self.jobs) <= self.max_jobs:
+                break
+            del self.jobs[job_id]
+
+
+_jobs = None
+_jobs_lock = threading.Lock()
+
+
+def get_triage_jobs():
+    """The process-wide TriageJobs"""
+    global _jobs
+    if _jobs is None:
+        with _jobs_lock:
+            if _jobs is None:
+                _jobs = TriageJobs()
+    return _jobs
@@ -73,6 +73,60 @@ class BackendService {
     });
   }
 
+  /**
+   * Send a chat message and receive the reply as it is generated (Server-Sent Events)
+   * @param {string} message - The message content
+   * @param {Array} conversationHistory - Previous messages
+   * @param {Object} context - Additional context
+   * @param {Function} onToken - Called with each piece of reply text as it arrives
+   * @param {string} endpoint - '/ai/chat' or '/chat/agent'
+   * @returns {Promise<Object>} - The complete response, as sendChatMessage returns it
+   */
+  async streamChatMessage(message, conversationHistory = [], context = {}, onToken = () => {}, endpoint = '/ai/chat') {
+    const token = await this.getFirebaseToken();
+
+    // EventSource cannot POST, so the stream is read from fetch directly
+    const response = await fetch(`${this.baseUrl}${endpoint}`, {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json',
+        'Accept': 'text/event-stream',
+        'Authorization': token ? `Bearer ${token}` : undefined,
+      },
+      body: JSON.stringify({ message, conversationHistory, context }),
+    });
+    if (!response.ok) {
+      const text = await response.text().catch(() => '');
+      throw new Error(`Backend error ${response.status}: ${text}`);
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    for (;;) {
+      const { done, value } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+      let boundary;
+      while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+        const block = buffer.slice(0, boundary);
+        buffer = buffer.slice(boundary + 2);
+        let event = 'message';
+        let data = '';
+        for (const line of block.split('\n')) {
+          if (line.startsWith('event: ')) event = line.slice(7);
+          else if (line.startsWith('data: ')) data += line.slice(6);
+        }
+        if (!data) continue;
+        const payload = JSON.parse(data);
+        if (event === 'token') onToken(payload.content);
+        else if (event === 'done') return payload;
+        else if (event === 'error') throw new Error(payload.error || 'AI chat failed');
+      }
+    }
+    throw new Error('Chat stream ended before the reply was complete');
+  }
+
   /**
    * Get Firebase ID token for authentication
    * @returns {Promise<string|null>} - The Firebase ID token
@@ -466,6 +520,30 @@ class BackendService {
     });
   }
 
+  /**
+   * Subscribe to IDS records as they are logged (Server-Sent Events)
+   * @param {Function} onAlert - Called with each IDS record
+   * @param {Object} filters - Optional filters (alertLevel, ip, protocol; comma-separated lists allowed)
+   * @param {Function} onDropped - Called with the number of records skipped because the client fell behind
+   * @returns {Promise<EventSource>} - Call close() on it to unsubscribe
+   */
+  async subscribeIDSAlerts(onAlert, filters = {}, onDropped = null) {
+    const token = await this.getFirebaseToken();
+    const params = new URLSearchParams();
+    if (filters.alertLevel) params.set('alert_level', filters.alertLevel);
+    if (filters.ip) params.set('ip', filters.ip);
+    if (filters.protocol) params.set('protocol', filters.protocol);
+    // EventSource cannot send an Authorization header
+    if (token) params.set('token', token);
+
+    const source = new EventSource(`${this.baseUrl}/ids/alerts/stream?${params.toString()}`);
+    source.addEventListener('alert', (event) => onAlert(JSON.parse(event.data)));
+    if (onDropped) {
+      source.addEventListener('dropped', (event) => onDropped(JSON.parse(event.data).dropped));
+    }
+    return source;
+  }
+
   /**
    * Get scheduled tasks
    * @param {Object} filters - Optional filters (type, status)